@@ -7,13 +7,18 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from config import config
 from models import db
+from contract_outbox import contract_outbox_worker, contract_outbox_worker_command
+from rate_limit import enforce_global_rate_limit
+from metrics import init_metrics
+from query_stats import init_query_stats
 
 # Hedera service is optional for basic functionality
 HEDERA_AVAILABLE = False
-init_hedera_service = None
+get_hedera_service = None
 
 # Import blueprints
 from routes.auth import auth_bp
@@ -25,6 +30,7 @@ from routes.public import public_bp
 
 # Optional imports that require Java/Hedera SDK
 try:
+    from hedera_service import get_hedera_service
     from routes.intersend import intersend_bp
     from routes.student_investments import student_investments_bp
     from routes.ramp import ramp_bp
@@ -65,16 +71,32 @@ def create_app(config_name=None):
     JWTManager(app)
     migrate = Migrate(app, db)
     
+    # Trust X-Forwarded-For from the configured number of proxies
+    if app.config['PROXY_FIX_X_FOR']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+    
+    # Request metrics (/api/metrics); registered first so every request is measured
+    init_metrics(app)
+    
+    # Per-request SQL counts/timings, slow-query and N+1 logging
+    init_query_stats(app)
+    
+    # Global rate limit, checked before any route touches the database
+    app.before_request(enforce_global_rate_limit)
+    
     # Initialize Hedera service (optional)
-    if HEDERA_AVAILABLE and init_hedera_service:
+    # The service is shared with the blueprints through the registry; the
+    # Hedera client itself is only opened on first use.
+    if HEDERA_AVAILABLE and get_hedera_service:
         with app.app_context():
             try:
-                init_hedera_service(
+                get_hedera_service(
                     network=app.config['HEDERA_NETWORK'],
                     operator_id=app.config.get('HEDERA_OPERATOR_ID'),
-                    operator_key=app.config.get('HEDERA_OPERATOR_KEY')
+                    operator_key=app.config.get('HEDERA_OPERATOR_KEY'),
+                    contract_id=app.config.get('HEDERA_CONTRACT_ID')
                 )
-                print("✅ Hedera service initialized")
+                print("✅ Hedera service registered")
             except Exception as e:
                 print(f"⚠️  Failed to initialize Hedera service: {e}")
     else:
@@ -97,6 +119,15 @@ def create_app(config_name=None):
             print("✅ Hedera blueprints registered")
         except Exception as e:
             print(f"⚠️ Failed to register Hedera blueprints: {e}")
+        
+        # Contract writes queued by the blueprints are submitted by the
+        # outbox worker, started lazily in each serving process
+        if app.config['CONTRACT_OUTBOX_WORKER_ENABLED']:
+            @app.before_request
+            def start_contract_outbox_worker():
+                contract_outbox_worker.ensure_started(app)
+    
+    app.cli.add_command(contract_outbox_worker_command)
     
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
@@ -117,6 +148,7 @@ def create_app(config_name=None):
             'version': '1.0.0',
             'endpoints': {
                 'health': '/api/health',
+                'metrics': '/api/metrics',
                 'auth': {
                     'signup': '/api/auth/signup',
                     'signin': '/api/auth/signin',
@@ -132,7 +164,8 @@ def create_app(config_name=None):
                     'documents': '/api/kyc/documents',
                     'resubmit': '/api/kyc/resubmit',
                     'pending': '/api/kyc/pending',
-                    'verify': '/api/kyc/verify/<user_id>'
+                    'verify': '/api/kyc/verify/<user_id>',
+                    'verify_batch': '/api/kyc/verify/batch'
                 },
                 'data': {
                     'get_all': '/api/data/',
@@ -144,7 +177,9 @@ def create_app(config_name=None):
                     'delete': '/api/data/<id>',
                     'delete_by_key': '/api/data/key/<key>',
                     'upsert': '/api/data/upsert',
-                    'bulk_create': '/api/data/bulk'
+                    'bulk_create': '/api/data/bulk',
+                    'batch_get': '/api/data/batch-get',
+                    'batch_delete': '/api/data/batch-delete'
                 },
                 'transactions': {
                     'get_all': '/api/transactions/',
@@ -0,0 +1,196 @@
+"""
+Shared cache layer for data that should be computed once and served by every
+gunicorn worker.
+
+Redis is used as the cross-worker store when REDIS_URL is set and the redis
+package is installed. Without it, callers fall back to their own in-process
+caches, so the store is strictly optional.
+
+TTLCache is the in-process read-through cache for values that cannot be
+shared across workers (e.g. Hedera SDK query results).
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Optional, Any, Callable, Dict, Tuple
+
+try:
+    import redis
+except ImportError:  # redis is optional
+    redis = None
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_shared_store():
+    """
+    Get the Redis client for this process, or None if no shared store is configured.
+    
+    The client is recreated after a fork so workers never share sockets.
+    """
+    global _client, _client_pid
+    
+    url = os.getenv('REDIS_URL')
+    if not url or redis is None:
+        return None
+    
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = redis.Redis.from_url(
+                    url,
+                    socket_timeout=1.0,
+                    socket_connect_timeout=1.0,
+                    decode_responses=True
+                )
+                _client_pid = pid
+    return _client
+
+
+def shared_get_json(key: str) -> Optional[Any]:
+    """Read a JSON value from the shared store; None if missing or unavailable."""
+    store = get_shared_store()
+    if store is None:
+        return None
+    try:
+        raw = store.get(key)
+        return json.loads(raw) if raw else None
+    except Exception as e:
+        print(f"Shared cache read failed for {key}: {e}")
+        return None
+
+
+def shared_set_json(key: str, value: Any, ttl: int) -> bool:
+    """Write a JSON value to the shared store with a TTL in seconds."""
+    store = get_shared_store()
+    if store is None:
+        return False
+    try:
+        store.set(key, json.dumps(value), ex=ttl)
+        return True
+    except Exception as e:
+        print(f"Shared cache write failed for {key}: {e}")
+        return False
+
+
+def shared_try_lock(key: str, ttl: int) -> bool:
+    """
+    Try to take a short-lived cross-worker lock.
+    
+    Returns True when there is no shared store, so single-process
+    deployments always proceed.
+    """
+    store = get_shared_store()
+    if store is None:
+        return True
+    try:
+        return bool(store.set(key, str(os.getpid()), nx=True, ex=ttl))
+    except Exception as e:
+        print(f"Shared cache lock failed for {key}: {e}")
+        return True
+
+
+class TTLCache:
+    """
+    In-process read-through cache.
+    
+    Concurrent misses for a key share a single load. Once a value expires it
+    is still served for a grace period while one background thread reloads
+    it. Failed loads are cached briefly so an unhealthy backend is not
+    retried by every caller.
+    """
+    
+    def __init__(self, error_ttl: float = 5.0):
+        self.error_ttl = error_ttl
+        # key -> (value, fresh_until, stale_until)
+        self._entries: Dict[str, Tuple[Any, float, float]] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        # Bumped by invalidate() so loads started earlier are not stored
+        self._generation = 0
+    
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+    
+    def _load(self, key: str, loader: Callable[[], Any], ttl: float, stale_ttl: float, is_valid: Callable[[Any], bool]) -> Any:
+        generation = self._generation
+        value = loader()
+        now = time.monotonic()
+        
+        if generation != self._generation:
+            return value
+        
+        if is_valid(value):
+            self._entries[key] = (value, now + ttl, now + ttl + stale_ttl)
+        else:
+            previous = self._entries.get(key)
+            # Keep serving a good stale value over a fresh failure
+            if previous is None or not is_valid(previous[0]) or now >= previous[2]:
+                self._entries[key] = (value, now + self.error_ttl, now + self.error_ttl)
+        return value
+    
+    def _refresh(self, key: str, loader: Callable[[], Any], ttl: float, stale_ttl: float, is_valid: Callable[[Any], bool]):
+        try:
+            with self._key_lock(key):
+                self._load(key, loader, ttl, stale_ttl, is_valid)
+        except Exception as e:
+            print(f"Cache refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+    
+    def get_or_load(self, key: str, loader: Callable[[], Any], ttl: float, stale_ttl: float = 0, is_valid: Callable[[Any], bool] = lambda value: True) -> Any:
+        """
+        Return the cached value for key, loading it if needed.
+        
+        Args:
+            key: Cache key
+            loader: Zero-argument function producing the value
+            ttl: Seconds a loaded value is fresh
+            stale_ttl: Further seconds an expired value is served while it is
+                reloaded in the background
+            is_valid: Predicate; invalid values are cached for error_ttl only
+        """
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        
+        if entry is not None and now < entry[1]:
+            return entry[0]
+        
+        if entry is not None and now < entry[2]:
+            with self._lock:
+                start = key not in self._refreshing
+                self._refreshing.add(key)
+            if start:
+                threading.Thread(
+                    target=self._refresh,
+                    args=(key, loader, ttl, stale_ttl, is_valid),
+                    name='cache-refresh',
+                    daemon=True
+                ).start()
+            return entry[0]
+        
+        # Single flight: one caller loads, the rest wait and reuse its result
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() < entry[1]:
+                return entry[0]
+            return self._load(key, loader, ttl, stale_ttl, is_valid)
+    
+    def invalidate(self, *keys: str):
+        """Drop the given keys, or every key when none are given."""
+        with self._lock:
+            self._generation += 1
+            if keys:
+                for key in keys:
+                    self._entries.pop(key, None)
+            else:
+                self._entries.clear()
@@ -10,6 +10,17 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///hedera_ramp.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Connection pool per worker process: one connection per gunicorn thread
+    # plus the background workers (outbox, refreshers). SQLite keeps the
+    # Flask-SQLAlchemy defaults.
+    SQLALCHEMY_ENGINE_OPTIONS = {} if SQLALCHEMY_DATABASE_URI.startswith('sqlite') else {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', str(int(os.getenv('GUNICORN_THREADS', '4')) + 2))),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '4')),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+        'pool_pre_ping': True,
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    }
+    
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
@@ -19,6 +30,18 @@ class Config:
     HEDERA_NETWORK = os.getenv('HEDERA_NETWORK', 'testnet')
     HEDERA_OPERATOR_ID = os.getenv('HEDERA_OPERATOR_ID')
     HEDERA_OPERATOR_KEY = os.getenv('HEDERA_OPERATOR_KEY')
+    HEDERA_CONTRACT_ID = os.getenv('HEDERA_CONTRACT_ID')
+    
+    # Smart contract outbox (asynchronous contract writes)
+    # Set CONTRACT_OUTBOX_WORKER_ENABLED=false when running `flask contract-outbox-worker` separately
+    CONTRACT_OUTBOX_WORKER_ENABLED = os.getenv('CONTRACT_OUTBOX_WORKER_ENABLED', 'true').lower() == 'true'
+    CONTRACT_OUTBOX_WORKERS = int(os.getenv('CONTRACT_OUTBOX_WORKERS', '4'))
+    CONTRACT_OUTBOX_BATCH_SIZE = int(os.getenv('CONTRACT_OUTBOX_BATCH_SIZE', '20'))
+    CONTRACT_OUTBOX_POLL_SECONDS = float(os.getenv('CONTRACT_OUTBOX_POLL_SECONDS', '1.0'))
+    CONTRACT_OUTBOX_MAX_ATTEMPTS = int(os.getenv('CONTRACT_OUTBOX_MAX_ATTEMPTS', '5'))
+    CONTRACT_OUTBOX_LEASE_SECONDS = int(os.getenv('CONTRACT_OUTBOX_LEASE_SECONDS', '120'))
+    # Per-batch receipt wait; capped at a quarter of the lease
+    CONTRACT_OUTBOX_RECEIPT_TIMEOUT_SECONDS = float(os.getenv('CONTRACT_OUTBOX_RECEIPT_TIMEOUT_SECONDS', '30'))
     
     # KYC Configuration
     KYC_VERIFICATION_ENABLED = os.getenv('KYC_VERIFICATION_ENABLED', 'true').lower() == 'true'
@@ -27,9 +50,44 @@ class Config:
     # CORS Configuration
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:5173').split(',')
     
+    # Shared cache (Redis) used across gunicorn workers; optional
+    REDIS_URL = os.getenv('REDIS_URL')
+    
+    # Public landing-page stats snapshot refresh interval
+    PUBLIC_STATS_REFRESH_SECONDS = int(os.getenv('PUBLIC_STATS_REFRESH_SECONDS', '60'))
+    
+    # Intersend exchange rate polling interval
+    EXCHANGE_RATES_REFRESH_SECONDS = int(os.getenv('EXCHANGE_RATES_REFRESH_SECONDS', '30'))
+    
     # Rate Limiting
     RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
     MAX_REQUESTS_PER_MINUTE = int(os.getenv('MAX_REQUESTS_PER_MINUTE', '60'))
+    SIGNIN_RATE_LIMIT_PER_MINUTE = int(os.getenv('SIGNIN_RATE_LIMIT_PER_MINUTE', '10'))
+    INTERSEND_INITIATE_RATE_LIMIT_PER_MINUTE = int(os.getenv('INTERSEND_INITIATE_RATE_LIMIT_PER_MINUTE', '5'))
+    # Per provider IP; the callback is exempt from MAX_REQUESTS_PER_MINUTE
+    INTERSEND_CALLBACK_RATE_LIMIT_PER_MINUTE = int(os.getenv('INTERSEND_CALLBACK_RATE_LIMIT_PER_MINUTE', '1200'))
+    
+    # Maximum entries/keys per bulk user data request (bulk, batch-get, batch-delete)
+    USER_DATA_BULK_MAX_ENTRIES = int(os.getenv('USER_DATA_BULK_MAX_ENTRIES', '500'))
+    
+    # Wallet addresses allowed to use admin endpoints (comma-separated)
+    ADMIN_WALLET_ADDRESSES = [a.strip() for a in os.getenv('ADMIN_WALLET_ADDRESSES', '').split(',') if a.strip()]
+    
+    # Bearer token required by /api/metrics; when unset the endpoint is open,
+    # unless METRICS_REQUIRE_AUTH (on in production) refuses every scrape
+    METRICS_AUTH_TOKEN = os.getenv('METRICS_AUTH_TOKEN')
+    METRICS_REQUIRE_AUTH = os.getenv('METRICS_REQUIRE_AUTH', 'false').lower() == 'true'
+    
+    # Per-request SQL statistics (X-DB-Queries / Server-Timing headers)
+    SQL_QUERY_STATS_ENABLED = os.getenv('SQL_QUERY_STATS_ENABLED', 'true').lower() == 'true'
+    # Log statements slower than this with their plan (0 disables)
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '200'))
+    SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'true').lower() == 'true'
+    # Log statement shapes repeated this many times in one request (0 disables)
+    N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', '10'))
+    
+    # Number of reverse proxies in front of the app (client IP from X-Forwarded-For)
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', '0'))
 
 
 class DevelopmentConfig(Config):
@@ -42,6 +100,7 @@ class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
     TESTING = False
+    METRICS_REQUIRE_AUTH = os.getenv('METRICS_REQUIRE_AUTH', 'true').lower() == 'true'
 
 
 class TestingConfig(Config):
@@ -49,6 +108,7 @@ class TestingConfig(Config):
     DEBUG = True
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///test.db'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
 
 
 config = {
@@ -0,0 +1,326 @@
+"""
+Transactional outbox for smart contract writes.
+
+Routes record contract calls as ContractOutbox rows in the same database
+transaction as the Transaction they belong to, and return without waiting
+for Hedera consensus. A background worker claims due rows, submits the
+calls through HederaService, collects the batch's receipts concurrently and
+records the results, retrying failures with exponential backoff. Calls for
+the same transaction are submitted one at a time, in the order queued.
+
+A call's Hedera transaction id is committed as soon as it is submitted, and
+later attempts (after a receipt timeout, or after the lease of a dead worker
+expires) only poll that transaction's receipt instead of calling the contract
+again. Delivery is still at-least-once: a call is submitted twice only if its
+worker dies between submitting it and committing the id.
+"""
+
+import json
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, exists, or_
+from sqlalchemy.orm import aliased
+
+from models import ContractOutbox, Transaction, db
+
+# HederaService methods that may be queued, with the contract function each calls
+OUTBOX_METHODS = {
+    'initiate_onramp_transaction': 'initiateOnRamp',
+    'initiate_offramp_transaction': 'initiateOffRamp',
+    'update_transaction_status': 'updateTransactionStatus',
+}
+
+
+def enqueue_contract_call(method, transaction=None, **kwargs):
+    """
+    Queue a HederaService call in the current database session.
+    
+    The entry is committed together with the caller's other changes.
+    
+    Args:
+        method: HederaService method name
+        transaction: Transaction the call belongs to (optional)
+        **kwargs: Keyword arguments for the method (JSON serializable)
+        
+    Returns:
+        The ContractOutbox entry
+    """
+    if method not in OUTBOX_METHODS:
+        raise ValueError(f'Unsupported contract method: {method}')
+    
+    entry = ContractOutbox(
+        transaction=transaction,
+        method=method,
+        payload=json.dumps(kwargs)
+    )
+    db.session.add(entry)
+    return entry
+
+
+def _submit_contract_call(service, method, kwargs):
+    """Submit a HederaService call without waiting for its receipt."""
+    try:
+        return getattr(service, method)(wait_for_receipt=False, **kwargs)
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+def _update_transaction_metadata(entry):
+    """Reflect a finished outbox entry in its transaction's metadata."""
+    if entry.transaction_id is None:
+        return
+    
+    # Lock the row: the Intersend callback also rewrites the metadata
+    transaction = Transaction.query \
+        .filter_by(id=entry.transaction_id) \
+        .with_for_update() \
+        .populate_existing() \
+        .first()
+    if transaction is None:
+        return
+    
+    metadata = json.loads(transaction.transaction_metadata or '{}')
+    succeeded = entry.status == 'completed'
+    
+    if entry.method == 'update_transaction_status':
+        metadata['contract_status_updated'] = succeeded
+        if succeeded:
+            metadata['contract_update_transaction_id'] = entry.contract_transaction_id
+        else:
+            metadata['contract_update_error'] = entry.last_error
+    else:
+        metadata['contract_status'] = 'initiated' if succeeded else 'failed'
+        if succeeded:
+            metadata['contract_transaction_id'] = entry.contract_transaction_id
+        else:
+            metadata['contract_error'] = entry.last_error
+    
+    transaction.transaction_metadata = json.dumps(metadata)
+
+
+class ContractOutboxWorker:
+    """Drains the contract outbox with a pool of submitter threads."""
+    
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+    
+    @property
+    def worker_id(self):
+        return f'{socket.gethostname()}:{os.getpid()}'
+    
+    def notify(self):
+        """Wake the worker after new entries have been committed."""
+        self._wakeup.set()
+    
+    def ensure_started(self, app):
+        """Start the background drain thread in this process if needed."""
+        # Threads do not survive fork, so each worker starts its own
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._wakeup = threading.Event()
+            self._thread = threading.Thread(
+                target=self.run_forever,
+                args=(app,),
+                name='contract-outbox-worker',
+                daemon=True
+            )
+            self._pid = pid
+            self._thread.start()
+    
+    def run_forever(self, app):
+        """Drain the outbox until the process exits."""
+        poll_seconds = app.config.get('CONTRACT_OUTBOX_POLL_SECONDS', 1.0)
+        
+        with ThreadPoolExecutor(
+            max_workers=app.config.get('CONTRACT_OUTBOX_WORKERS', 4),
+            thread_name_prefix='contract-outbox'
+        ) as pool:
+            while True:
+                try:
+                    processed = self.run_once(app, pool)
+                except Exception as e:
+                    print(f"Contract outbox error: {e}")
+                    processed = 0
+                
+                # Keep draining while there is a backlog
+                if not processed:
+                    self._wakeup.wait(poll_seconds)
+                    self._wakeup.clear()
+    
+    def run_once(self, app, pool):
+        """
+        Claim one batch of due entries, submit them and record the results.
+        
+        Returns:
+            Number of entries processed
+        """
+        from hedera_service import get_hedera_service
+        
+        lease_seconds = app.config.get('CONTRACT_OUTBOX_LEASE_SECONDS', 120)
+        # Stay well inside the lease, so no other worker reclaims the batch
+        # while it is still waiting for receipts
+        receipt_timeout = min(app.config.get('CONTRACT_OUTBOX_RECEIPT_TIMEOUT_SECONDS', 30), lease_seconds / 4)
+        
+        with app.app_context():
+            try:
+                token, entries = self._claim(app.config.get('CONTRACT_OUTBOX_BATCH_SIZE', 20), lease_seconds)
+                if not entries:
+                    return 0
+                
+                service = get_hedera_service()
+                results = {}
+                
+                # Entries submitted by an earlier attempt only wait for their
+                # receipt; calling the contract again could apply them twice
+                handles = {
+                    entry.id: service.pending_receipt(entry.contract_transaction_id, OUTBOX_METHODS[entry.method])
+                    for entry in entries
+                    if entry.contract_transaction_id
+                }
+                
+                to_submit = [entry for entry in entries if entry.id not in handles]
+                calls = [(entry.method, json.loads(entry.payload)) for entry in to_submit]
+                for entry, result in zip(to_submit, pool.map(lambda call: _submit_contract_call(service, *call), calls)):
+                    if result.get('receipt_handle'):
+                        handles[entry.id] = result['receipt_handle']
+                    else:
+                        results[entry.id] = result
+                
+                # Commit the transaction ids before waiting for any receipt
+                submitted = {entry.id: handles[entry.id].transaction_id for entry in to_submit if entry.id in handles}
+                if submitted:
+                    for entry in self._owned(token):
+                        if entry.id in submitted:
+                            entry.contract_transaction_id = submitted[entry.id]
+                    db.session.commit()
+                
+                # Fetch the whole batch's receipts concurrently
+                ids = list(handles)
+                receipts = service.collect_receipts([handles[entry_id] for entry_id in ids], timeout=receipt_timeout)
+                results.update(zip(ids, receipts))
+                
+                # Entries reclaimed by another worker after a lost lease are left to it
+                max_attempts = app.config.get('CONTRACT_OUTBOX_MAX_ATTEMPTS', 5)
+                for entry in self._owned(token):
+                    self._record(entry, results[entry.id], max_attempts)
+                
+                db.session.commit()
+                return len(entries)
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+    
+    def _claim(self, batch_size, lease_seconds):
+        """
+        Mark a batch of due entries as processing by this worker.
+        
+        Calls for one transaction run in the order they were queued: an entry
+        is not claimed while an earlier entry for the same transaction is
+        pending, processing or failed (e.g. a status update never goes out
+        before, or alongside, the initiate call it refers to).
+        
+        Returns:
+            Tuple of (claim token, claimed entries)
+        """
+        now = datetime.utcnow()
+        due = or_(
+            and_(ContractOutbox.status == 'pending', ContractOutbox.available_at <= now),
+            # Entries whose worker died mid-flight
+            and_(ContractOutbox.status == 'processing', ContractOutbox.locked_at < now - timedelta(seconds=lease_seconds))
+        )
+        
+        earlier = aliased(ContractOutbox)
+        blocked = exists().where(
+            earlier.transaction_id == ContractOutbox.transaction_id,
+            earlier.id < ContractOutbox.id,
+            earlier.status.in_(('pending', 'processing', 'failed'))
+        )
+        
+        ids_query = db.session.query(ContractOutbox.id) \
+            .filter(due, ~blocked) \
+            .order_by(ContractOutbox.id) \
+            .limit(batch_size)
+        if db.engine.dialect.name == 'postgresql':
+            ids_query = ids_query.with_for_update(skip_locked=True)
+        
+        ids = [row.id for row in ids_query]
+        if not ids:
+            db.session.rollback()
+            return None, []
+        
+        # The conditional update makes the claim safe across workers
+        token = f'{self.worker_id}:{uuid.uuid4().hex[:8]}'
+        db.session.query(ContractOutbox).filter(
+            ContractOutbox.id.in_(ids),
+            due
+        ).update({
+            'status': 'processing',
+            'locked_by': token,
+            'locked_at': now,
+            'attempts': ContractOutbox.attempts + 1
+        }, synchronize_session=False)
+        db.session.commit()
+        
+        return token, ContractOutbox.query.filter_by(locked_by=token).order_by(ContractOutbox.id).all()
+    
+    def _owned(self, token):
+        """Entries still claimed with token, locked until commit."""
+        return ContractOutbox.query \
+            .filter_by(locked_by=token, status='processing') \
+            .with_for_update() \
+            .populate_existing() \
+            .order_by(ContractOutbox.id) \
+            .all()
+    
+    def _record(self, entry, result, max_attempts):
+        """Store a call result on its entry and schedule a retry if needed."""
+        now = datetime.utcnow()
+        entry.locked_by = None
+        entry.locked_at = None
+        
+        if result.get('success'):
+            entry.status = 'completed'
+            entry.contract_transaction_id = result.get('transaction_id')
+            entry.receipt = result.get('receipt')
+            entry.last_error = None
+            entry.completed_at = now
+        else:
+            # A submitted call keeps its contract_transaction_id, so the retry
+            # polls that transaction's receipt rather than submitting again
+            entry.last_error = result.get('error')
+            if entry.attempts >= max_attempts:
+                entry.status = 'failed'
+            else:
+                entry.status = 'pending'
+                entry.available_at = now + timedelta(seconds=min(300, 2 ** entry.attempts))
+        
+        if entry.status in ('completed', 'failed'):
+            _update_transaction_metadata(entry)
+
+
+contract_outbox_worker = ContractOutboxWorker()
+
+
+@click.command('contract-outbox-worker')
+@with_appcontext
+def contract_outbox_worker_command():
+    """Drain the contract outbox in the foreground."""
+    contract_outbox_worker.run_forever(current_app._get_current_object())
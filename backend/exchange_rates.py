@@ -0,0 +1,188 @@
+"""
+Exchange rate snapshots for the Intersend integration.
+
+Rates are polled from the provider by a background refresher and stored as
+versioned rows in exchange_rate_snapshots. Requests read the latest snapshot
+from memory, so no provider call happens on the request path. With a shared
+store only one worker polls the provider; the others reload the latest row.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from flask import current_app
+
+from cache import shared_try_lock
+from intersend_client import get_intersend_client
+from models import ExchangeRateSnapshot, db
+
+REFRESH_LOCK_KEY = 'exchange_rates:refresh_lock'
+
+# Used when the provider has never answered
+FALLBACK_KES_TO_HBAR = Decimal('0.0235')
+FALLBACK_HBAR_TO_KES = Decimal('42.55')
+
+
+def fallback_rates():
+    """Static rates payload for when no snapshot can be read at all."""
+    return {
+        'KES_TO_HBAR': float(FALLBACK_KES_TO_HBAR),
+        'HBAR_TO_KES': float(FALLBACK_HBAR_TO_KES),
+        'last_updated': datetime.utcnow().isoformat(),
+        'currency': 'KES',
+        'provider': 'intersend_fallback',
+        'version': None
+    }
+
+
+def fetch_provider_rates():
+    """
+    Fetch current rates from Intersend.
+    
+    Returns:
+        Dictionary with kes_to_hbar, hbar_to_kes and last_updated, or None
+    """
+    rates_response = get_intersend_client().get('/rates')
+    if not rates_response:
+        return None
+    
+    return {
+        'kes_to_hbar': Decimal(str(rates_response.get('kes_to_hbar', FALLBACK_KES_TO_HBAR))),
+        'hbar_to_kes': Decimal(str(rates_response.get('hbar_to_kes', FALLBACK_HBAR_TO_KES))),
+        'last_updated': rates_response.get('last_updated')
+    }
+
+
+def record_snapshot(rates, provider='intersend'):
+    """
+    Store fetched rates, creating a new version only when they changed.
+    
+    Returns:
+        The current ExchangeRateSnapshot
+    """
+    latest = ExchangeRateSnapshot.query.order_by(ExchangeRateSnapshot.id.desc()).first()
+    now = datetime.utcnow()
+    
+    if (latest is not None
+            and latest.provider == provider
+            and latest.kes_to_hbar == rates['kes_to_hbar']
+            and latest.hbar_to_kes == rates['hbar_to_kes']):
+        latest.fetched_at = now
+        latest.provider_updated_at = rates.get('last_updated')
+        snapshot = latest
+    else:
+        snapshot = ExchangeRateSnapshot(
+            provider=provider,
+            currency='KES',
+            kes_to_hbar=rates['kes_to_hbar'],
+            hbar_to_kes=rates['hbar_to_kes'],
+            provider_updated_at=rates.get('last_updated'),
+            created_at=now,
+            fetched_at=now
+        )
+        db.session.add(snapshot)
+    
+    db.session.commit()
+    return snapshot
+
+
+class ExchangeRateStore:
+    """In-process copy of the latest rate snapshot with a background refresher."""
+    
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._refresher_pid = None
+    
+    def refresh_interval(self, app=None):
+        app = app or current_app
+        return app.config.get('EXCHANGE_RATES_REFRESH_SECONDS', 30)
+    
+    def get(self):
+        """
+        Return the current rates payload (see ExchangeRateSnapshot.to_dict).
+        
+        Only a cold process with no stored snapshot calls the provider
+        inline, and concurrent cold requests share that call.
+        """
+        app = current_app._get_current_object()
+        self._ensure_refresher(app)
+        
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        
+        with self._lock:
+            if self._snapshot is None:
+                latest = ExchangeRateSnapshot.query.order_by(ExchangeRateSnapshot.id.desc()).first()
+                self._snapshot = latest.to_dict() if latest else self._poll()
+            return self._snapshot
+    
+    def _poll(self):
+        """Fetch from the provider and store the result as the latest snapshot."""
+        rates = fetch_provider_rates()
+        if rates is not None:
+            return record_snapshot(rates).to_dict()
+        
+        # Keep serving the last good rates; fall back only if there are none
+        latest = ExchangeRateSnapshot.query.order_by(ExchangeRateSnapshot.id.desc()).first()
+        if latest is not None:
+            return latest.to_dict()
+        return record_snapshot({
+            'kes_to_hbar': FALLBACK_KES_TO_HBAR,
+            'hbar_to_kes': FALLBACK_HBAR_TO_KES
+        }, provider='intersend_fallback').to_dict()
+    
+    def refresh(self, app):
+        """
+        Refresh the snapshot once.
+        
+        With a shared store only the worker holding the refresh lock polls
+        the provider; the others reload the row it wrote.
+        """
+        interval = self.refresh_interval(app)
+        with app.app_context():
+            try:
+                if shared_try_lock(REFRESH_LOCK_KEY, max(1, interval - 1)):
+                    snapshot = self._poll()
+                else:
+                    latest = ExchangeRateSnapshot.query.order_by(ExchangeRateSnapshot.id.desc()).first()
+                    snapshot = latest.to_dict() if latest else None
+                
+                if snapshot is not None:
+                    self._snapshot = snapshot
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error refreshing exchange rates: {e}")
+            finally:
+                db.session.remove()
+    
+    def _ensure_refresher(self, app):
+        # Threads do not survive fork, so each worker starts its own
+        pid = os.getpid()
+        if self._refresher_pid == pid:
+            return
+        
+        with self._lock:
+            if self._refresher_pid == pid:
+                return
+            self._refresher = threading.Thread(
+                target=self._run,
+                args=(app,),
+                name='exchange-rates-refresher',
+                daemon=True
+            )
+            self._refresher_pid = pid
+            self._refresher.start()
+    
+    def _run(self, app):
+        while True:
+            time.sleep(self.refresh_interval(app))
+            self.refresh(app)
+
+
+exchange_rate_store = ExchangeRateStore()
@@ -0,0 +1,121 @@
+"""
+Gunicorn configuration for production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Threaded (gthread) workers keep serving while some requests wait on
+Intersend or Hedera. Worker and thread counts derive from the available
+CPUs (including a container's cgroup CPU quota) and can be overridden with
+GUNICORN_WORKERS (or WEB_CONCURRENCY) / GUNICORN_THREADS; keep
+workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) below the database's connection
+limit.
+"""
+
+import glob
+import importlib.util
+import math
+import os
+
+from dotenv import load_dotenv
+
+# GUNICORN_* and PROMETHEUS_MULTIPROC_DIR may come from .env
+load_dotenv()
+
+
+def _cgroup_cpu_limit():
+    """CPUs allowed by the container's cgroup quota, or None if unlimited."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+        if quota == 'max':
+            return None
+        quota, period = int(quota), int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1; a quota of -1 means unlimited
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = int(f.read())
+        except (OSError, ValueError):
+            return None
+    
+    if quota <= 0 or period <= 0:
+        return None
+    return max(1, math.ceil(quota / period))
+
+
+def _cpu_count():
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    
+    # Affinity shows the host's CPUs even when a quota allows only a fraction
+    limit = _cgroup_cpu_limit()
+    return min(count, limit) if limit else count
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS') or os.getenv('WEB_CONCURRENCY') or min(_cpu_count() * 2 + 1, int(os.getenv('GUNICORN_MAX_WORKERS') or 8)))
+threads = int(os.getenv('GUNICORN_THREADS') or 4)
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT') or 120)
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS') or 2000)
+max_requests_jitter = 200
+
+# Load the app once in the master (tables are created once, workers fork
+# with the code already imported). The Hedera SDK runs on an embedded JVM,
+# which does not survive fork, so preloading defaults to off when it is
+# installed.
+preload_app = os.getenv(
+    'GUNICORN_PRELOAD',
+    'false' if importlib.util.find_spec('hedera') else 'true'
+).lower() == 'true'
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Give each worker its own DB connections and Hedera clients."""
+    if not server.cfg.preload_app:
+        return  # Nothing was created before the fork
+    
+    from app import app
+    from models import db
+    
+    # Connections inherited from the master must not be shared; drop them
+    # without closing the master's sockets
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    
+    try:
+        from hedera_service import reinit_hedera_services_after_fork
+    except Exception:
+        return  # Hedera SDK not available
+    reinit_hedera_services_after_fork()
+
+
+def on_starting(server):
+    """Clear metric files left by a previous run (multi-process metrics)."""
+    multiproc_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(multiproc_dir, '*.db')):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    """Drop an exited worker's live gauges from the multi-process metrics."""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
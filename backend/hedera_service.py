@@ -15,10 +15,212 @@ from hedera import (
     ContractId,
     ContractCallQuery,
     ContractExecuteTransaction,
-    ContractFunctionParameters
+    ContractFunctionParameters,
+    TransactionId,
+    TransactionReceiptQuery
 )
+import atexit
+import functools
 import os
-from typing import Optional, Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+
+from cache import TTLCache
+from metrics import (
+    HEDERA_ERRORS_TOTAL,
+    HEDERA_GAS_REQUESTED,
+    HEDERA_GAS_USED,
+    HEDERA_RECEIPT_LATENCY,
+    HEDERA_RECEIPTS_TOTAL,
+    HEDERA_SUBMIT_LATENCY
+)
+
+
+def cached_query(group: str):
+    """
+    Serve a read-only contract query through the service's query cache.
+    
+    The cache is per process: a write that invalidates the group (e.g.
+    update_exchange_rates) only clears it in the worker that sent it, and
+    other workers keep serving their copy until it expires, i.e. for up to
+    the group's TTL (HEDERA_RATES_CACHE_TTL for rates).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self):
+            ttl, stale_ttl = self.query_ttls[group]
+            return self.query_cache.get_or_load(
+                group,
+                lambda: func(self),
+                ttl,
+                stale_ttl,
+                is_valid=lambda result: result.get("success", False)
+            )
+        return wrapper
+    return decorator
+
+
+def instrumented(kind: str):
+    """
+    Record latency, gas and failures of a contract call in the hedera_* metrics.
+    
+    Wraps the low-level helpers that take the contract function name as their
+    first argument; kind is 'execute' for transactions and 'query' for calls.
+    """
+    stage = 'submit' if kind == 'execute' else 'query'
+    
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, function_name, *args, **kwargs):
+            HEDERA_GAS_REQUESTED.labels(function_name, kind).observe(self.contract_gas)
+            started = time.perf_counter()
+            try:
+                result = func(self, function_name, *args, **kwargs)
+            except Exception as e:
+                HEDERA_ERRORS_TOTAL.labels(function_name, stage, type(e).__name__).inc()
+                raise
+            finally:
+                HEDERA_SUBMIT_LATENCY.labels(function_name, kind).observe(time.perf_counter() - started)
+            
+            gas_used = getattr(result, 'gasUsed', None) if kind == 'query' else None
+            if gas_used is not None:
+                HEDERA_GAS_USED.labels(function_name).observe(int(gas_used))
+            return result
+        return wrapper
+    return decorator
+
+
+def _receipt_status(receipt) -> str:
+    status = getattr(receipt, 'status', None)
+    if status is None:
+        return 'UNKNOWN'
+    return str(status.toString()) if hasattr(status, 'toString') else str(status)
+
+
+class PendingReceipt:
+    """Handle for a submitted contract transaction whose receipt is fetched later."""
+    
+    def __init__(self, response, function_name: str, include_receipt: bool = True, on_success=None):
+        self.response = response
+        self.function_name = function_name
+        self.transaction_id = str(response.transactionId)
+        self.include_receipt = include_receipt
+        self.on_success = on_success
+        self._done = threading.Event()
+        self._receipt = None
+        self._error = None
+    
+    def done(self) -> bool:
+        """Whether the receipt has been fetched (or fetching failed)."""
+        return self._done.is_set()
+    
+    def fetch(self, client):
+        """Fetch the receipt from the network, recording its latency and status."""
+        started = time.perf_counter()
+        try:
+            receipt = self.response.getReceipt(client)
+        except Exception as e:
+            HEDERA_RECEIPT_LATENCY.labels(self.function_name).observe(time.perf_counter() - started)
+            HEDERA_ERRORS_TOTAL.labels(self.function_name, 'receipt', type(e).__name__).inc()
+            self.set_error(str(e))
+            return
+        
+        HEDERA_RECEIPT_LATENCY.labels(self.function_name).observe(time.perf_counter() - started)
+        HEDERA_RECEIPTS_TOTAL.labels(self.function_name, _receipt_status(receipt)).inc()
+        self.set_receipt(receipt)
+    
+    def set_receipt(self, receipt):
+        self._receipt = receipt
+        self._done.set()
+        if self.on_success:
+            self.on_success()
+    
+    def set_error(self, error: str):
+        self._error = error
+        self._done.set()
+    
+    def result(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Wait for the receipt and return it in the same shape as a blocking call.
+        
+        Args:
+            timeout: Seconds to wait; None waits indefinitely
+            
+        Returns:
+            Dictionary with success status and transaction ID
+        """
+        if not self._done.wait(timeout):
+            return {"success": False, "transaction_id": self.transaction_id, "error": "Receipt not available yet"}
+        if self._error is not None:
+            return {"success": False, "transaction_id": self.transaction_id, "error": self._error}
+        
+        result = {"success": True, "transaction_id": self.transaction_id}
+        if self.include_receipt:
+            result["receipt"] = str(self._receipt)
+        return result
+
+
+class SubmittedTransaction:
+    """Stands in for the SDK response of a transaction submitted earlier, known only by its id."""
+    
+    def __init__(self, transaction_id: str):
+        self.transactionId = TransactionId.fromString(transaction_id)
+    
+    def getReceipt(self, client):
+        return TransactionReceiptQuery() \
+            .setTransactionId(self.transactionId) \
+            .setValidateStatus(True) \
+            .execute(client)
+
+
+class ReceiptCollector:
+    """Fetches receipts for many submitted transactions with bounded parallelism."""
+    
+    def __init__(self, service: 'HederaService', max_workers: int = 8):
+        self.service = service
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='hedera-receipts'
+                    )
+        return self._executor
+    
+    def _fetch(self, handle: PendingReceipt):
+        handle.fetch(self.service.client)
+    
+    def collect(self, handles: Iterable[PendingReceipt], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Resolve receipt handles concurrently.
+        
+        Args:
+            handles: Handles returned by write methods called with wait_for_receipt=False
+            timeout: Overall seconds to wait; unresolved handles report an error
+                and keep resolving in the background
+            
+        Returns:
+            One result dictionary per handle, in order
+        """
+        handles = list(handles)
+        futures = [self.executor.submit(self._fetch, handle) for handle in handles if not handle.done()]
+        if futures:
+            wait(futures, timeout=timeout)
+        return [handle.result(timeout=0) for handle in handles]
+    
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
 
 
 class HederaService:
@@ -39,26 +241,55 @@ class HederaService:
         self.operator_key = operator_key or os.getenv('HEDERA_OPERATOR_KEY')
         self.contract_id = contract_id or os.getenv('HEDERA_CONTRACT_ID')
         
-        # Initialize client based on network
-        if network == 'mainnet':
-            self.client = Client.forMainnet()
-        elif network == 'previewnet':
-            self.client = Client.forPreviewnet()
+        # The client (and its gRPC channel pool) is built on first use
+        self._client = None
+        self._client_lock = threading.Lock()
+        
+        # Receipts of submitted transactions are fetched in parallel
+        self.receipt_collector = ReceiptCollector(self, int(os.getenv('HEDERA_RECEIPT_WORKERS', '8')))
+        
+        # Read-only query results: (fresh seconds, extra stale-while-revalidate seconds)
+        self.query_cache = TTLCache()
+        self.query_ttls = {
+            'rates': (int(os.getenv('HEDERA_RATES_CACHE_TTL', '30')), 300),
+            'stats': (int(os.getenv('HEDERA_STATS_CACHE_TTL', '60')), 600),
+        }
+        
+        # Gas limit sent with every contract call (see the hedera_gas_* metrics)
+        self.contract_gas = int(os.getenv('HEDERA_CONTRACT_GAS', '100000'))
+        
+        # Set contract ID if provided
+        if self.contract_id:
+            self.contract_id_obj = ContractId.fromString(self.contract_id)
+        else:
+            self.contract_id_obj = None
+    
+    def _build_client(self) -> Client:
+        """Create a Hedera client for the configured network and operator."""
+        if self.network == 'mainnet':
+            client = Client.forMainnet()
+        elif self.network == 'previewnet':
+            client = Client.forPreviewnet()
         else:  # Default to testnet
-            self.client = Client.forTestnet()
+            client = Client.forTestnet()
         
         # Set operator if credentials are provided
         if self.operator_id and self.operator_key:
-            self.client.setOperator(
+            client.setOperator(
                 AccountId.fromString(self.operator_id),
                 PrivateKey.fromString(self.operator_key)
             )
         
-        # Set contract ID if provided
-        if self.contract_id:
-            self.contract_id_obj = ContractId.fromString(self.contract_id)
-        else:
-            self.contract_id_obj = None
+        return client
+    
+    @property
+    def client(self) -> Client:
+        """Hedera client, created lazily and shared by all threads."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
     
     def get_client(self) -> Client:
         """Get the configured Hedera client."""
@@ -161,7 +392,73 @@ class HederaService:
     
     # ============ SMART CONTRACT FUNCTIONS ============
     
-    def register_user_on_contract(self, user_address: str, phone_number: str, country_code: str = 'KE') -> Dict[str, Any]:
+    @instrumented('execute')
+    def _submit_contract(self, function_name: str, params: ContractFunctionParameters):
+        """Submit a contract transaction and return the SDK response."""
+        tx = ContractExecuteTransaction() \
+            .setContractId(self.contract_id_obj) \
+            .setGas(self.contract_gas) \
+            .setFunction(function_name, params)
+        
+        return tx.execute(self.client)
+    
+    @instrumented('query')
+    def _query_contract(self, function_name: str, params: Optional[ContractFunctionParameters] = None):
+        """Run a read-only contract call and return its result."""
+        query = ContractCallQuery() \
+            .setContractId(self.contract_id_obj) \
+            .setGas(self.contract_gas)
+        
+        if params is None:
+            query = query.setFunction(function_name)
+        else:
+            query = query.setFunction(function_name, params)
+        
+        return query.execute(self.client)
+    
+    def _execute_contract(self, function_name: str, params: ContractFunctionParameters, wait_for_receipt: bool = True, include_receipt: bool = True, on_success=None) -> Dict[str, Any]:
+        """
+        Submit a contract function call.
+        
+        Args:
+            function_name: Contract function to call
+            params: Function parameters
+            wait_for_receipt: If False, return as soon as the transaction has been
+                submitted, with a PendingReceipt under "receipt_handle"
+            include_receipt: Include the receipt in the result
+            on_success: Called once the receipt has been received
+            
+        Returns:
+            Dictionary with success status and transaction ID
+        """
+        if not self.contract_id_obj:
+            return {"success": False, "error": "Contract ID not configured"}
+        
+        response = self._submit_contract(function_name, params)
+        handle = PendingReceipt(response, function_name, include_receipt, on_success)
+        
+        if not wait_for_receipt:
+            return {
+                "success": True,
+                "transaction_id": handle.transaction_id,
+                "receipt_handle": handle
+            }
+        
+        handle.fetch(self.client)
+        return handle.result()
+    
+    def pending_receipt(self, transaction_id: str, function_name: str) -> PendingReceipt:
+        """Receipt handle for a transaction submitted earlier (e.g. by another process)."""
+        return PendingReceipt(SubmittedTransaction(transaction_id), function_name)
+    
+    def collect_receipts(self, handles: Iterable[PendingReceipt], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Fetch receipts for submitted transactions in bulk (see ReceiptCollector.collect)."""
+        return self.receipt_collector.collect(handles, timeout)
+    
+    def _invalidate_rates(self):
+        self.query_cache.invalidate('rates')
+    
+    def register_user_on_contract(self, user_address: str, phone_number: str, country_code: str = 'KE', wait_for_receipt: bool = True) -> Dict[str, Any]:
         """
         Register user on smart contract.
         
@@ -169,74 +466,52 @@ class HederaService:
             user_address: User's Hedera account ID
             phone_number: User's phone number
             country_code: User's country code
+            wait_for_receipt: If False, return right after submission without the
+                receipt, with a PendingReceipt under "receipt_handle"
             
         Returns:
-            Dictionary with success status and transaction ID
+            Dictionary with success status and transaction ID, plus
+            "receipt_handle" when wait_for_receipt is False
         """
         try:
-            if not self.contract_id_obj:
-                return {"success": False, "error": "Contract ID not configured"}
-            
-            tx = ContractExecuteTransaction() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "registerUser",
-                    ContractFunctionParameters()
-                        .addString(phone_number)
-                        .addString(country_code)
-                )
-            
-            response = tx.execute(self.client)
-            receipt = response.getReceipt(self.client)
-            
-            return {
-                "success": True, 
-                "transaction_id": str(response.transactionId),
-                "receipt": str(receipt)
-            }
+            return self._execute_contract(
+                "registerUser",
+                ContractFunctionParameters()
+                    .addString(phone_number)
+                    .addString(country_code),
+                wait_for_receipt
+            )
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def verify_user_kyc_on_contract(self, user_address: str) -> Dict[str, Any]:
+    def verify_user_kyc_on_contract(self, user_address: str, wait_for_receipt: bool = True) -> Dict[str, Any]:
         """
         Verify user KYC on smart contract.
         
         Args:
             user_address: User's Hedera account ID
+            wait_for_receipt: If False, return right after submission without the
+                receipt, with a PendingReceipt under "receipt_handle"
             
         Returns:
-            Dictionary with success status and transaction ID
+            Dictionary with success status and transaction ID, plus
+            "receipt_handle" when wait_for_receipt is False
         """
         try:
-            if not self.contract_id_obj:
-                return {"success": False, "error": "Contract ID not configured"}
-            
             user_account = AccountId.fromString(user_address)
             
-            tx = ContractExecuteTransaction() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "verifyKyc",
-                    ContractFunctionParameters()
-                        .addAddress(user_account)
-                )
-            
-            response = tx.execute(self.client)
-            receipt = response.getReceipt(self.client)
-            
-            return {
-                "success": True, 
-                "transaction_id": str(response.transactionId),
-                "receipt": str(receipt)
-            }
+            return self._execute_contract(
+                "verifyKyc",
+                ContractFunctionParameters()
+                    .addAddress(user_account),
+                wait_for_receipt
+            )
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def initiate_onramp_transaction(self, user_address: str, fiat_amount: int, phone_number: str) -> Dict[str, Any]:
+    def initiate_onramp_transaction(self, user_address: str, fiat_amount: int, phone_number: str, wait_for_receipt: bool = True) -> Dict[str, Any]:
         """
         Initiate on-ramp transaction on smart contract.
         
@@ -244,37 +519,26 @@ class HederaService:
             user_address: User's Hedera account ID
             fiat_amount: Amount in KES (in wei)
             phone_number: User's phone number
+            wait_for_receipt: If False, return right after submission without the
+                receipt, with a PendingReceipt under "receipt_handle"
             
         Returns:
-            Dictionary with success status and transaction ID
+            Dictionary with success status and transaction ID, plus
+            "receipt_handle" when wait_for_receipt is False
         """
         try:
-            if not self.contract_id_obj:
-                return {"success": False, "error": "Contract ID not configured"}
-            
-            tx = ContractExecuteTransaction() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "initiateOnRamp",
-                    ContractFunctionParameters()
-                        .addUint256(fiat_amount)
-                        .addString(phone_number)
-                )
-            
-            response = tx.execute(self.client)
-            receipt = response.getReceipt(self.client)
-            
-            return {
-                "success": True, 
-                "transaction_id": str(response.transactionId),
-                "receipt": str(receipt)
-            }
+            return self._execute_contract(
+                "initiateOnRamp",
+                ContractFunctionParameters()
+                    .addUint256(fiat_amount)
+                    .addString(phone_number),
+                wait_for_receipt
+            )
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def initiate_offramp_transaction(self, user_address: str, hbar_amount: int, phone_number: str) -> Dict[str, Any]:
+    def initiate_offramp_transaction(self, user_address: str, hbar_amount: int, phone_number: str, wait_for_receipt: bool = True) -> Dict[str, Any]:
         """
         Initiate off-ramp transaction on smart contract.
         
@@ -282,37 +546,26 @@ class HederaService:
             user_address: User's Hedera account ID
             hbar_amount: Amount in HBAR (in tinybars)
             phone_number: User's phone number
+            wait_for_receipt: If False, return right after submission without the
+                receipt, with a PendingReceipt under "receipt_handle"
             
         Returns:
-            Dictionary with success status and transaction ID
+            Dictionary with success status and transaction ID, plus
+            "receipt_handle" when wait_for_receipt is False
         """
         try:
-            if not self.contract_id_obj:
-                return {"success": False, "error": "Contract ID not configured"}
-            
-            tx = ContractExecuteTransaction() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "initiateOffRamp",
-                    ContractFunctionParameters()
-                        .addUint256(hbar_amount)
-                        .addString(phone_number)
-                )
-            
-            response = tx.execute(self.client)
-            receipt = response.getReceipt(self.client)
-            
-            return {
-                "success": True, 
-                "transaction_id": str(response.transactionId),
-                "receipt": str(receipt)
-            }
+            return self._execute_contract(
+                "initiateOffRamp",
+                ContractFunctionParameters()
+                    .addUint256(hbar_amount)
+                    .addString(phone_number),
+                wait_for_receipt
+            )
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def update_transaction_status(self, transaction_id: int, status: int, intersend_id: str = "", notes: str = "") -> Dict[str, Any]:
+    def update_transaction_status(self, transaction_id: int, status: int, intersend_id: str = "", notes: str = "", wait_for_receipt: bool = True) -> Dict[str, Any]:
         """
         Update transaction status on smart contract.
         
@@ -321,34 +574,23 @@ class HederaService:
             status: Status (0=PENDING, 1=PROCESSING, 2=COMPLETED, 3=FAILED, 4=CANCELLED)
             intersend_id: Intersend transaction ID
             notes: Additional notes
+            wait_for_receipt: If False, return right after submission without the
+                receipt, with a PendingReceipt under "receipt_handle"
             
         Returns:
-            Dictionary with success status and transaction ID
+            Dictionary with success status and transaction ID, plus
+            "receipt_handle" when wait_for_receipt is False
         """
         try:
-            if not self.contract_id_obj:
-                return {"success": False, "error": "Contract ID not configured"}
-            
-            tx = ContractExecuteTransaction() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "updateTransactionStatus",
-                    ContractFunctionParameters()
-                        .addUint256(transaction_id)
-                        .addUint8(status)
-                        .addString(intersend_id)
-                        .addString(notes)
-                )
-            
-            response = tx.execute(self.client)
-            receipt = response.getReceipt(self.client)
-            
-            return {
-                "success": True, 
-                "transaction_id": str(response.transactionId),
-                "receipt": str(receipt)
-            }
+            return self._execute_contract(
+                "updateTransactionStatus",
+                ContractFunctionParameters()
+                    .addUint256(transaction_id)
+                    .addUint8(status)
+                    .addString(intersend_id)
+                    .addString(notes),
+                wait_for_receipt
+            )
             
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -369,16 +611,11 @@ class HederaService:
             
             user_account = AccountId.fromString(user_address)
             
-            query = ContractCallQuery() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "getUserInfo",
-                    ContractFunctionParameters()
-                        .addAddress(user_account)
-                )
-            
-            response = query.execute(self.client)
+            response = self._query_contract(
+                "getUserInfo",
+                ContractFunctionParameters()
+                    .addAddress(user_account)
+            )
             
             return {
                 "success": True, 
@@ -402,16 +639,11 @@ class HederaService:
             if not self.contract_id_obj:
                 return {"success": False, "error": "Contract ID not configured"}
             
-            query = ContractCallQuery() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "getTransactionInfo",
-                    ContractFunctionParameters()
-                        .addUint256(transaction_id)
-                )
-            
-            response = query.execute(self.client)
+            response = self._query_contract(
+                "getTransactionInfo",
+                ContractFunctionParameters()
+                    .addUint256(transaction_id)
+            )
             
             return {
                 "success": True, 
@@ -421,43 +653,34 @@ class HederaService:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def update_exchange_rates(self, kes_to_hbar: int, hbar_to_kes: int) -> Dict[str, Any]:
+    def update_exchange_rates(self, kes_to_hbar: int, hbar_to_kes: int, wait_for_receipt: bool = True) -> Dict[str, Any]:
         """
         Update exchange rates on smart contract.
         
         Args:
             kes_to_hbar: Rate: 1 KES = X HBAR (in wei)
             hbar_to_kes: Rate: 1 HBAR = X KES (in wei)
+            wait_for_receipt: If False, return right after submission without the
+                receipt, with a PendingReceipt under "receipt_handle"
             
         Returns:
-            Dictionary with success status and transaction ID
+            Dictionary with success status and transaction ID, plus
+            "receipt_handle" when wait_for_receipt is False
         """
         try:
-            if not self.contract_id_obj:
-                return {"success": False, "error": "Contract ID not configured"}
-            
-            tx = ContractExecuteTransaction() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "updateExchangeRates",
-                    ContractFunctionParameters()
-                        .addUint256(kes_to_hbar)
-                        .addUint256(hbar_to_kes)
-                )
-            
-            response = tx.execute(self.client)
-            receipt = response.getReceipt(self.client)
-            
-            return {
-                "success": True, 
-                "transaction_id": str(response.transactionId),
-                "receipt": str(receipt)
-            }
+            return self._execute_contract(
+                "updateExchangeRates",
+                ContractFunctionParameters()
+                    .addUint256(kes_to_hbar)
+                    .addUint256(hbar_to_kes),
+                wait_for_receipt,
+                on_success=self._invalidate_rates
+            )
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @cached_query('rates')
     def get_exchange_rates_from_contract(self) -> Dict[str, Any]:
         """
         Get current exchange rates from smart contract.
@@ -469,12 +692,7 @@ class HederaService:
             if not self.contract_id_obj:
                 return {"success": False, "error": "Contract ID not configured"}
             
-            query = ContractCallQuery() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction("getExchangeRates")
-            
-            response = query.execute(self.client)
+            response = self._query_contract("getExchangeRates")
             
             return {
                 "success": True, 
@@ -498,16 +716,11 @@ class HederaService:
             if not self.contract_id_obj:
                 return {"success": False, "error": "Contract ID not configured"}
             
-            query = ContractCallQuery() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "calculateHbarAmount",
-                    ContractFunctionParameters()
-                        .addUint256(kes_amount)
-                )
-            
-            response = query.execute(self.client)
+            response = self._query_contract(
+                "calculateHbarAmount",
+                ContractFunctionParameters()
+                    .addUint256(kes_amount)
+            )
             
             return {
                 "success": True, 
@@ -531,16 +744,11 @@ class HederaService:
             if not self.contract_id_obj:
                 return {"success": False, "error": "Contract ID not configured"}
             
-            query = ContractCallQuery() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "calculateKesAmount",
-                    ContractFunctionParameters()
-                        .addUint256(hbar_amount)
-                )
-            
-            response = query.execute(self.client)
+            response = self._query_contract(
+                "calculateKesAmount",
+                ContractFunctionParameters()
+                    .addUint256(hbar_amount)
+            )
             
             return {
                 "success": True, 
@@ -550,6 +758,7 @@ class HederaService:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @cached_query('stats')
     def get_platform_stats_from_contract(self) -> Dict[str, Any]:
         """
         Get platform statistics from smart contract.
@@ -561,12 +770,7 @@ class HederaService:
             if not self.contract_id_obj:
                 return {"success": False, "error": "Contract ID not configured"}
             
-            query = ContractCallQuery() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction("getPlatformStats")
-            
-            response = query.execute(self.client)
+            response = self._query_contract("getPlatformStats")
             
             return {
                 "success": True, 
@@ -575,156 +779,95 @@ class HederaService:
             
         except Exception as e:
             return {"success": False, "error": str(e)}
-
+    
     # ============ SIMPLE CONTRACT FUNCTIONS ============
+    # Write methods take wait_for_receipt and return a "receipt_handle" when it
+    # is False, as the full contract methods above do.
     
-    def register_user_simple(self, user_address: str, phone_number: str) -> Dict[str, Any]:
+    def register_user_simple(self, user_address: str, phone_number: str, wait_for_receipt: bool = True) -> Dict[str, Any]:
         """Register user on simple smart contract"""
         try:
-            if not self.contract_id_obj:
-                return {"success": False, "error": "Contract ID not configured"}
-            
-            tx = ContractExecuteTransaction() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "registerUser",
-                    ContractFunctionParameters()
-                        .addString(phone_number)
-                )
-            
-            response = tx.execute(self.client)
-            receipt = response.getReceipt(self.client)
-            
-            return {
-                "success": True, 
-                "transaction_id": str(response.transactionId)
-            }
+            return self._execute_contract(
+                "registerUser",
+                ContractFunctionParameters()
+                    .addString(phone_number),
+                wait_for_receipt,
+                include_receipt=False
+            )
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def verify_kyc_simple(self, user_address: str) -> Dict[str, Any]:
+    def verify_kyc_simple(self, user_address: str, wait_for_receipt: bool = True) -> Dict[str, Any]:
         """Verify user KYC on simple smart contract"""
         try:
-            if not self.contract_id_obj:
-                return {"success": False, "error": "Contract ID not configured"}
-            
             user_account = AccountId.fromString(user_address)
             
-            tx = ContractExecuteTransaction() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "verifyKyc",
-                    ContractFunctionParameters()
-                        .addAddress(user_account)
-                )
-            
-            response = tx.execute(self.client)
-            receipt = response.getReceipt(self.client)
-            
-            return {
-                "success": True, 
-                "transaction_id": str(response.transactionId)
-            }
+            return self._execute_contract(
+                "verifyKyc",
+                ContractFunctionParameters()
+                    .addAddress(user_account),
+                wait_for_receipt,
+                include_receipt=False
+            )
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def create_transaction_simple(self, user_address: str, is_on_ramp: bool, amount: int, currency: str) -> Dict[str, Any]:
+    def create_transaction_simple(self, user_address: str, is_on_ramp: bool, amount: int, currency: str, wait_for_receipt: bool = True) -> Dict[str, Any]:
         """Create transaction on simple smart contract"""
         try:
-            if not self.contract_id_obj:
-                return {"success": False, "error": "Contract ID not configured"}
-            
-            tx = ContractExecuteTransaction() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "createTransaction",
-                    ContractFunctionParameters()
-                        .addBool(is_on_ramp)
-                        .addUint256(amount)
-                        .addString(currency)
-                )
-            
-            response = tx.execute(self.client)
-            receipt = response.getReceipt(self.client)
-            
-            return {
-                "success": True, 
-                "transaction_id": str(response.transactionId)
-            }
+            return self._execute_contract(
+                "createTransaction",
+                ContractFunctionParameters()
+                    .addBool(is_on_ramp)
+                    .addUint256(amount)
+                    .addString(currency),
+                wait_for_receipt,
+                include_receipt=False
+            )
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def complete_transaction_simple(self, transaction_id: int) -> Dict[str, Any]:
+    def complete_transaction_simple(self, transaction_id: int, wait_for_receipt: bool = True) -> Dict[str, Any]:
         """Complete transaction on simple smart contract"""
         try:
-            if not self.contract_id_obj:
-                return {"success": False, "error": "Contract ID not configured"}
-            
-            tx = ContractExecuteTransaction() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "completeTransaction",
-                    ContractFunctionParameters()
-                        .addUint256(transaction_id)
-                )
-            
-            response = tx.execute(self.client)
-            receipt = response.getReceipt(self.client)
-            
-            return {
-                "success": True, 
-                "transaction_id": str(response.transactionId)
-            }
+            return self._execute_contract(
+                "completeTransaction",
+                ContractFunctionParameters()
+                    .addUint256(transaction_id),
+                wait_for_receipt,
+                include_receipt=False
+            )
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def update_rates_simple(self, kes_to_hbar: int, hbar_to_kes: int) -> Dict[str, Any]:
+    def update_rates_simple(self, kes_to_hbar: int, hbar_to_kes: int, wait_for_receipt: bool = True) -> Dict[str, Any]:
         """Update exchange rates on simple smart contract"""
         try:
-            if not self.contract_id_obj:
-                return {"success": False, "error": "Contract ID not configured"}
-            
-            tx = ContractExecuteTransaction() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "updateExchangeRates",
-                    ContractFunctionParameters()
-                        .addUint256(kes_to_hbar)
-                        .addUint256(hbar_to_kes)
-                )
-            
-            response = tx.execute(self.client)
-            receipt = response.getReceipt(self.client)
-            
-            return {
-                "success": True, 
-                "transaction_id": str(response.transactionId)
-            }
+            return self._execute_contract(
+                "updateExchangeRates",
+                ContractFunctionParameters()
+                    .addUint256(kes_to_hbar)
+                    .addUint256(hbar_to_kes),
+                wait_for_receipt,
+                include_receipt=False,
+                on_success=self._invalidate_rates
+            )
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @cached_query('rates')
     def get_rates_simple(self) -> Dict[str, Any]:
         """Get exchange rates from simple smart contract"""
         try:
             if not self.contract_id_obj:
                 return {"success": False, "error": "Contract ID not configured"}
             
-            query = ContractCallQuery() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction("getExchangeRates")
-            
-            response = query.execute(self.client)
+            response = self._query_contract("getExchangeRates")
             
             return {
                 "success": True, 
@@ -740,16 +883,11 @@ class HederaService:
             if not self.contract_id_obj:
                 return {"success": False, "error": "Contract ID not configured"}
             
-            query = ContractCallQuery() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "calculateHbarAmount",
-                    ContractFunctionParameters()
-                        .addUint256(kes_amount)
-                )
-            
-            response = query.execute(self.client)
+            response = self._query_contract(
+                "calculateHbarAmount",
+                ContractFunctionParameters()
+                    .addUint256(kes_amount)
+            )
             
             return {
                 "success": True, 
@@ -765,16 +903,11 @@ class HederaService:
             if not self.contract_id_obj:
                 return {"success": False, "error": "Contract ID not configured"}
             
-            query = ContractCallQuery() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction(
-                    "calculateKesAmount",
-                    ContractFunctionParameters()
-                        .addUint256(hbar_amount)
-                )
-            
-            response = query.execute(self.client)
+            response = self._query_contract(
+                "calculateKesAmount",
+                ContractFunctionParameters()
+                    .addUint256(hbar_amount)
+            )
             
             return {
                 "success": True, 
@@ -784,18 +917,14 @@ class HederaService:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @cached_query('stats')
     def get_stats_simple(self) -> Dict[str, Any]:
         """Get platform statistics from simple smart contract"""
         try:
             if not self.contract_id_obj:
                 return {"success": False, "error": "Contract ID not configured"}
             
-            query = ContractCallQuery() \
-                .setContractId(self.contract_id_obj) \
-                .setGas(100000) \
-                .setFunction("getPlatformStats")
-            
-            response = query.execute(self.client)
+            response = self._query_contract("getPlatformStats")
             
             return {
                 "success": True, 
@@ -804,35 +933,94 @@ class HederaService:
             
         except Exception as e:
             return {"success": False, "error": str(e)}
-
+    
+    def reinit_after_fork(self):
+        """Forget the parent process's client, receipt pool and query cache."""
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.receipt_collector = ReceiptCollector(self, self.receipt_collector.max_workers)
+        self.query_cache = TTLCache()
+    
     def close(self):
         """Close the Hedera client connection."""
-        if self.client:
-            self.client.close()
+        self.receipt_collector.close()
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
 
+# ============ SERVICE REGISTRY ============
 
-# Global instance
-hedera_service = None
+# One HederaService per (network, operator, contract) for the whole process,
+# shared by every blueprint and thread.
+_services: Dict[Tuple[str, Optional[str], Optional[str]], HederaService] = {}
+_services_lock = threading.Lock()
 
 
-def init_hedera_service(network: str = 'testnet', operator_id: Optional[str] = None, operator_key: Optional[str] = None) -> HederaService:
+def get_hedera_service(network: Optional[str] = None, operator_id: Optional[str] = None, operator_key: Optional[str] = None, contract_id: Optional[str] = None) -> HederaService:
     """
-    Initialize and return the global Hedera service instance.
+    Get the shared Hedera service for a network/operator/contract combination.
+    
+    Missing arguments fall back to the HEDERA_* environment variables. The
+    service is created on first request and its client on first use.
     
     Args:
         network: 'testnet', 'mainnet', or 'previewnet'
         operator_id: Hedera account ID
         operator_key: Private key for the operator account
+        contract_id: Smart contract ID
         
     Returns:
         HederaService instance
     """
-    global hedera_service
-    hedera_service = HederaService(network, operator_id, operator_key)
-    return hedera_service
+    network = network or os.getenv('HEDERA_NETWORK', 'testnet')
+    operator_id = operator_id or os.getenv('HEDERA_OPERATOR_ID')
+    contract_id = contract_id or os.getenv('HEDERA_CONTRACT_ID')
+    key = (network, operator_id, contract_id)
+    
+    service = _services.get(key)
+    if service is None:
+        with _services_lock:
+            service = _services.get(key)
+            if service is None:
+                service = HederaService(network, operator_id, operator_key, contract_id)
+                _services[key] = service
+    return service
+
+
+def init_hedera_service(network: str = 'testnet', operator_id: Optional[str] = None, operator_key: Optional[str] = None, contract_id: Optional[str] = None) -> HederaService:
+    """
+    Initialize and return the shared Hedera service instance.
+    
+    Kept for backwards compatibility; equivalent to get_hedera_service().
+    """
+    return get_hedera_service(network, operator_id, operator_key, contract_id)
+
 
+def close_hedera_services():
+    """Close every client opened through the registry."""
+    with _services_lock:
+        services = list(_services.values())
+    for service in services:
+        try:
+            service.close()
+        except Exception as e:
+            print(f"Error closing Hedera client: {e}")
+
+
+def reinit_hedera_services_after_fork():
+    """
+    Prepare registered services for use in a freshly forked worker.
+    
+    Services stay registered (blueprints hold references to them), but the
+    parent's clients, thread pools and cached results are dropped without
+    being closed, so each worker opens its own.
+    """
+    global _services_lock
+    _services_lock = threading.Lock()
+    for service in list(_services.values()):
+        service.reinit_after_fork()
 
-def get_hedera_service() -> Optional[HederaService]:
-    """Get the global Hedera service instance."""
-    return hedera_service
 
+atexit.register(close_hedera_services)
@@ -0,0 +1,163 @@
+"""
+HTTP client for the Intersend payments API.
+
+Calls go through one pooled requests.Session per process so connections are
+kept alive between requests, with separate connect/read timeouts so a slow
+provider cannot pin a worker, and bounded, jittered retries for idempotent
+calls only.
+"""
+
+import os
+import random
+import threading
+from typing import Optional, Dict, Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class _JitteredRetry(Retry):
+    """Retry policy with full-jitter exponential backoff."""
+    
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff > 0 else 0
+
+
+class IntersendClient:
+    """Pooled, timeout-bounded client for the Intersend API."""
+    
+    # POST creates payments and transfers, so it is only retried when the
+    # connection could not be established (the request was never sent).
+    IDEMPOTENT_METHODS = frozenset(['GET', 'PUT', 'HEAD', 'OPTIONS', 'DELETE'])
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    
+    def __init__(self, api_url: Optional[str] = None, api_key: Optional[str] = None,
+                 connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None, backoff_factor: Optional[float] = None,
+                 pool_maxsize: Optional[int] = None):
+        """
+        Initialize the client.
+        
+        Args:
+            api_url: Intersend API base URL
+            api_key: Intersend API key
+            connect_timeout: Seconds to wait for a connection
+            read_timeout: Seconds to wait for response data
+            max_retries: Retries for idempotent calls and failed connects
+            backoff_factor: Base of the exponential retry backoff, in seconds
+            pool_maxsize: Maximum open connections to the Intersend host
+        """
+        self.api_url = (api_url or os.getenv('INTERSEND_API_URL', 'https://api.intersend.com')).rstrip('/')
+        self.api_key = api_key or os.getenv('INTERSEND_API_KEY')
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else float(os.getenv('INTERSEND_CONNECT_TIMEOUT', '3.05')),
+            read_timeout if read_timeout is not None else float(os.getenv('INTERSEND_READ_TIMEOUT', '15'))
+        )
+        max_retries = max_retries if max_retries is not None else int(os.getenv('INTERSEND_MAX_RETRIES', '3'))
+        backoff_factor = backoff_factor if backoff_factor is not None else float(os.getenv('INTERSEND_RETRY_BACKOFF', '0.5'))
+        pool_maxsize = pool_maxsize if pool_maxsize is not None else int(os.getenv('INTERSEND_POOL_MAXSIZE', '10'))
+        
+        retry = _JitteredRetry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=self.IDEMPOTENT_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        
+        # pool_block caps concurrent connections to the host at pool_maxsize
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_maxsize,
+            pool_block=True,
+            max_retries=retry
+        )
+        
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+        if self.api_key:
+            self.session.headers['Authorization'] = f'Bearer {self.api_key}'
+    
+    @property
+    def is_configured(self) -> bool:
+        """Whether API credentials are available."""
+        return bool(self.api_key)
+    
+    def request(self, endpoint: str, method: str = 'GET', data: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Make a request to the Intersend API.
+        
+        Args:
+            endpoint: API path, e.g. '/payments/initiate'
+            method: 'GET', 'POST' or 'PUT'
+            data: JSON body for POST/PUT
+            
+        Returns:
+            Parsed JSON response, or None on error or if not configured
+        """
+        if not self.is_configured:
+            return None
+        
+        if method not in ('GET', 'POST', 'PUT'):
+            return None
+        
+        try:
+            response = self.session.request(
+                method,
+                f"{self.api_url}{endpoint}",
+                json=data if method != 'GET' else None,
+                timeout=self.timeout
+            )
+            
+            if response.status_code in [200, 201]:
+                return response.json()
+            
+            print(f"Intersend API error: {response.status_code} - {response.text}")
+            return None
+            
+        except Exception as e:
+            print(f"Error making Intersend request: {e}")
+            return None
+    
+    def get(self, endpoint: str) -> Optional[Dict[str, Any]]:
+        return self.request(endpoint, 'GET')
+    
+    def post(self, endpoint: str, data: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        return self.request(endpoint, 'POST', data)
+    
+    def put(self, endpoint: str, data: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        return self.request(endpoint, 'PUT', data)
+    
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_intersend_client() -> IntersendClient:
+    """
+    Get the process-wide Intersend client.
+    
+    A new client is created after a fork so workers never share sockets.
+    """
+    global _client, _client_pid
+    
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = IntersendClient()
+                _client_pid = pid
+    return _client
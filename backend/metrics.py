@@ -0,0 +1,166 @@
+"""
+Prometheus metrics for the API.
+
+Request hooks record per-blueprint/per-endpoint latency, in-flight requests,
+status codes and response sizes, exposed at /api/metrics in the Prometheus
+text format. HederaService records its contract calls in the hedera_*
+metrics defined here.
+
+Under gunicorn set PROMETHEUS_MULTIPROC_DIR to an empty, writable directory
+so that every worker's samples are aggregated (gunicorn.conf.py clears it on
+start and removes the files of exited workers).
+"""
+
+import hmac
+import os
+import time
+
+from flask import Response, current_app, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+# Seconds; tuned for API calls that range from cache hits to provider round trips
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency',
+    ['blueprint', 'endpoint', 'method'],
+    buckets=LATENCY_BUCKETS
+)
+REQUESTS_TOTAL = Counter(
+    'http_requests_total',
+    'HTTP requests by status code',
+    ['blueprint', 'endpoint', 'method', 'status']
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress',
+    'HTTP requests currently being served',
+    ['blueprint', 'endpoint'],
+    multiprocess_mode='livesum'
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes',
+    'HTTP response body size',
+    ['blueprint', 'endpoint'],
+    buckets=SIZE_BUCKETS
+)
+
+# Seconds; a contract call waits for consensus (typically 2-5s) before its receipt
+HEDERA_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0, 30.0, 60.0)
+GAS_BUCKETS = (10000, 25000, 50000, 75000, 100000, 150000, 250000, 500000, 1000000)
+
+HEDERA_SUBMIT_LATENCY = Histogram(
+    'hedera_submit_duration_seconds',
+    'Time to submit a contract transaction or run a contract query',
+    ['function', 'kind'],
+    buckets=HEDERA_LATENCY_BUCKETS
+)
+HEDERA_RECEIPT_LATENCY = Histogram(
+    'hedera_receipt_duration_seconds',
+    'Time to fetch the receipt of a submitted contract transaction',
+    ['function'],
+    buckets=HEDERA_LATENCY_BUCKETS
+)
+HEDERA_GAS_REQUESTED = Histogram(
+    'hedera_gas_requested',
+    'Gas limit sent with contract calls',
+    ['function', 'kind'],
+    buckets=GAS_BUCKETS
+)
+HEDERA_GAS_USED = Histogram(
+    'hedera_gas_used',
+    'Gas used by contract queries, as reported in their results',
+    ['function'],
+    buckets=GAS_BUCKETS
+)
+HEDERA_RECEIPTS_TOTAL = Counter(
+    'hedera_receipts_total',
+    'Contract transaction receipts by status code',
+    ['function', 'status']
+)
+HEDERA_ERRORS_TOTAL = Counter(
+    'hedera_errors_total',
+    'Contract call failures by stage (submit, query, receipt) and exception type',
+    ['function', 'stage', 'exception']
+)
+
+
+def _labels():
+    """Blueprint and endpoint of the current request (bounded label values)."""
+    if request.url_rule is None:
+        return 'none', 'unmatched'
+    return request.blueprint or 'app', request.endpoint or 'unknown'
+
+
+def _before_request():
+    blueprint, endpoint = _labels()
+    g._metrics = (time.perf_counter(), blueprint, endpoint)
+    REQUESTS_IN_PROGRESS.labels(blueprint, endpoint).inc()
+
+
+def _after_request(response):
+    started = g.get('_metrics')
+    if started is None:
+        return response
+    
+    start, blueprint, endpoint = started
+    REQUEST_LATENCY.labels(blueprint, endpoint, request.method).observe(time.perf_counter() - start)
+    REQUESTS_TOTAL.labels(blueprint, endpoint, request.method, str(response.status_code)).inc()
+    
+    # Streamed responses have no known length
+    if not response.is_streamed:
+        RESPONSE_SIZE.labels(blueprint, endpoint).observe(response.calculate_content_length() or 0)
+    return response
+
+
+def _teardown_request(exc):
+    started = g.pop('_metrics', None)
+    if started is not None:
+        REQUESTS_IN_PROGRESS.labels(started[1], started[2]).dec()
+
+
+def metrics_view():
+    """
+    Expose metrics; requires METRICS_AUTH_TOKEN as a bearer token when set.
+    
+    Without a token the endpoint is open, unless METRICS_REQUIRE_AUTH is on
+    (the production default), in which case it fails closed.
+    """
+    token = current_app.config.get('METRICS_AUTH_TOKEN')
+    if not token and current_app.config.get('METRICS_REQUIRE_AUTH'):
+        return Response('Metrics disabled: METRICS_AUTH_TOKEN is not set\n', status=403, mimetype='text/plain')
+    if token:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied, f'Bearer {token}'):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    """
+    Register the request hooks and the /api/metrics endpoint.
+    
+    Call before registering other before_request hooks, so requests they
+    reject (e.g. rate limited) are still measured.
+    """
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/api/metrics', 'metrics', metrics_view, methods=['GET'])
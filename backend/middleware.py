@@ -3,100 +3,165 @@ Middleware for authentication and authorization checks.
 """
 
 from functools import wraps
-from flask import request, jsonify
+from flask import current_app, request, jsonify, g
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from models import User, db
 
 
+def _verify_identity():
+    """
+    Verify the request's JWT and return its identity.
+    
+    The result is cached on flask.g, so stacked decorators and handlers
+    only verify the token once per request.
+    """
+    if '_jwt_identity' not in g:
+        verify_jwt_in_request()
+        g._jwt_identity = get_jwt_identity()
+    return g._jwt_identity
+
+
+def _user_check_failed(user, active=False, kyc=False, email_verified=False):
+    """Return an error response if the user fails a requested check, else None."""
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    if active and not user.is_active:
+        return jsonify({
+            'error': 'Account inactive',
+            'message': 'Your account has been deactivated. Please contact support.'
+        }), 403
+    
+    if kyc and user.kyc_status != 'approved':
+        return jsonify({
+            'error': 'KYC verification required',
+            'message': 'Please complete KYC verification to access this feature',
+            'kyc_status': user.kyc_status
+        }), 403
+    
+    if email_verified and not user.is_email_verified:
+        return jsonify({
+            'error': 'Email verification required',
+            'message': 'Please verify your email address to access this feature'
+        }), 403
+    
+    return None
+
+
 def token_required(fn):
     """Decorator to require a valid JWT token."""
     @wraps(fn)
     def wrapper(*args, **kwargs):
         try:
-            verify_jwt_in_request()
-            return fn(*args, **kwargs)
+            _verify_identity()
         except Exception as e:
             return jsonify({'error': 'Invalid or missing token', 'message': str(e)}), 401
+        return fn(*args, **kwargs)
     return wrapper
 
 
 def get_current_user():
-    """Get the current authenticated user from JWT token."""
+    """
+    Get the current authenticated user from JWT token.
+    
+    The user is loaded at most once per request and shared by all
+    decorators and the handler.
+    """
+    if '_current_user' in g:
+        return g._current_user
+    
     try:
-        user_id = get_jwt_identity()
+        user_id = _verify_identity()
         user = User.query.get(user_id)
-        return user
     except Exception:
         return None
+    
+    g._current_user = user
+    return user
 
 
-def kyc_required(fn):
-    """Decorator to require KYC verification."""
-    @wraps(fn)
-    def wrapper(*args, **kwargs):
-        try:
-            verify_jwt_in_request()
-            user = get_current_user()
-            
-            if not user:
-                return jsonify({'error': 'User not found'}), 404
+def user_required(active=True, kyc=False, email_verified=False):
+    """
+    Decorator to require an authenticated user passing the given checks.
+    
+    Verifies the token, loads the user and applies the active, KYC and
+    email checks in a single pass.
+    
+    Args:
+        active: Require an active account (default: True)
+        kyc: Require approved KYC
+        email_verified: Require a verified email address
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                _verify_identity()
+            except Exception as e:
+                return jsonify({'error': 'Invalid or missing token', 'message': str(e)}), 401
             
-            if user.kyc_status != 'approved':
-                return jsonify({
-                    'error': 'KYC verification required',
-                    'message': 'Please complete KYC verification to access this feature',
-                    'kyc_status': user.kyc_status
-                }), 403
+            error = _user_check_failed(get_current_user(), active=active, kyc=kyc, email_verified=email_verified)
+            if error:
+                return error
             
             return fn(*args, **kwargs)
-        except Exception as e:
-            return jsonify({'error': 'Authorization failed', 'message': str(e)}), 401
-    return wrapper
+        return wrapper
+    return decorator
 
 
-def active_user_required(fn):
-    """Decorator to require an active user account."""
+def _single_check(fn, **checks):
+    """Wrap fn with one user check, reusing the request-scoped user."""
     @wraps(fn)
     def wrapper(*args, **kwargs):
         try:
-            verify_jwt_in_request()
-            user = get_current_user()
-            
-            if not user:
-                return jsonify({'error': 'User not found'}), 404
-            
-            if not user.is_active:
-                return jsonify({
-                    'error': 'Account inactive',
-                    'message': 'Your account has been deactivated. Please contact support.'
-                }), 403
-            
-            return fn(*args, **kwargs)
+            _verify_identity()
         except Exception as e:
             return jsonify({'error': 'Authorization failed', 'message': str(e)}), 401
+        
+        error = _user_check_failed(get_current_user(), **checks)
+        if error:
+            return error
+        
+        return fn(*args, **kwargs)
     return wrapper
 
 
+def kyc_required(fn):
+    """Decorator to require KYC verification."""
+    return _single_check(fn, kyc=True)
+
+
+def active_user_required(fn):
+    """Decorator to require an active user account."""
+    return _single_check(fn, active=True)
+
+
 def email_verified_required(fn):
     """Decorator to require email verification."""
+    return _single_check(fn, email_verified=True)
+
+
+def admin_required(fn):
+    """
+    Decorator to require an active user whose wallet address is listed in
+    ADMIN_WALLET_ADDRESSES. With no admins configured every request is refused.
+    """
     @wraps(fn)
     def wrapper(*args, **kwargs):
         try:
-            verify_jwt_in_request()
-            user = get_current_user()
-            
-            if not user:
-                return jsonify({'error': 'User not found'}), 404
-            
-            if not user.is_email_verified:
-                return jsonify({
-                    'error': 'Email verification required',
-                    'message': 'Please verify your email address to access this feature'
-                }), 403
-            
-            return fn(*args, **kwargs)
+            _verify_identity()
         except Exception as e:
-            return jsonify({'error': 'Authorization failed', 'message': str(e)}), 401
+            return jsonify({'error': 'Invalid or missing token', 'message': str(e)}), 401
+        
+        user = get_current_user()
+        error = _user_check_failed(user, active=True)
+        if error:
+            return error
+        
+        if user.wallet_address not in current_app.config.get('ADMIN_WALLET_ADDRESSES', []):
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        return fn(*args, **kwargs)
     return wrapper
 
 
@@ -0,0 +1,101 @@
+"""Indexed Intersend reference columns on transactions
+
+Adds dedicated, indexed columns for the Intersend provider transaction id and
+reference, and backfills them from transaction_metadata.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+transactions = sa.table(
+    'transactions',
+    sa.column('id', sa.Integer),
+    sa.column('transaction_metadata', sa.Text),
+    sa.column('intersend_transaction_id', sa.String),
+    sa.column('intersend_reference', sa.String),
+)
+
+
+def _columns(table):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _indexes(table):
+    return {i['name'] for i in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # Tables created by db.create_all() may already have the new columns
+    existing = _columns('transactions')
+    with op.batch_alter_table('transactions') as batch_op:
+        if 'intersend_transaction_id' not in existing:
+            batch_op.add_column(sa.Column('intersend_transaction_id', sa.String(length=100), nullable=True))
+        if 'intersend_reference' not in existing:
+            batch_op.add_column(sa.Column('intersend_reference', sa.String(length=100), nullable=True))
+
+    indexes = _indexes('transactions')
+    if 'ix_transactions_intersend_transaction_id' not in indexes:
+        op.create_index('ix_transactions_intersend_transaction_id', 'transactions', ['intersend_transaction_id'])
+    if 'ix_transactions_intersend_reference' not in indexes:
+        op.create_index('ix_transactions_intersend_reference', 'transactions', ['intersend_reference'])
+
+    # Backfill from metadata in id-ordered batches
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(transactions.c.id, transactions.c.transaction_metadata)
+            .where(
+                transactions.c.id > last_id,
+                transactions.c.intersend_transaction_id.is_(None),
+                transactions.c.transaction_metadata.like('%intersend_%'),
+            )
+            .order_by(transactions.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        for row in rows:
+            try:
+                metadata = json.loads(row.transaction_metadata or '{}')
+            except (TypeError, ValueError):
+                continue
+            if not isinstance(metadata, dict):
+                continue
+
+            provider_id = metadata.get('intersend_transaction_id')
+            reference = metadata.get('intersend_reference')
+            if provider_id or reference:
+                bind.execute(
+                    transactions.update()
+                    .where(transactions.c.id == row.id)
+                    .values(
+                        intersend_transaction_id=str(provider_id) if provider_id else None,
+                        intersend_reference=str(reference) if reference else None,
+                    )
+                )
+
+        last_id = rows[-1].id
+
+
+def downgrade():
+    op.drop_index('ix_transactions_intersend_reference', table_name='transactions')
+    op.drop_index('ix_transactions_intersend_transaction_id', table_name='transactions')
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_column('intersend_reference')
+        batch_op.drop_column('intersend_transaction_id')
@@ -0,0 +1,33 @@
+"""Composite index for per-user transaction stats
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def _indexes(table):
+    return {i['name'] for i in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    if 'ix_transactions_user_status_type' not in _indexes('transactions'):
+        op.create_index(
+            'ix_transactions_user_status_type',
+            'transactions',
+            ['user_id', 'status', 'transaction_type']
+        )
+
+
+def downgrade():
+    op.drop_index('ix_transactions_user_status_type', table_name='transactions')
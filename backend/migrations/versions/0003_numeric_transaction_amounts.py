@@ -0,0 +1,163 @@
+"""Numeric amount columns on transactions
+
+Moves transactions.amount and transactions.fiat_amount from strings to
+NUMERIC. Nullable shadow columns are added and committed first, then the
+values are copied in id-ordered batches outside the migration transaction so
+the table stays writable during the backfill. The final step locks the table,
+copies rows written in the meantime, validates and swaps the columns in; only
+that step holds the exclusive lock. Amounts are written once at insert, so
+rows copied by the first pass do not go stale.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from decimal import Decimal, InvalidOperation
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+AMOUNT_COLUMNS = {
+    'amount': sa.Numeric(precision=28, scale=8),
+    'fiat_amount': sa.Numeric(precision=20, scale=8),
+}
+
+transactions = sa.table(
+    'transactions',
+    sa.column('id', sa.Integer),
+    sa.column('amount', sa.String),
+    sa.column('fiat_amount', sa.String),
+    sa.column('amount_numeric', sa.Numeric(28, 8)),
+    sa.column('fiat_amount_numeric', sa.Numeric(20, 8)),
+)
+
+
+def _column_types(table):
+    return {c['name']: c['type'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _to_decimal(value):
+    if value is None:
+        return None
+    try:
+        amount = Decimal(str(value).strip().replace(',', ''))
+    except InvalidOperation:
+        return None
+    return amount if amount.is_finite() else None
+
+
+def _backfill(bind):
+    """
+    Copy amounts into the shadow columns for rows that do not have them yet.
+    
+    Returns:
+        (id, amount, fiat_amount) of the rows that could not be parsed
+    """
+    update = (
+        transactions.update()
+        .where(transactions.c.id == sa.bindparam('row_id'))
+        .values(
+            amount_numeric=sa.bindparam('new_amount'),
+            fiat_amount_numeric=sa.bindparam('new_fiat_amount')
+        )
+    )
+    invalid = []
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(transactions.c.id, transactions.c.amount, transactions.c.fiat_amount)
+            .where(
+                transactions.c.id > last_id,
+                sa.or_(
+                    transactions.c.amount_numeric.is_(None),
+                    transactions.c.fiat_amount_numeric.is_(None)
+                )
+            )
+            .order_by(transactions.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        values = []
+        for row in rows:
+            amount = _to_decimal(row.amount)
+            fiat_amount = _to_decimal(row.fiat_amount)
+            if amount is None or fiat_amount is None:
+                invalid.append((row.id, row.amount, row.fiat_amount))
+                continue
+            values.append({'row_id': row.id, 'new_amount': amount, 'new_fiat_amount': fiat_amount})
+        if values:
+            bind.execute(update, values)
+
+        last_id = rows[-1].id
+    return invalid
+
+
+def upgrade():
+    types = _column_types('transactions')
+    if isinstance(types['amount'], sa.Numeric) and isinstance(types['fiat_amount'], sa.Numeric):
+        # Created by db.create_all() with the current models
+        return
+
+    # 1. Add nullable numeric shadow columns
+    with op.batch_alter_table('transactions') as batch_op:
+        for name, type_ in AMOUNT_COLUMNS.items():
+            if f'{name}_numeric' not in types:
+                batch_op.add_column(sa.Column(f'{name}_numeric', type_, nullable=True))
+
+    # 2. Backfill outside the migration transaction, committing as it goes,
+    #    so the ADD COLUMN lock is released and the table stays writable
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        _backfill(bind)
+
+    # 3. Lock the table and copy rows written during the backfill
+    if bind.dialect.name == 'postgresql':
+        op.execute('LOCK TABLE transactions IN ACCESS EXCLUSIVE MODE')
+    invalid = _backfill(bind)
+
+    # 4. Validate before touching the original columns
+    if invalid:
+        sample = ', '.join(f'id={i} amount={a!r} fiat_amount={f!r}' for i, a, f in invalid[:20])
+        raise RuntimeError(
+            f'{len(invalid)} transaction(s) have non-numeric amounts; fix them and rerun. {sample}'
+        )
+
+    missing = bind.execute(
+        sa.select(sa.func.count()).select_from(transactions).where(
+            sa.or_(
+                transactions.c.amount_numeric.is_(None),
+                transactions.c.fiat_amount_numeric.is_(None)
+            )
+        )
+    ).scalar()
+    if missing:
+        raise RuntimeError(f'{missing} transaction(s) were not backfilled; rerun the migration.')
+
+    # 5. Swap the numeric columns in
+    with op.batch_alter_table('transactions') as batch_op:
+        for name, type_ in AMOUNT_COLUMNS.items():
+            batch_op.drop_column(name)
+            batch_op.alter_column(f'{name}_numeric', new_column_name=name, existing_type=type_, nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('transactions') as batch_op:
+        for name, type_ in AMOUNT_COLUMNS.items():
+            batch_op.alter_column(
+                name,
+                existing_type=type_,
+                type_=sa.String(length=50),
+                existing_nullable=False,
+                postgresql_using=f'{name}::text'
+            )
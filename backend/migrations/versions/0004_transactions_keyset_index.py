@@ -0,0 +1,38 @@
+"""Keyset pagination index for transaction listings
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def _indexes(table):
+    return {i['name'] for i in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    if 'ix_transactions_user_created_id' in _indexes('transactions'):
+        return
+
+    # Build without blocking writes on PostgreSQL
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_user_created_id',
+            'transactions',
+            ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    op.drop_index('ix_transactions_user_created_id', table_name='transactions')
@@ -0,0 +1,54 @@
+"""Outbox table for asynchronous smart contract writes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def _tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    if 'contract_outbox' in _tables():
+        return
+
+    op.create_table(
+        'contract_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('transaction_id', sa.Integer(), nullable=True),
+        sa.Column('method', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('available_at', sa.DateTime(), nullable=True),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('contract_transaction_id', sa.String(length=200), nullable=True),
+        sa.Column('receipt', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['transaction_id'], ['transactions.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_contract_outbox_transaction_id', 'contract_outbox', ['transaction_id'])
+    op.create_index('ix_contract_outbox_status_available', 'contract_outbox', ['status', 'available_at'])
+
+
+def downgrade():
+    op.drop_index('ix_contract_outbox_status_available', table_name='contract_outbox')
+    op.drop_index('ix_contract_outbox_transaction_id', table_name='contract_outbox')
+    op.drop_table('contract_outbox')
@@ -0,0 +1,42 @@
+"""Versioned exchange rate snapshots
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def _tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    if 'exchange_rate_snapshots' in _tables():
+        return
+
+    op.create_table(
+        'exchange_rate_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('provider', sa.String(length=50), nullable=False),
+        sa.Column('currency', sa.String(length=10), nullable=True),
+        sa.Column('kes_to_hbar', sa.Numeric(precision=28, scale=12), nullable=False),
+        sa.Column('hbar_to_kes', sa.Numeric(precision=28, scale=12), nullable=False),
+        sa.Column('provider_updated_at', sa.String(length=50), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('fetched_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('exchange_rate_snapshots')
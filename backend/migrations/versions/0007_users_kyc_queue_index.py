@@ -0,0 +1,38 @@
+"""KYC review queue index on users
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def _indexes(table):
+    return {i['name'] for i in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    if 'ix_users_kyc_status_submitted' in _indexes('users'):
+        return
+
+    # Build without blocking writes on PostgreSQL
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_kyc_status_submitted',
+            'users',
+            ['kyc_status', 'kyc_submitted_at', 'id'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    op.drop_index('ix_users_kyc_status_submitted', table_name='users')
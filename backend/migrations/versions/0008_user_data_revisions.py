@@ -0,0 +1,75 @@
+"""Revisions and tombstones for user data delta sync
+
+Adds users.data_revision (per-user change counter), user_data.revision and
+the user_data_tombstones table. Existing entries get revision 1, and users
+holding data start at data_revision 1, so a sync with since=0 returns them.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def _tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _columns(table):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _indexes(table):
+    return {i['name'] for i in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # Tables created by db.create_all() may already have the new columns
+    if 'data_revision' not in _columns('users'):
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.add_column(sa.Column('data_revision', sa.BigInteger(), nullable=False, server_default='0'))
+        op.execute(
+            'UPDATE users SET data_revision = 1 '
+            'WHERE id IN (SELECT DISTINCT user_id FROM user_data)'
+        )
+    
+    if 'revision' not in _columns('user_data'):
+        with op.batch_alter_table('user_data') as batch_op:
+            batch_op.add_column(sa.Column('revision', sa.BigInteger(), nullable=False, server_default='0'))
+        op.execute('UPDATE user_data SET revision = 1')
+    
+    if 'ix_user_data_user_revision' not in _indexes('user_data'):
+        op.create_index('ix_user_data_user_revision', 'user_data', ['user_id', 'revision'])
+    
+    if 'user_data_tombstones' not in _tables():
+        op.create_table(
+            'user_data_tombstones',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('key', sa.String(length=100), nullable=False),
+            sa.Column('revision', sa.BigInteger(), nullable=False),
+            sa.Column('deleted_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'key', name='unique_user_tombstone_key')
+        )
+        op.create_index('ix_user_data_tombstones_user_revision', 'user_data_tombstones', ['user_id', 'revision'])
+
+
+def downgrade():
+    op.drop_index('ix_user_data_tombstones_user_revision', table_name='user_data_tombstones')
+    op.drop_table('user_data_tombstones')
+    op.drop_index('ix_user_data_user_revision', table_name='user_data')
+    with op.batch_alter_table('user_data') as batch_op:
+        batch_op.drop_column('revision')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('data_revision')
@@ -0,0 +1,116 @@
+"""Typed value columns on user_data
+
+Adds user_data.value_json (JSONB on PostgreSQL, JSON elsewhere),
+value_number and value_bool, and fills the one matching each row's data_type
+from the value text in id-ordered batches. The text column is kept, so
+downgrading only drops the new columns. Rows whose text cannot be parsed are
+left with NULL typed columns and keep being read from the text.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-16 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+import json
+import logging
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+JSON_TYPE = sa.JSON(none_as_null=True).with_variant(postgresql.JSONB(none_as_null=True), 'postgresql')
+
+user_data = sa.table(
+    'user_data',
+    sa.column('id', sa.Integer),
+    sa.column('value', sa.Text),
+    sa.column('data_type', sa.String),
+    sa.column('value_json', JSON_TYPE),
+    sa.column('value_number', sa.Float),
+    sa.column('value_bool', sa.Boolean),
+)
+
+
+def _columns(table):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _typed_value(data_type, value):
+    """Column name and parsed value for a row, or None if it cannot be parsed."""
+    if value is None:
+        return None
+    try:
+        if data_type == 'json':
+            return 'value_json', json.loads(value)
+        elif data_type == 'number':
+            return 'value_number', float(value)
+    except ValueError:
+        return None
+    if data_type == 'boolean':
+        return 'value_bool', value.lower() == 'true'
+    return None
+
+
+def upgrade():
+    existing = _columns('user_data')
+    with op.batch_alter_table('user_data') as batch_op:
+        if 'value_json' not in existing:
+            batch_op.add_column(sa.Column('value_json', JSON_TYPE, nullable=True))
+        if 'value_number' not in existing:
+            batch_op.add_column(sa.Column('value_number', sa.Float(), nullable=True))
+        if 'value_bool' not in existing:
+            batch_op.add_column(sa.Column('value_bool', sa.Boolean(), nullable=True))
+
+    # Backfill in batches; rows already filled (e.g. by a rerun) are skipped
+    bind = op.get_bind()
+    last_id = 0
+    skipped = 0
+    while True:
+        rows = bind.execute(
+            sa.select(user_data.c.id, user_data.c.data_type, user_data.c.value)
+            .where(
+                user_data.c.id > last_id,
+                user_data.c.data_type.in_(('json', 'number', 'boolean')),
+                user_data.c.value_json.is_(None),
+                user_data.c.value_number.is_(None),
+                user_data.c.value_bool.is_(None)
+            )
+            .order_by(user_data.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        for row in rows:
+            typed = _typed_value(row.data_type, row.value)
+            if typed is None:
+                skipped += 1
+                continue
+            column, value = typed
+            bind.execute(
+                user_data.update()
+                .where(user_data.c.id == row.id)
+                .values({column: value})
+            )
+
+        last_id = rows[-1].id
+
+    if skipped:
+        logger.warning('%d user_data row(s) could not be parsed and keep only their value text', skipped)
+
+
+def downgrade():
+    with op.batch_alter_table('user_data') as batch_op:
+        batch_op.drop_column('value_bool')
+        batch_op.drop_column('value_number')
+        batch_op.drop_column('value_json')
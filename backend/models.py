@@ -1,11 +1,74 @@
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import JSONB
 import bcrypt
 import json
 
 db = SQLAlchemy()
 
 
+def parse_amount(value, precision=28, scale=8):
+    """
+    Parse a money amount from user input into a Decimal.
+    
+    Args:
+        value: Amount as a string or number
+        precision: Total digits allowed by the target NUMERIC column
+        scale: Decimal places allowed by the target NUMERIC column
+    
+    Raises:
+        ValueError: If the value is not a finite number or does not fit
+            NUMERIC(precision, scale)
+    """
+    try:
+        amount = Decimal(str(value).strip().replace(',', ''))
+    except (InvalidOperation, TypeError):
+        raise ValueError(f'Invalid amount: {value!r}')
+    
+    if not amount.is_finite():
+        raise ValueError(f'Invalid amount: {value!r}')
+    if amount.normalize().as_tuple().exponent < -scale:
+        raise ValueError(f'Amount has more than {scale} decimal places: {value!r}')
+    if amount and amount.adjusted() >= precision - scale:
+        raise ValueError(f'Amount is too large: {value!r}')
+    return amount
+
+
+def dialect_insert(model):
+    """
+    INSERT construct for the session's database, with ON CONFLICT support.
+    
+    Returns:
+        A PostgreSQL or SQLite insert() (on_conflict_do_nothing/do_update),
+        or None on dialects without ON CONFLICT
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(model)
+
+
+def format_amount(value, places=2):
+    """
+    Format a numeric amount as a plain string.
+    
+    Amounts keep at least `places` decimals ("100.50", "0.10"), as they were
+    shown before the columns became NUMERIC; further trailing zeros from the
+    column scale are dropped.
+    """
+    if value is None:
+        return None
+    amount = Decimal(value).normalize()
+    if amount.as_tuple().exponent > -places:
+        amount = amount.quantize(Decimal(1).scaleb(-places))
+    return format(amount, 'f')
+
+
 class User(db.Model):
     """User model linked to Hedera wallet address."""
     __tablename__ = 'users'
@@ -34,6 +97,9 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     is_email_verified = db.Column(db.Boolean, default=False)
     
+    # Last revision assigned to this user's data (see UserData.revision)
+    data_revision = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -44,6 +110,11 @@ class User(db.Model):
     kyc_documents = db.relationship('KYCDocument', back_populates='user', lazy=True, cascade='all, delete-orphan')
     user_data = db.relationship('UserData', back_populates='user', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        # KYC review queue: pending submissions, oldest first
+        db.Index('ix_users_kyc_status_submitted', 'kyc_status', 'kyc_submitted_at', 'id'),
+    )
+    
     def set_password(self, password):
         """Hash and set the password."""
         self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -206,8 +277,8 @@ class Transaction(db.Model):
     
     # Transaction Details
     transaction_type = db.Column(db.String(20), nullable=False)  # 'onramp' or 'offramp'
-    amount = db.Column(db.String(50), nullable=False)  # Crypto amount
-    fiat_amount = db.Column(db.String(50), nullable=False)  # Fiat amount
+    amount = db.Column(db.Numeric(28, 8), nullable=False)  # Crypto amount
+    fiat_amount = db.Column(db.Numeric(20, 8), nullable=False)  # Fiat amount
     currency = db.Column(db.String(10), default='USD')
     
     # Status
@@ -217,6 +288,10 @@ class Transaction(db.Model):
     hedera_transaction_id = db.Column(db.String(200))
     hedera_transaction_hash = db.Column(db.String(200))
     
+    # Payment Provider References (indexed for callback lookups)
+    intersend_transaction_id = db.Column(db.String(100), index=True)
+    intersend_reference = db.Column(db.String(100), index=True)
+    
     # Additional Information
     payment_method = db.Column(db.String(50))  # bank_transfer, card, etc.
     notes = db.Column(db.Text)
@@ -230,14 +305,21 @@ class Transaction(db.Model):
     # Relationships
     user = db.relationship('User', back_populates='transactions')
     
+    __table_args__ = (
+        # Covers per-user counts grouped by status and type
+        db.Index('ix_transactions_user_status_type', 'user_id', 'status', 'transaction_type'),
+        # Keyset pagination of a user's history, newest first
+        db.Index('ix_transactions_user_created_id', 'user_id', db.text('created_at DESC'), db.text('id DESC')),
+    )
+    
     def to_dict(self):
         """Convert transaction object to dictionary."""
         return {
             'id': self.id,
             'user_id': self.user_id,
             'transaction_type': self.transaction_type,
-            'amount': self.amount,
-            'fiat_amount': self.fiat_amount,
+            'amount': format_amount(self.amount),
+            'fiat_amount': format_amount(self.fiat_amount),
             'currency': self.currency,
             'status': self.status,
             'hedera_transaction_id': self.hedera_transaction_id,
@@ -251,6 +333,85 @@ class Transaction(db.Model):
         }
 
 
+class ContractOutbox(db.Model):
+    """Smart contract call queued with its transaction and submitted by the outbox worker."""
+    __tablename__ = 'contract_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), index=True)
+    
+    # Call Details
+    method = db.Column(db.String(100), nullable=False)  # HederaService method name
+    payload = db.Column(db.Text, nullable=False)  # JSON keyword arguments
+    
+    # Delivery State
+    status = db.Column(db.String(20), default='pending')  # pending, processing, completed, failed, cancelled
+    attempts = db.Column(db.Integer, default=0)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow)  # Earliest next attempt
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    
+    # Result
+    contract_transaction_id = db.Column(db.String(200))
+    receipt = db.Column(db.Text)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+    
+    # Relationships
+    transaction = db.relationship('Transaction')
+    
+    __table_args__ = (
+        # Worker polling: next due entries by status
+        db.Index('ix_contract_outbox_status_available', 'status', 'available_at'),
+    )
+    
+    def to_dict(self):
+        """Convert outbox entry to dictionary."""
+        return {
+            'id': self.id,
+            'transaction_id': self.transaction_id,
+            'method': self.method,
+            'status': self.status,
+            'attempts': self.attempts,
+            'contract_transaction_id': self.contract_transaction_id,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+
+class ExchangeRateSnapshot(db.Model):
+    """Provider exchange rates; each row is one version of the published rates."""
+    __tablename__ = 'exchange_rate_snapshots'
+    
+    id = db.Column(db.Integer, primary_key=True)  # Snapshot version
+    provider = db.Column(db.String(50), nullable=False)  # intersend, intersend_fallback
+    currency = db.Column(db.String(10), default='KES')
+    kes_to_hbar = db.Column(db.Numeric(28, 12), nullable=False)  # 1 KES = X HBAR
+    hbar_to_kes = db.Column(db.Numeric(28, 12), nullable=False)  # 1 HBAR = X KES
+    provider_updated_at = db.Column(db.String(50))  # last_updated as reported by the provider
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow)  # Last time the provider confirmed these rates
+    
+    def to_dict(self):
+        """Convert snapshot to the /api/intersend/rates response shape."""
+        return {
+            'KES_TO_HBAR': float(self.kes_to_hbar),
+            'HBAR_TO_KES': float(self.hbar_to_kes),
+            'last_updated': self.provider_updated_at or (self.fetched_at.isoformat() if self.fetched_at else None),
+            'currency': self.currency,
+            'provider': self.provider,
+            'version': self.id,
+            'fetched_at': self.fetched_at.isoformat() if self.fetched_at else None
+        }
+
+
 class KYCDocument(db.Model):
     """KYC Document model for storing user verification documents."""
     __tablename__ = 'kyc_documents'
@@ -303,13 +464,22 @@ class UserData(db.Model):
     
     # Data Fields
     key = db.Column(db.String(100), nullable=False)
-    value = db.Column(db.Text)
+    value = db.Column(db.Text)  # Text form of every value
     data_type = db.Column(db.String(20), default='string')  # string, json, number, boolean
     
+    # Typed copy of the value, in the column for its data_type (others NULL);
+    # read without parsing and filterable in SQL
+    value_json = db.Column(db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql'))
+    value_number = db.Column(db.Float)
+    value_bool = db.Column(db.Boolean)
+    
     # Metadata
     is_public = db.Column(db.Boolean, default=False)
     category = db.Column(db.String(50))  # For organizing data
     
+    # Sync cursor: users.data_revision at the entry's last write
+    revision = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -320,32 +490,46 @@ class UserData(db.Model):
     # Unique constraint on user_id and key combination
     __table_args__ = (
         db.UniqueConstraint('user_id', 'key', name='unique_user_key'),
+        # Delta sync: a user's entries changed after a revision
+        db.Index('ix_user_data_user_revision', 'user_id', 'revision'),
     )
     
+    # Columns written by set_value / serialize_value
+    VALUE_COLUMNS = ('data_type', 'value', 'value_json', 'value_number', 'value_bool')
+    
     def get_value(self):
-        """Get the parsed value based on data type."""
+        """Get the value from the typed column for its data type."""
+        # Rows not yet backfilled by migration 0009 only have the text
         if self.data_type == 'json':
-            return json.loads(self.value)
+            return self.value_json if self.value_json is not None else json.loads(self.value)
         elif self.data_type == 'number':
-            return float(self.value)
+            return self.value_number if self.value_number is not None else float(self.value)
         elif self.data_type == 'boolean':
-            return self.value.lower() == 'true'
+            return self.value_bool if self.value_bool is not None else self.value.lower() == 'true'
         return self.value
     
-    def set_value(self, value):
-        """Set the value with appropriate serialization."""
+    @staticmethod
+    def serialize_value(value):
+        """
+        Serialize a value for storage.
+        
+        Returns:
+            Dict of VALUE_COLUMNS: data_type, the value text and the typed
+            columns (NULL except the one for data_type)
+        """
+        columns = {'value_json': None, 'value_number': None, 'value_bool': None}
         if isinstance(value, (dict, list)):
-            self.data_type = 'json'
-            self.value = json.dumps(value)
+            return {'data_type': 'json', 'value': json.dumps(value), **columns, 'value_json': value}
         elif isinstance(value, bool):
-            self.data_type = 'boolean'
-            self.value = str(value)
+            return {'data_type': 'boolean', 'value': str(value), **columns, 'value_bool': value}
         elif isinstance(value, (int, float)):
-            self.data_type = 'number'
-            self.value = str(value)
-        else:
-            self.data_type = 'string'
-            self.value = str(value)
+            return {'data_type': 'number', 'value': str(value), **columns, 'value_number': float(value)}
+        return {'data_type': 'string', 'value': str(value), **columns}
+    
+    def set_value(self, value):
+        """Set the value with appropriate serialization."""
+        for name, column_value in self.serialize_value(value).items():
+            setattr(self, name, column_value)
     
     def to_dict(self):
         """Convert user data object to dictionary."""
@@ -357,7 +541,33 @@ class UserData(db.Model):
             'data_type': self.data_type,
             'category': self.category,
             'is_public': self.is_public,
+            'revision': self.revision,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
 
+
+class UserDataTombstone(db.Model):
+    """Deleted user data key, kept so delta syncs can report the deletion."""
+    __tablename__ = 'user_data_tombstones'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    key = db.Column(db.String(100), nullable=False)
+    revision = db.Column(db.BigInteger, nullable=False)  # users.data_revision of the deletion
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # One tombstone per key; deleting it again moves its revision forward
+        db.UniqueConstraint('user_id', 'key', name='unique_user_tombstone_key'),
+        db.Index('ix_user_data_tombstones_user_revision', 'user_id', 'revision'),
+    )
+    
+    def to_dict(self):
+        """Convert tombstone to dictionary."""
+        return {
+            'key': self.key,
+            'revision': self.revision,
+            'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None
+        }
+
@@ -0,0 +1,85 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort key of the last row
+on a page. The next page is fetched with a row-value comparison against that
+key, so each page costs the same index range scan however deep the client
+scrolls.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import DateTime, literal, tuple_
+
+
+def encode_cursor(values):
+    """Encode a list of sort-key values into an opaque cursor string."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """
+    Decode a cursor for the given sort columns.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Invalid cursor')
+    
+    decoded = []
+    for column, value in zip(columns, values):
+        if value is not None and isinstance(column.type, DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise ValueError('Invalid cursor')
+        decoded.append(value)
+    return decoded
+
+
+def keyset_paginate(query, columns, cursor=None, limit=50, descending=True):
+    """
+    Fetch one page of a query ordered by the given unique sort key.
+    
+    Args:
+        query: SQLAlchemy query with filters applied
+        columns: Model columns forming a unique sort key, e.g. (created_at, id)
+        cursor: Cursor returned with the previous page, or None for the first page
+        limit: Page size
+        descending: Sort direction (newest first by default)
+    
+    Returns:
+        Tuple of (items, next_cursor); next_cursor is None on the last page
+    
+    Raises:
+        ValueError: If the cursor is malformed or limit is less than 1
+    """
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    
+    if cursor:
+        key = tuple_(*columns)
+        values = tuple_(*[literal(v, c.type) for c, v in zip(columns, decode_cursor(cursor, columns))])
+        query = query.filter(key < values if descending else key > values)
+    
+    query = query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+    
+    # Fetch one extra row to know whether another page exists
+    items = query.limit(limit + 1).all()
+    if len(items) <= limit:
+        return items, None
+    
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor([getattr(last, c.key) for c in columns])
@@ -0,0 +1,232 @@
+"""
+Precomputed landing-page statistics.
+
+The public stats endpoint is unauthenticated and hit by every landing-page
+visitor, so the snapshot is recomputed by a background refresher instead of
+on each request. Requests are served from an in-process copy, backed by the
+shared cache so that only one worker at a time scans the database.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func
+
+from cache import shared_get_json, shared_set_json, shared_try_lock
+from models import User, Transaction, db, format_amount
+
+SNAPSHOT_KEY = 'public_stats:snapshot'
+REFRESH_LOCK_KEY = 'public_stats:refresh_lock'
+
+
+def compute_public_stats():
+    """Run the statistics queries and return the response payload."""
+    # Total users count
+    total_users = User.query.filter_by(is_active=True).count()
+    
+    # Unique wallet addresses
+    unique_wallets = User.query.with_entities(User.wallet_address).distinct().count()
+    
+    # Totals, completed count and on-ramp/off-ramp breakdown in one grouped query
+    total_transactions = 0
+    completed_transactions = 0
+    onramp_count = 0
+    offramp_count = 0
+    
+    grouped_counts = db.session.query(
+        Transaction.transaction_type,
+        Transaction.status,
+        func.count(Transaction.id)
+    ).group_by(
+        Transaction.transaction_type,
+        Transaction.status
+    ).all()
+    
+    for transaction_type, status, count in grouped_counts:
+        total_transactions += count
+        if status == 'completed':
+            completed_transactions += count
+        if transaction_type == 'onramp':
+            onramp_count += count
+        elif transaction_type == 'offramp':
+            offramp_count += count
+    
+    # Total volume (sum of completed transactions)
+    volume_query = db.session.query(
+        func.sum(Transaction.fiat_amount).label('total_volume')
+    ).filter(
+        Transaction.status == 'completed',
+        Transaction.currency == 'KES'
+    ).first()
+    
+    total_volume_kes = float(volume_query.total_volume or 0) if volume_query.total_volume else 0
+    
+    # Recent transactions (last 10, basic info only) with their wallets in one query
+    recent_txs = db.session.query(Transaction, User.wallet_address).outerjoin(
+        User, User.id == Transaction.user_id
+    ).filter(
+        Transaction.status == 'completed'
+    ).order_by(
+        Transaction.completed_at.desc()
+    ).limit(10).all()
+    
+    recent_transactions = []
+    for tx, wallet_address in recent_txs:
+        # First 8 and last 4 chars of the wallet for privacy
+        wallet_preview = f"{wallet_address[:8]}...{wallet_address[-4:]}" if wallet_address else "Unknown"
+        
+        recent_transactions.append({
+            'id': tx.id,
+            'type': tx.transaction_type,
+            'amount': format_amount(tx.amount),
+            'fiat_amount': format_amount(tx.fiat_amount),
+            'currency': tx.currency,
+            'wallet': wallet_preview,
+            'completed_at': tx.completed_at.isoformat() if tx.completed_at else None
+        })
+    
+    # Transaction activity by day (last 7 days)
+    seven_days_ago = datetime.utcnow() - timedelta(days=7)
+    
+    daily_activity = db.session.query(
+        func.date(Transaction.created_at).label('date'),
+        func.count(Transaction.id).label('count')
+    ).filter(
+        Transaction.created_at >= seven_days_ago
+    ).group_by(
+        func.date(Transaction.created_at)
+    ).all()
+    
+    activity_chart = [
+        {
+            'date': str(item.date),
+            'count': item.count
+        }
+        for item in daily_activity
+    ]
+    
+    return {
+        'total_users': total_users,
+        'total_transactions': total_transactions,
+        'completed_transactions': completed_transactions,
+        'total_volume_kes': round(total_volume_kes, 2),
+        'unique_wallets': unique_wallets,
+        'onramp_count': onramp_count,
+        'offramp_count': offramp_count,
+        'recent_transactions': recent_transactions,
+        'daily_activity': activity_chart,
+        'last_updated': datetime.utcnow().isoformat()
+    }
+
+
+def _make_snapshot(payload, previous=None):
+    """
+    Wrap a payload with its ETag and creation time.
+    
+    The ETag ignores last_updated so unchanged stats keep revalidating with
+    a 304; in that case the previous payload is reused so a given ETag
+    always maps to the same body.
+    """
+    content = {k: v for k, v in payload.items() if k != 'last_updated'}
+    body = json.dumps(content, sort_keys=True)
+    etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+    if previous is not None and previous.get('etag') == etag:
+        payload = previous['payload']
+    return {
+        'payload': payload,
+        'etag': etag,
+        'created_at': time.time()
+    }
+
+
+class PublicStatsCache:
+    """In-process stats snapshot with a background refresher thread."""
+    
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._refresher_pid = None
+    
+    def refresh_interval(self, app=None):
+        app = app or current_app
+        return app.config.get('PUBLIC_STATS_REFRESH_SECONDS', 60)
+    
+    def get(self):
+        """
+        Return the current snapshot ({'payload', 'etag', 'created_at'}).
+        
+        Only a cold process with no shared snapshot computes inline, and
+        concurrent cold requests wait for that single computation.
+        """
+        app = current_app._get_current_object()
+        self._ensure_refresher(app)
+        
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = shared_get_json(SNAPSHOT_KEY) or self._recompute(app)
+            return self._snapshot
+    
+    def _recompute(self, app):
+        previous = self._snapshot or shared_get_json(SNAPSHOT_KEY)
+        snapshot = _make_snapshot(compute_public_stats(), previous)
+        # Keep the shared copy around for a few cycles in case the refresher stalls
+        shared_set_json(SNAPSHOT_KEY, snapshot, self.refresh_interval(app) * 5)
+        return snapshot
+    
+    def refresh(self, app):
+        """
+        Refresh the snapshot once.
+        
+        With a shared store only the worker holding the refresh lock runs
+        the queries; the others pick up its snapshot.
+        """
+        interval = self.refresh_interval(app)
+        with app.app_context():
+            try:
+                if shared_try_lock(REFRESH_LOCK_KEY, max(1, interval - 1)):
+                    snapshot = self._recompute(app)
+                else:
+                    snapshot = shared_get_json(SNAPSHOT_KEY)
+                
+                if snapshot is not None:
+                    self._snapshot = snapshot
+            except Exception as e:
+                print(f"Error refreshing public stats: {e}")
+            finally:
+                db.session.remove()
+    
+    def _ensure_refresher(self, app):
+        # Threads do not survive fork, so each worker starts its own
+        pid = os.getpid()
+        if self._refresher_pid == pid:
+            return
+        
+        with self._lock:
+            if self._refresher_pid == pid:
+                return
+            self._refresher = threading.Thread(
+                target=self._run,
+                args=(app,),
+                name='public-stats-refresher',
+                daemon=True
+            )
+            self._refresher_pid = pid
+            self._refresher.start()
+    
+    def _run(self, app):
+        while True:
+            time.sleep(self.refresh_interval(app))
+            self.refresh(app)
+
+
+public_stats_cache = PublicStatsCache()
@@ -0,0 +1,183 @@
+"""
+Per-request SQL statistics.
+
+SQLAlchemy engine events count the statements each request executes and the
+time spent in the database. Every response carries the totals in the
+X-DB-Queries and Server-Timing headers. Statements slower than
+SLOW_QUERY_THRESHOLD_MS are logged with their query plan, and
+statement shapes repeated N_PLUS_ONE_THRESHOLD times or more in one request
+are logged as likely N+1 patterns.
+
+Statements run outside a request (background workers, CLI) are not counted.
+Bound parameters are never logged: they carry personal data (emails, phone
+numbers, document numbers).
+"""
+
+import re
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Longest plan text written to the log
+MAX_LOG_CHARS = 2000
+
+# Collapse literal and placeholder lists so that e.g. IN (?, ?) and
+# IN (?, ?, ?) count as the same statement shape
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r'\s+')
+
+_EXPLAIN_PREFIX = {
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN '
+}
+
+
+class QueryStats:
+    """Statements executed during one request."""
+    
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+    
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+
+def statement_shape(statement):
+    """Normalize a statement so repeats with different values compare equal."""
+    shape = _PLACEHOLDER_LIST.sub('(?)', statement)
+    shape = _LITERAL.sub('?', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+def _truncate(text):
+    if len(text) > MAX_LOG_CHARS:
+        return text[:MAX_LOG_CHARS] + '...'
+    return text
+
+
+def _explain(conn, statement, parameters, executemany):
+    """Return the query plan of a slow SELECT, or None."""
+    prefix = _EXPLAIN_PREFIX.get(conn.dialect.name)
+    if prefix is None or executemany:
+        return None
+    if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    
+    # Use a raw DB-API cursor so the EXPLAIN is not itself counted or logged.
+    # On PostgreSQL a failed statement aborts the whole transaction, so the
+    # EXPLAIN runs inside a savepoint that is rolled back if it fails.
+    savepoint = conn.dialect.name == 'postgresql'
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute('SAVEPOINT query_stats_explain')
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+        except Exception as e:
+            if savepoint:
+                cursor.execute('ROLLBACK TO SAVEPOINT query_stats_explain')
+            return f'EXPLAIN failed: {type(e).__name__}'
+        if savepoint:
+            cursor.execute('RELEASE SAVEPOINT query_stats_explain')
+        return plan
+    except Exception as e:
+        return f'EXPLAIN failed: {type(e).__name__}'
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start_time')
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    
+    if not has_request_context():
+        return
+    stats = g.get('_query_stats')
+    if stats is None:
+        return
+    stats.record(statement, duration)
+    
+    threshold = current_app.config['SLOW_QUERY_THRESHOLD_MS']
+    if threshold and duration * 1000 >= threshold:
+        plan = None
+        if current_app.config['SLOW_QUERY_EXPLAIN']:
+            plan = _explain(conn, statement, parameters, executemany)
+        current_app.logger.warning(
+            'Slow query (%.1f ms) in %s %s\n%s%s',
+            duration * 1000,
+            request.method,
+            request.path,
+            statement,
+            f'\nPlan:\n{_truncate(plan)}' if plan else ''
+        )
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('query_start_time'):
+        conn.info['query_start_time'].pop()
+
+
+def _before_request():
+    g._query_stats = QueryStats()
+
+
+def _after_request(response):
+    stats = g.get('_query_stats')
+    if stats is None:
+        return response
+    
+    duration_ms = stats.duration * 1000
+    response.headers['X-DB-Queries'] = str(stats.count)
+    timing = f'db;dur={duration_ms:.1f};desc="{stats.count} queries"'
+    existing = response.headers.get('Server-Timing')
+    response.headers['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+    
+    threshold = current_app.config['N_PLUS_ONE_THRESHOLD']
+    if threshold:
+        for shape, repeats in stats.shapes.most_common():
+            if repeats < threshold:
+                break
+            current_app.logger.warning(
+                'Possible N+1 query in %s %s: statement ran %d times (%d queries, %.1f ms total)\n%s',
+                request.method,
+                request.path,
+                repeats,
+                stats.count,
+                duration_ms,
+                shape
+            )
+    return response
+
+
+def init_query_stats(app):
+    """Register the engine listeners and request hooks when SQL_QUERY_STATS_ENABLED."""
+    if not app.config['SQL_QUERY_STATS_ENABLED']:
+        return
+    
+    # Listen on the Engine class: the listeners are process-wide and only
+    # record statements issued while a request is active
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,115 @@
+"""
+Local quote engine for KES/HBAR conversions.
+
+Mirrors the integer arithmetic of RampHub.sol so quotes match what the
+contract's calculateHbarAmount/calculateKesAmount would return, without a
+ContractCallQuery per quote:
+
+    calculateHbarAmount(kes)  = (kes * kesToHbarRate) / 10**18
+    calculateKesAmount(hbar)  = (hbar * hbarToKesRate) / 10**8
+
+Rates come from getExchangeRates() through HederaService's query cache.
+"""
+
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+UINT256_MAX = 2**256 - 1
+
+# Divisors used by RampHub.sol
+KES_TO_HBAR_DIVISOR = 10**18
+HBAR_TO_KES_DIVISOR = 10**8
+
+
+def _uint256(value: Any) -> int:
+    """Convert a contract value (int or SDK BigInteger) to a Python int."""
+    return int(str(value))
+
+
+def _mul_div(amount: int, rate: int, divisor: int) -> int:
+    """
+    Compute (amount * rate) / divisor with Solidity 0.8 uint256 semantics.
+    
+    Raises:
+        ValueError: If the amount is not a uint256 or the product overflows
+            (the contract would revert)
+    """
+    if isinstance(amount, bool) or not isinstance(amount, int):
+        raise ValueError('Amount must be an integer')
+    if amount < 0 or amount > UINT256_MAX:
+        raise ValueError('Amount out of uint256 range')
+    
+    product = amount * rate
+    if product > UINT256_MAX:
+        raise ValueError('Amount too large: arithmetic overflow')
+    
+    # Solidity division truncates towards zero; operands are non-negative
+    return product // divisor
+
+
+def calculate_hbar_amount(kes_amount: int, kes_to_hbar_rate: int) -> int:
+    """HBAR (tinybar-scaled) for a KES amount in wei, as calculateHbarAmount."""
+    return _mul_div(kes_amount, kes_to_hbar_rate, KES_TO_HBAR_DIVISOR)
+
+
+def calculate_kes_amount(hbar_amount: int, hbar_to_kes_rate: int) -> int:
+    """KES (wei-scaled) for an HBAR amount in tinybars, as calculateKesAmount."""
+    return _mul_div(hbar_amount, hbar_to_kes_rate, HBAR_TO_KES_DIVISOR)
+
+
+class RateSnapshot:
+    """Exchange rates read from the contract at one point in time."""
+    
+    def __init__(self, kes_to_hbar: int, hbar_to_kes: int, fetched_at: Optional[datetime] = None):
+        self.kes_to_hbar = kes_to_hbar
+        self.hbar_to_kes = hbar_to_kes
+        self.fetched_at = fetched_at or datetime.utcnow()
+        # Derived from the rates, so every worker reports the same version
+        self.version = hashlib.sha1(f'{kes_to_hbar}:{hbar_to_kes}'.encode()).hexdigest()[:12]
+    
+    def quote_hbar(self, kes_amount: int) -> int:
+        return calculate_hbar_amount(kes_amount, self.kes_to_hbar)
+    
+    def quote_kes(self, hbar_amount: int) -> int:
+        return calculate_kes_amount(hbar_amount, self.hbar_to_kes)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'kes_to_hbar': str(self.kes_to_hbar),
+            'hbar_to_kes': str(self.hbar_to_kes),
+            'version': self.version,
+            'fetched_at': self.fetched_at.isoformat()
+        }
+
+
+class QuoteEngine:
+    """Quotes conversions locally from the contract's current rates."""
+    
+    def __init__(self, service):
+        self.service = service
+        self._snapshot = None
+        self._source = None
+        self._lock = threading.Lock()
+    
+    def snapshot(self) -> RateSnapshot:
+        """
+        Get the current rate snapshot.
+        
+        Raises:
+            RuntimeError: If the rates cannot be read from the contract
+        """
+        result = self.service.get_rates_simple()
+        if not result['success']:
+            raise RuntimeError(result['error'])
+        
+        data = result['data']
+        with self._lock:
+            # The service returns the same result object until its cache refreshes
+            if self._source is not data:
+                snapshot = RateSnapshot(_uint256(data.getUint256(0)), _uint256(data.getUint256(1)))
+                if self._snapshot is None or self._snapshot.version != snapshot.version:
+                    self._snapshot = snapshot
+                self._source = data
+            return self._snapshot
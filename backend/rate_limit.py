@@ -0,0 +1,233 @@
+"""
+Request rate limiting.
+
+Token buckets keyed by user identity (authenticated requests) or client IP.
+Every request passes the global MAX_REQUESTS_PER_MINUTE limit in a
+before_request hook, and sensitive routes add stricter limits with the
+rate_limit decorator. Both run before any database access, so rejected
+requests never reach bcrypt or the database.
+
+Buckets live in the shared store (Redis) when configured, so limits hold
+across gunicorn workers; otherwise each process keeps its own buckets.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+from cache import get_shared_store
+
+# Requests that never count against the global limit. The Intersend callback
+# comes from the provider's few egress IPs, so it gets its own higher limit
+# (INTERSEND_CALLBACK_RATE_LIMIT_PER_MINUTE) instead of the per-client one.
+EXEMPT_PATHS = frozenset(['/api/health', '/api/metrics', '/api/intersend/callback'])
+
+
+class InMemoryBackend:
+    """Per-process token buckets."""
+    
+    # Least recently used buckets are dropped beyond this many keys
+    MAX_KEYS = 10000
+    
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def consume(self, key, capacity, rate, cost=1):
+        """
+        Take cost tokens from the bucket for key.
+        
+        Args:
+            key: Bucket key
+            capacity: Bucket size (burst allowance)
+            rate: Refill rate in tokens per second
+            cost: Tokens this request takes
+            
+        Returns:
+            Tuple of (allowed, remaining tokens, seconds until allowed)
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            
+            if tokens >= cost:
+                tokens -= cost
+                retry_after = 0.0
+                allowed = True
+            else:
+                retry_after = (cost - tokens) / rate
+                allowed = False
+            
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # The oldest buckets are the most likely to have refilled already
+            while len(self._buckets) > self.MAX_KEYS:
+                self._buckets.popitem(last=False)
+        
+        return allowed, tokens, retry_after
+
+
+class RedisBackend:
+    """Token buckets in Redis, shared by every worker."""
+    
+    # Atomic refill-and-take; uses the Redis clock so all hosts agree
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    local retry_after = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    else
+        retry_after = (cost - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens), tostring(retry_after)}
+    """
+    
+    def __init__(self, store):
+        self.store = store
+        self._script = store.register_script(self.SCRIPT)
+    
+    def consume(self, key, capacity, rate, cost=1):
+        allowed, tokens, retry_after = self._script(
+            keys=[f'rate_limit:{key}'],
+            args=[capacity, rate, cost]
+        )
+        return bool(allowed), float(tokens), float(retry_after)
+
+
+_memory_backend = InMemoryBackend()
+_redis_backends = {}
+
+
+def get_backend():
+    """Redis-backed buckets when a shared store is configured, else in-process."""
+    store = get_shared_store()
+    if store is None:
+        return _memory_backend
+    
+    backend = _redis_backends.get(id(store))
+    if backend is None:
+        backend = _redis_backends[id(store)] = RedisBackend(store)
+    return backend
+
+
+def client_ip():
+    """Client address (set PROXY_FIX_X_FOR when running behind a proxy)."""
+    return request.remote_addr or 'unknown'
+
+
+def request_identity():
+    """
+    JWT identity of the request, or None for anonymous/invalid tokens.
+    
+    Only the token signature is checked; no database access.
+    """
+    if '_jwt_identity' in g:
+        return g._jwt_identity
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        return None
+    if identity is not None:
+        g._jwt_identity = identity
+    return identity
+
+
+def _limit_key(scope):
+    if scope == 'identity':
+        identity = request_identity()
+        if identity is not None:
+            return f'user:{identity}'
+    return f'ip:{client_ip()}'
+
+
+def _too_many_requests(limit, retry_after):
+    retry_after = max(1, math.ceil(retry_after))
+    response = jsonify({
+        'error': 'Too many requests',
+        'message': f'Rate limit exceeded. Try again in {retry_after} seconds.',
+        'retry_after': retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    response.headers['X-RateLimit-Limit'] = str(limit)
+    response.headers['X-RateLimit-Remaining'] = '0'
+    return response
+
+
+def check_rate_limit(name, limit, period=60, scope='identity'):
+    """
+    Count the current request against a limit.
+    
+    Args:
+        name: Limit name (separates buckets of different limits)
+        limit: Requests allowed per period
+        period: Period in seconds
+        scope: 'identity' (user if authenticated, else IP) or 'ip'
+        
+    Returns:
+        A 429 response if the limit is exceeded, else None
+    """
+    if not current_app.config.get('RATE_LIMIT_ENABLED', True) or limit <= 0:
+        return None
+    
+    key = f'{name}:{_limit_key(scope)}'
+    try:
+        allowed, _, retry_after = get_backend().consume(key, limit, limit / period)
+    except Exception as e:
+        # Fail open: an unavailable store must not take the API down
+        print(f"Rate limit check failed for {key}: {e}")
+        return None
+    
+    if not allowed:
+        return _too_many_requests(limit, retry_after)
+    return None
+
+
+def enforce_global_rate_limit():
+    """before_request hook applying MAX_REQUESTS_PER_MINUTE to every API request."""
+    if request.method == 'OPTIONS' or request.path in EXEMPT_PATHS:
+        return None
+    return check_rate_limit('global', current_app.config.get('MAX_REQUESTS_PER_MINUTE', 60))
+
+
+def rate_limit(limit, period=60, scope='ip'):
+    """
+    Decorator adding a stricter limit to a route.
+    
+    Args:
+        limit: Requests per period, or the name of a config key holding it
+        period: Period in seconds
+        scope: 'ip' or 'identity'
+    """
+    def decorator(fn):
+        name = f'{fn.__module__}.{fn.__name__}'
+        
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            max_requests = current_app.config.get(limit, 0) if isinstance(limit, str) else limit
+            limited = check_rate_limit(name, max_requests, period, scope)
+            if limited is not None:
+                return limited
+            return fn(*args, **kwargs)
+        
+        return wrapper
+    return decorator
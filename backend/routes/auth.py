@@ -7,6 +7,7 @@ from flask_jwt_extended import create_access_token, create_refresh_token, get_jw
 from datetime import datetime
 from models import User, db
 from middleware import token_required, validate_request_data, get_current_user
+from rate_limit import rate_limit
 import re
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -126,6 +127,7 @@ def signup():
 
 
 @auth_bp.route('/signin', methods=['POST'])
+@rate_limit('SIGNIN_RATE_LIMIT_PER_MINUTE')
 @validate_request_data(['email', 'password'])
 def signin():
     """
@@ -164,6 +166,7 @@ def signin():
 
 
 @auth_bp.route('/signin/wallet', methods=['POST'])
+@rate_limit('SIGNIN_RATE_LIMIT_PER_MINUTE')
 @validate_request_data(['wallet_address'])
 def signin_wallet():
     """
@@ -2,16 +2,29 @@
 CRUD routes for user data management.
 """
 
-from flask import Blueprint, request, jsonify
-from models import UserData, db
-from middleware import token_required, validate_request_data, get_current_user, active_user_required
+import json
+from datetime import datetime
+from flask import Blueprint, current_app, request, jsonify
+from sqlalchemy import Boolean, case, delete, exists, func, insert, literal_column, select, update
+from sqlalchemy.exc import IntegrityError
+from models import User, UserData, UserDataTombstone, db, dialect_insert
+from middleware import validate_request_data, get_current_user, user_required
 
 crud_bp = Blueprint('crud', __name__, url_prefix='/api/data')
 
+BULK_CONFLICT_MODES = ('skip', 'replace', 'error')
+
+# JSON type names reported for each filterable value type, by dialect
+# (jsonb_typeof on PostgreSQL, json_type on SQLite)
+JSON_PATH_TYPES = {
+    'postgresql': {'number': ('number',), 'string': ('string',), 'boolean': ('boolean',)},
+    'sqlite': {'number': ('integer', 'real'), 'string': ('text',), 'boolean': ('true', 'false')}
+}
+JSON_PATH_ACCESSORS = {'number': 'as_float', 'string': 'as_string', 'boolean': 'as_boolean'}
+
 
 @crud_bp.route('/', methods=['GET'])
-@token_required
-@active_user_required
+@user_required()
 def get_all_user_data():
     """
     Get all data entries for the current user.
@@ -19,12 +32,34 @@ def get_all_user_data():
     Query parameters:
     - category: Filter by category (optional)
     - is_public: Filter by public/private (optional, boolean)
+    - since: Revision from a previous response; only entries changed after
+      it are returned, plus the keys deleted since under 'deleted'
+    - min_value / max_value: Numeric range (inclusive) on number entries,
+      or on the number at json_path when given
+    - json_path: Dotted path into JSON entries (e.g. 'settings.theme',
+      'items.0.id'); only entries where the path exists are returned
+    - json_value: Value at json_path, as a JSON literal ('"dark"', '5',
+      'true'); text that is not valid JSON is compared as a string
+    
+    Every response carries 'revision', the cursor to pass as 'since' on the
+    next sync.
     """
     user = get_current_user()
     
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'error': 'since must be an integer revision'}), 400
+    
+    # Read before the entries: a change committed in between is sent again
+    # next time rather than skipped
+    revision = user.data_revision
+    
     # Build query
     query = UserData.query.filter_by(user_id=user.id)
     
@@ -38,18 +73,118 @@ def get_all_user_data():
         is_public_bool = is_public.lower() == 'true'
         query = query.filter_by(is_public=is_public_bool)
     
-    # Execute query
-    data_entries = query.all()
+    conditions, error = _value_filters(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    query = query.filter(*conditions)
+    
+    if since is None:
+        # Execute query
+        data_entries = query.all()
+        
+        return jsonify({
+            'count': len(data_entries),
+            'revision': revision,
+            'data': [entry.to_dict() for entry in data_entries]
+        }), 200
+    
+    data_entries = query.filter(UserData.revision > since).order_by(UserData.revision).all()
+    
+    # Keys deleted since the cursor and not created again afterwards
+    deleted = UserDataTombstone.query.filter(
+        UserDataTombstone.user_id == user.id,
+        UserDataTombstone.revision > since,
+        ~exists().where(UserData.user_id == UserDataTombstone.user_id, UserData.key == UserDataTombstone.key)
+    ).order_by(UserDataTombstone.revision).all()
     
     return jsonify({
         'count': len(data_entries),
-        'data': [entry.to_dict() for entry in data_entries]
+        'since': since,
+        'revision': revision,
+        'data': [entry.to_dict() for entry in data_entries],
+        'deleted': [tombstone.to_dict() for tombstone in deleted]
     }), 200
 
 
+def _value_filters(args):
+    """
+    Build SQL conditions on typed values from the listing's query parameters.
+    
+    Returns:
+        Tuple of (conditions, error message)
+    """
+    bounds = {}
+    for name in ('min_value', 'max_value'):
+        if name in args:
+            try:
+                bounds[name] = float(args[name])
+            except ValueError:
+                return [], f'{name} must be a number'
+    
+    path = args.get('json_path')
+    if path is None:
+        if 'json_value' in args:
+            return [], 'json_value requires json_path'
+        return _range(UserData.value_number, bounds), None
+    
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in JSON_PATH_TYPES:
+        return [], 'json_path filters are not supported on this database'
+    
+    segments = path.split('.')
+    if not all(segments) or any('"' in segment for segment in segments):
+        return [], 'Invalid json_path'
+    path = tuple(int(segment) if segment.isdigit() else segment for segment in segments)
+    
+    # JSON type of the element at the path; NULL where the path is missing
+    if dialect == 'postgresql':
+        kind = func.jsonb_typeof(UserData.value_json[path])
+    else:
+        sqlite_path = '$' + ''.join(
+            f'[{segment}]' if isinstance(segment, int) else f'."{segment}"' for segment in path
+        )
+        kind = func.json_type(UserData.value_json, sqlite_path)
+    
+    def element(value_type):
+        # Cast only elements of the matching JSON type, so e.g. a string at
+        # the path never reaches a numeric cast
+        accessor = getattr(UserData.value_json[path], JSON_PATH_ACCESSORS[value_type])
+        return case((kind.in_(JSON_PATH_TYPES[dialect][value_type]), accessor()))
+    
+    conditions = [UserData.data_type == 'json', kind.is_not(None)]
+    if bounds:
+        conditions += _range(element('number'), bounds)
+    
+    if 'json_value' in args:
+        try:
+            expected = json.loads(args['json_value'])
+        except ValueError:
+            expected = args['json_value']
+        
+        if isinstance(expected, bool):
+            value_type = 'boolean'
+        elif isinstance(expected, (int, float)):
+            value_type = 'number'
+        elif isinstance(expected, str):
+            value_type = 'string'
+        else:
+            return [], 'json_value must be a string, number or boolean'
+        conditions.append(element(value_type) == expected)
+    
+    return conditions, None
+
+
+def _range(expression, bounds):
+    conditions = []
+    if 'min_value' in bounds:
+        conditions.append(expression >= bounds['min_value'])
+    if 'max_value' in bounds:
+        conditions.append(expression <= bounds['max_value'])
+    return conditions
+
+
 @crud_bp.route('/<int:data_id>', methods=['GET'])
-@token_required
-@active_user_required
+@user_required()
 def get_user_data(data_id):
     """Get a specific data entry by ID."""
     user = get_current_user()
@@ -68,8 +203,7 @@ def get_user_data(data_id):
 
 
 @crud_bp.route('/key/<string:key>', methods=['GET'])
-@token_required
-@active_user_required
+@user_required()
 def get_user_data_by_key(key):
     """Get a data entry by key."""
     user = get_current_user()
@@ -88,8 +222,7 @@ def get_user_data_by_key(key):
 
 
 @crud_bp.route('/', methods=['POST'])
-@token_required
-@active_user_required
+@user_required()
 @validate_request_data(['key', 'value'])
 def create_user_data():
     """
@@ -122,7 +255,8 @@ def create_user_data():
             user_id=user.id,
             key=data['key'],
             category=data.get('category'),
-            is_public=data.get('is_public', False)
+            is_public=data.get('is_public', False),
+            revision=_next_revision(user.id)
         )
         data_entry.set_value(data['value'])
         
@@ -139,9 +273,106 @@ def create_user_data():
         return jsonify({'error': 'Failed to create data entry', 'message': str(e)}), 500
 
 
+@crud_bp.route('/batch-get', methods=['POST'])
+@user_required()
+@validate_request_data(['keys'])
+def batch_get_user_data():
+    """
+    Get many data entries by key in one request.
+    
+    Required fields:
+    - keys: Array of keys (at most USER_DATA_BULK_MAX_ENTRIES)
+    
+    Entries are returned in request order; keys with no entry are listed
+    under 'missing'.
+    """
+    user = get_current_user()
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    keys, error = _parse_keys(request.get_json()['keys'])
+    if error:
+        return jsonify({'error': error}), 400
+    
+    entries = {
+        entry.key: entry
+        for entry in UserData.query.filter(UserData.user_id == user.id, UserData.key.in_(keys))
+    }
+    
+    return jsonify({
+        'count': len(entries),
+        'data': [entries[key].to_dict() for key in keys if key in entries],
+        'missing': [key for key in keys if key not in entries]
+    }), 200
+
+
+@crud_bp.route('/batch-delete', methods=['POST'])
+@user_required()
+@validate_request_data(['keys'])
+def batch_delete_user_data():
+    """
+    Delete many data entries by key in one statement.
+    
+    Required fields:
+    - keys: Array of keys (at most USER_DATA_BULK_MAX_ENTRIES)
+    
+    Keys with no entry are listed under 'missing'.
+    """
+    user = get_current_user()
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    keys, error = _parse_keys(request.get_json()['keys'])
+    if error:
+        return jsonify({'error': error}), 400
+    
+    stmt = delete(UserData).where(UserData.user_id == user.id, UserData.key.in_(keys))
+    
+    try:
+        revision = _next_revision(user.id)
+        if db.session.get_bind().dialect.delete_returning:
+            deleted = set(db.session.scalars(stmt.returning(UserData.key)).all())
+        else:
+            deleted = set(db.session.scalars(
+                select(UserData.key).where(UserData.user_id == user.id, UserData.key.in_(keys))
+            ).all())
+            db.session.execute(stmt)
+        _record_deletions(user.id, deleted, revision)
+        db.session.commit()
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to delete data entries', 'message': str(e)}), 500
+    
+    return jsonify({
+        'message': f'Deleted {len(deleted)} entries',
+        'deleted': [key for key in keys if key in deleted],
+        'missing': [key for key in keys if key not in deleted]
+    }), 200
+
+
+def _parse_keys(keys):
+    """
+    Validate a list of keys from a batch request.
+    
+    Returns:
+        Tuple of (unique keys in request order, error message or None)
+    """
+    max_keys = current_app.config['USER_DATA_BULK_MAX_ENTRIES']
+    
+    if not isinstance(keys, list) or not keys:
+        return None, 'keys must be a non-empty array'
+    if len(keys) > max_keys:
+        return None, f'At most {max_keys} keys per request'
+    if not all(isinstance(key, str) for key in keys):
+        return None, 'keys must be strings'
+    return list(dict.fromkeys(keys)), None
+
+
 @crud_bp.route('/<int:data_id>', methods=['PUT'])
-@token_required
-@active_user_required
+@user_required()
 def update_user_data(data_id):
     """
     Update an existing data entry.
@@ -164,6 +395,8 @@ def update_user_data(data_id):
     data = request.get_json()
     
     try:
+        data_entry.revision = _next_revision(user.id)
+        
         # Update fields if provided
         if 'value' in data:
             data_entry.set_value(data['value'])
@@ -187,8 +420,7 @@ def update_user_data(data_id):
 
 
 @crud_bp.route('/key/<string:key>', methods=['PUT'])
-@token_required
-@active_user_required
+@user_required()
 def update_user_data_by_key(key):
     """
     Update a data entry by key.
@@ -211,6 +443,8 @@ def update_user_data_by_key(key):
     data = request.get_json()
     
     try:
+        data_entry.revision = _next_revision(user.id)
+        
         # Update fields if provided
         if 'value' in data:
             data_entry.set_value(data['value'])
@@ -234,8 +468,7 @@ def update_user_data_by_key(key):
 
 
 @crud_bp.route('/<int:data_id>', methods=['DELETE'])
-@token_required
-@active_user_required
+@user_required()
 def delete_user_data(data_id):
     """Delete a data entry by ID."""
     user = get_current_user()
@@ -249,6 +482,7 @@ def delete_user_data(data_id):
         return jsonify({'error': 'Data entry not found'}), 404
     
     try:
+        _record_deletions(user.id, [data_entry.key], _next_revision(user.id))
         db.session.delete(data_entry)
         db.session.commit()
         
@@ -262,8 +496,7 @@ def delete_user_data(data_id):
 
 
 @crud_bp.route('/key/<string:key>', methods=['DELETE'])
-@token_required
-@active_user_required
+@user_required()
 def delete_user_data_by_key(key):
     """Delete a data entry by key."""
     user = get_current_user()
@@ -277,6 +510,7 @@ def delete_user_data_by_key(key):
         return jsonify({'error': 'Data entry not found'}), 404
     
     try:
+        _record_deletions(user.id, [data_entry.key], _next_revision(user.id))
         db.session.delete(data_entry)
         db.session.commit()
         
@@ -290,13 +524,15 @@ def delete_user_data_by_key(key):
 
 
 @crud_bp.route('/upsert', methods=['POST'])
-@token_required
-@active_user_required
+@user_required()
 @validate_request_data(['key', 'value'])
 def upsert_user_data():
     """
     Create or update a data entry (upsert operation).
     
+    Runs as a single INSERT ... ON CONFLICT (user_id, key) DO UPDATE, so
+    concurrent upserts of the same key cannot race.
+    
     Required fields:
     - key: Key for the data entry
     - value: Value to store
@@ -313,40 +549,20 @@ def upsert_user_data():
     data = request.get_json()
     
     try:
-        # Check if entry exists
-        data_entry = UserData.query.filter_by(user_id=user.id, key=data['key']).first()
+        data_entry, created = _upsert_entry(user.id, data)
+        payload = data_entry.to_dict()
+        db.session.commit()
         
-        if data_entry:
-            # Update existing entry
-            data_entry.set_value(data['value'])
-            
-            if 'category' in data:
-                data_entry.category = data['category']
-            
-            if 'is_public' in data:
-                data_entry.is_public = data['is_public']
-            
-            message = 'Data entry updated successfully'
-            status_code = 200
-        else:
-            # Create new entry
-            data_entry = UserData(
-                user_id=user.id,
-                key=data['key'],
-                category=data.get('category'),
-                is_public=data.get('is_public', False)
-            )
-            data_entry.set_value(data['value'])
-            
-            db.session.add(data_entry)
+        if created:
             message = 'Data entry created successfully'
             status_code = 201
-        
-        db.session.commit()
+        else:
+            message = 'Data entry updated successfully'
+            status_code = 200
         
         return jsonify({
             'message': message,
-            'data': data_entry.to_dict()
+            'data': payload
         }), status_code
         
     except Exception as e:
@@ -354,9 +570,69 @@ def upsert_user_data():
         return jsonify({'error': 'Failed to upsert data entry', 'message': str(e)}), 500
 
 
+def _upsert_entry(user_id, data):
+    """
+    Insert or update one entry by (user_id, key).
+    
+    category and is_public are only changed on update when provided.
+    
+    Returns:
+        Tuple of (UserData, created)
+    """
+    values = UserData.serialize_value(data['value'])
+    now = datetime.utcnow()
+    revision = _next_revision(user_id)
+    stmt = dialect_insert(UserData)
+    
+    if stmt is None:
+        # No ON CONFLICT on this database: read, then write
+        data_entry = UserData.query.filter_by(user_id=user_id, key=data['key']).first()
+        created = data_entry is None
+        if created:
+            data_entry = UserData(user_id=user_id, key=data['key'], is_public=False)
+            db.session.add(data_entry)
+        for name, column_value in values.items():
+            setattr(data_entry, name, column_value)
+        data_entry.revision = revision
+        if 'category' in data:
+            data_entry.category = data['category']
+        if 'is_public' in data:
+            data_entry.is_public = data['is_public']
+        db.session.flush()
+        return data_entry, created
+    
+    changes = {**values, 'revision': revision, 'updated_at': now}
+    if 'category' in data:
+        changes['category'] = data['category']
+    if 'is_public' in data:
+        changes['is_public'] = data['is_public']
+    
+    stmt = stmt.values(
+        user_id=user_id,
+        key=data['key'],
+        **values,
+        category=data.get('category'),
+        is_public=data.get('is_public', False),
+        revision=revision,
+        created_at=now,
+        updated_at=now
+    ).on_conflict_do_update(index_elements=['user_id', 'key'], set_=changes)
+    
+    # PostgreSQL: xmax is 0 only for a freshly inserted row version.
+    # Elsewhere an updated row keeps its original created_at.
+    if db.session.get_bind().dialect.name == 'postgresql':
+        created = literal_column('(xmax = 0)', Boolean)
+    else:
+        created = UserData.created_at == now
+    
+    return db.session.execute(
+        stmt.returning(UserData, created),
+        execution_options={'populate_existing': True}
+    ).one()
+
+
 @crud_bp.route('/bulk', methods=['POST'])
-@token_required
-@active_user_required
+@user_required()
 @validate_request_data(['entries'])
 def bulk_create_user_data():
     """
@@ -364,6 +640,13 @@ def bulk_create_user_data():
     
     Required fields:
     - entries: Array of objects with 'key' and 'value' fields
+      (at most USER_DATA_BULK_MAX_ENTRIES)
+    
+    Optional fields:
+    - on_conflict: What to do with keys that already exist
+      - 'skip' (default): leave them unchanged and report them as skipped
+      - 'replace': overwrite their value, category and is_public
+      - 'error': write nothing and return 409 listing the existing keys
     
     Each entry can have:
     - key: Unique key for the data entry
@@ -378,49 +661,197 @@ def bulk_create_user_data():
     
     data = request.get_json()
     entries = data['entries']
+    on_conflict = data.get('on_conflict', 'skip')
+    max_entries = current_app.config['USER_DATA_BULK_MAX_ENTRIES']
     
     if not isinstance(entries, list):
         return jsonify({'error': 'Entries must be an array'}), 400
     
-    created_entries = []
+    if len(entries) > max_entries:
+        return jsonify({'error': f'At most {max_entries} entries per request'}), 400
+    
+    if on_conflict not in BULK_CONFLICT_MODES:
+        return jsonify({'error': f'on_conflict must be one of: {", ".join(BULK_CONFLICT_MODES)}'}), 400
+    
+    # Validate and serialize entries; later duplicates of a key are rejected
+    rows = {}
     errors = []
+    now = datetime.utcnow()
     
     for entry in entries:
-        if 'key' not in entry or 'value' not in entry:
+        if not isinstance(entry, dict) or 'key' not in entry or 'value' not in entry:
             errors.append({'entry': entry, 'error': 'Missing key or value'})
             continue
         
-        # Check if key already exists
-        existing = UserData.query.filter_by(user_id=user.id, key=entry['key']).first()
+        key = entry['key']
+        if not isinstance(key, str) or not key or len(key) > UserData.key.type.length:
+            errors.append({'key': key, 'error': 'Invalid key'})
+            continue
         
-        if existing:
-            errors.append({'key': entry['key'], 'error': 'Key already exists'})
+        if key in rows:
+            errors.append({'key': key, 'error': 'Duplicate key in request'})
             continue
         
-        try:
-            data_entry = UserData(
-                user_id=user.id,
-                key=entry['key'],
-                category=entry.get('category'),
-                is_public=entry.get('is_public', False)
-            )
-            data_entry.set_value(entry['value'])
-            
-            db.session.add(data_entry)
-            created_entries.append(entry['key'])
-        except Exception as e:
-            errors.append({'key': entry['key'], 'error': str(e)})
+        rows[key] = {
+            'user_id': user.id,
+            'key': key,
+            **UserData.serialize_value(entry['value']),
+            'category': entry.get('category'),
+            'is_public': entry.get('is_public', False),
+            'created_at': now,
+            'updated_at': now
+        }
     
     try:
-        db.session.commit()
+        # All rows written by this request share one revision
+        if rows:
+            revision = _next_revision(user.id)
+            for row in rows.values():
+                row['revision'] = revision
         
-        return jsonify({
-            'message': f'Created {len(created_entries)} entries',
-            'created': created_entries,
-            'errors': errors
-        }), 201 if created_entries else 400
+        # One lookup for every key in the request
+        existing = dict(db.session.execute(
+            select(UserData.key, UserData.id)
+            .where(UserData.user_id == user.id, UserData.key.in_(list(rows)))
+        ).all()) if rows else {}
         
+        if existing and on_conflict == 'error':
+            db.session.rollback()
+            return jsonify({
+                'error': 'Data entries with these keys already exist',
+                'conflicts': sorted(existing)
+            }), 409
+        
+        created, updated, skipped = _bulk_write(rows, existing, on_conflict, now)
+        db.session.commit()
+        
+    except IntegrityError:
+        # Only reachable without ON CONFLICT support, when a key was created concurrently
+        db.session.rollback()
+        return jsonify({'error': 'Data entries with these keys already exist'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to create entries', 'message': str(e)}), 500
+    
+    if created or updated:
+        status_code = 201
+    else:
+        status_code = 400 if errors else 200
+    
+    return jsonify({
+        'message': f'Created {len(created)} entries',
+        'created': created,
+        'updated': updated,
+        'skipped': skipped,
+        'errors': errors
+    }), status_code
+
 
+def _bulk_write(rows, existing, on_conflict, now):
+    """
+    Write validated bulk rows with one multi-row INSERT.
+    
+    Keys created by a concurrent request after the existence check are
+    handled by ON CONFLICT like any other existing key.
+    
+    Returns:
+        Tuple of (created, updated, skipped) key lists
+    """
+    if not rows:
+        return [], [], []
+    
+    stmt = dialect_insert(UserData)
+    
+    if stmt is None:
+        # No ON CONFLICT: insert new keys, update existing ones by primary key
+        new_rows = [row for key, row in rows.items() if key not in existing]
+        if new_rows:
+            db.session.execute(insert(UserData), new_rows)
+        if on_conflict == 'replace' and existing:
+            db.session.execute(update(UserData), [
+                {**_replace_values(rows[key], now), 'id': data_id} for key, data_id in existing.items()
+            ])
+            return [row['key'] for row in new_rows], sorted(existing), []
+        return [row['key'] for row in new_rows], [], sorted(existing)
+    
+    stmt = stmt.values(list(rows.values()))
+    if on_conflict == 'replace':
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'key'],
+            set_={
+                **{name: stmt.excluded[name] for name in UserData.VALUE_COLUMNS},
+                'category': stmt.excluded.category,
+                'is_public': stmt.excluded.is_public,
+                'revision': stmt.excluded.revision,
+                'updated_at': now
+            }
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=['user_id', 'key'])
+    
+    written = set(db.session.scalars(stmt.returning(UserData.key)).all())
+    
+    if on_conflict == 'replace':
+        return (
+            [key for key in rows if key in written and key not in existing],
+            [key for key in rows if key in written and key in existing],
+            []
+        )
+    return [key for key in rows if key in written], [], [key for key in rows if key not in written]
+
+
+def _replace_values(row, now):
+    return {
+        **{name: row[name] for name in UserData.VALUE_COLUMNS},
+        'category': row['category'],
+        'is_public': row['is_public'],
+        'revision': row['revision'],
+        'updated_at': now
+    }
+
+
+def _next_revision(user_id):
+    """
+    Allocate the next data revision for a user.
+    
+    The increment keeps the user's row locked until commit, so writes commit
+    in revision order and a sync cursor never skips a change.
+    """
+    # Keep users.updated_at: the counter is not a profile change
+    stmt = update(User) \
+        .where(User.id == user_id) \
+        .values(data_revision=User.data_revision + 1, updated_at=User.updated_at) \
+        .execution_options(synchronize_session=False)
+    
+    if db.session.get_bind().dialect.update_returning:
+        return db.session.execute(stmt.returning(User.data_revision)).scalar_one()
+    
+    db.session.execute(stmt)
+    return db.session.scalar(select(User.data_revision).where(User.id == user_id))
+
+
+def _record_deletions(user_id, keys, revision):
+    """Leave tombstones for deleted keys so delta syncs report them."""
+    if not keys:
+        return
+    
+    now = datetime.utcnow()
+    rows = [
+        {'user_id': user_id, 'key': key, 'revision': revision, 'deleted_at': now}
+        for key in keys
+    ]
+    stmt = dialect_insert(UserDataTombstone)
+    
+    if stmt is None:
+        db.session.execute(
+            delete(UserDataTombstone)
+            .where(UserDataTombstone.user_id == user_id, UserDataTombstone.key.in_(list(keys)))
+        )
+        db.session.execute(insert(UserDataTombstone), rows)
+        return
+    
+    stmt = stmt.values(rows)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['user_id', 'key'],
+        set_={'revision': stmt.excluded.revision, 'deleted_at': stmt.excluded.deleted_at}
+    ))
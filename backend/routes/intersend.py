@@ -5,21 +5,16 @@ Supports mobile money payments and transfers via Intersend API.
 
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-from models import Transaction, User, db
-from middleware import token_required, kyc_required, validate_request_data, get_current_user, active_user_required
-from hedera_service import HederaService
-import requests
+from sqlalchemy import or_
+from models import Transaction, User, db, parse_amount, format_amount
+from middleware import token_required, validate_request_data, get_current_user, user_required
+from intersend_client import get_intersend_client
+from rate_limit import rate_limit
+from contract_outbox import enqueue_contract_call, contract_outbox_worker
+from exchange_rates import exchange_rate_store, fallback_rates
 import os
 import json
 
-# Initialize Hedera service for smart contract integration
-hedera_service = HederaService(
-    network=os.getenv('HEDERA_NETWORK', 'testnet'),
-    operator_id=os.getenv('HEDERA_OPERATOR_ID'),
-    operator_key=os.getenv('HEDERA_OPERATOR_KEY'),
-    contract_id=os.getenv('HEDERA_CONTRACT_ID')
-)
-
 intersend_bp = Blueprint('intersend', __name__, url_prefix='/api/intersend')
 
 
@@ -49,48 +44,26 @@ def get_intersend_access_token():
         return None
 
 
+def provider_id(value):
+    """
+    Normalize an id from the Intersend API to a string.
+    
+    Intersend may send ids as numbers; they are stored in and looked up
+    against String columns.
+    """
+    return str(value) if value is not None else None
+
+
 def make_intersend_request(endpoint, method='GET', data=None):
     """
-    Make a request to Intersend API.
+    Make a request to Intersend API through the shared pooled client.
     """
-    api_url = os.getenv('INTERSEND_API_URL', 'https://api.intersend.com')
-    api_key = os.getenv('INTERSEND_API_KEY')
-    
-    if not api_key:
-        return None
-    
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json'
-    }
-    
-    try:
-        url = f"{api_url}{endpoint}"
-        
-        if method == 'GET':
-            response = requests.get(url, headers=headers)
-        elif method == 'POST':
-            response = requests.post(url, headers=headers, json=data)
-        elif method == 'PUT':
-            response = requests.put(url, headers=headers, json=data)
-        else:
-            return None
-            
-        if response.status_code in [200, 201]:
-            return response.json()
-        else:
-            print(f"Intersend API error: {response.status_code} - {response.text}")
-            return None
-            
-    except Exception as e:
-        print(f"Error making Intersend request: {e}")
-        return None
+    return get_intersend_client().request(endpoint, method, data)
 
 
 @intersend_bp.route('/onramp/initiate', methods=['POST'])
-@token_required
-@active_user_required
-@kyc_required
+@rate_limit('INTERSEND_INITIATE_RATE_LIMIT_PER_MINUTE', scope='identity')
+@user_required(kyc=True)
 @validate_request_data(['amount', 'phone_number', 'crypto_amount'])
 def initiate_intersend_onramp():
     """
@@ -112,12 +85,24 @@ def initiate_intersend_onramp():
                 'message': 'Amount must be between 25 and 150,000 KES'
             }), 400
         
+        try:
+            crypto_amount_value = parse_amount(crypto_amount)
+        except ValueError as e:
+            return jsonify({'error': 'Invalid crypto amount', 'message': str(e)}), 400
+        try:
+            fiat_amount_value = parse_amount(data['amount'], precision=20)
+        except ValueError as e:
+            return jsonify({'error': 'Invalid amount', 'message': str(e)}), 400
+        
+        # Rates used for this request, read once so the whole request sees one version
+        rates = exchange_rate_store.get()
+        
         # Create transaction record
         transaction = Transaction(
             user_id=current_user.id,
             transaction_type='onramp',
-            amount=crypto_amount,
-            fiat_amount=amount,
+            amount=crypto_amount_value,
+            fiat_amount=fiat_amount_value,
             currency='KES',
             status='pending',
             payment_method='intersend',
@@ -126,36 +111,28 @@ def initiate_intersend_onramp():
                 'phone_number': phone_number,
                 'amount_kes': amount,
                 'crypto_amount': crypto_amount,
-                'payment_provider': 'intersend'
+                'payment_provider': 'intersend',
+                'rates_version': rates['version'],
+                'kes_to_hbar': rates['KES_TO_HBAR'],
+                'hbar_to_kes': rates['HBAR_TO_KES']
             })
         )
         
         db.session.add(transaction)
         db.session.flush()  # Get transaction ID
         
-        # NEW: Call smart contract to initiate on-ramp transaction
+        # Queue the smart contract call; the outbox worker submits it after commit
         fiat_amount_wei = int(amount * 10**18)  # Convert KES to wei
-        contract_result = hedera_service.initiate_onramp_transaction(
-            current_user.wallet_address,
-            fiat_amount_wei,
-            phone_number
+        contract_call = enqueue_contract_call(
+            'initiate_onramp_transaction',
+            transaction,
+            user_address=current_user.wallet_address,
+            fiat_amount=fiat_amount_wei,
+            phone_number=phone_number
         )
-        
-        if not contract_result['success']:
-            transaction.status = 'failed'
-            transaction.notes = f"Smart contract error: {contract_result['error']}"
-            db.session.commit()
-            
-            return jsonify({
-                'error': 'Smart contract error',
-                'message': contract_result['error']
-            }), 500
-        
-        # Update transaction with contract info
         transaction.transaction_metadata = json.dumps({
             **json.loads(transaction.transaction_metadata),
-            'contract_transaction_id': contract_result['transaction_id'],
-            'contract_status': 'initiated'
+            'contract_status': 'pending'
         })
         
         # Call Intersend API to initiate payment
@@ -173,6 +150,7 @@ def initiate_intersend_onramp():
         if not intersend_response:
             transaction.status = 'failed'
             transaction.notes = 'Failed to initiate Intersend payment'
+            contract_call.status = 'cancelled'
             db.session.commit()
             
             return jsonify({
@@ -181,6 +159,8 @@ def initiate_intersend_onramp():
             }), 500
         
         # Update transaction with Intersend response
+        transaction.intersend_transaction_id = provider_id(intersend_response.get('transaction_id'))
+        transaction.intersend_reference = provider_id(intersend_response.get('reference'))
         transaction.transaction_metadata = json.dumps({
             **json.loads(transaction.transaction_metadata),
             'intersend_transaction_id': intersend_response.get('transaction_id'),
@@ -189,12 +169,15 @@ def initiate_intersend_onramp():
         })
         
         db.session.commit()
+        contract_outbox_worker.notify()
         
         return jsonify({
             'message': 'Payment initiated successfully',
             'transaction_id': transaction.id,
             'intersend_transaction_id': intersend_response.get('transaction_id'),
             'status': 'pending',
+            'contract_status': 'pending',
+            'rates_version': rates['version'],
             'amount': amount,
             'crypto_amount': crypto_amount,
             'phone_number': phone_number
@@ -206,9 +189,8 @@ def initiate_intersend_onramp():
 
 
 @intersend_bp.route('/offramp/initiate', methods=['POST'])
-@token_required
-@active_user_required
-@kyc_required
+@rate_limit('INTERSEND_INITIATE_RATE_LIMIT_PER_MINUTE', scope='identity')
+@user_required(kyc=True)
 @validate_request_data(['amount', 'phone_number', 'crypto_amount'])
 def initiate_intersend_offramp():
     """
@@ -230,12 +212,24 @@ def initiate_intersend_offramp():
                 'message': 'Amount must be between 25 and 150,000 KES'
             }), 400
         
+        try:
+            crypto_amount_value = parse_amount(crypto_amount)
+        except ValueError as e:
+            return jsonify({'error': 'Invalid crypto amount', 'message': str(e)}), 400
+        try:
+            fiat_amount_value = parse_amount(data['amount'], precision=20)
+        except ValueError as e:
+            return jsonify({'error': 'Invalid amount', 'message': str(e)}), 400
+        
+        # Rates used for this request, read once so the whole request sees one version
+        rates = exchange_rate_store.get()
+        
         # Create transaction record
         transaction = Transaction(
             user_id=current_user.id,
             transaction_type='offramp',
-            amount=crypto_amount,
-            fiat_amount=amount,
+            amount=crypto_amount_value,
+            fiat_amount=fiat_amount_value,
             currency='KES',
             status='pending',
             payment_method='intersend',
@@ -244,36 +238,28 @@ def initiate_intersend_offramp():
                 'phone_number': phone_number,
                 'amount_kes': amount,
                 'crypto_amount': crypto_amount,
-                'payment_provider': 'intersend'
+                'payment_provider': 'intersend',
+                'rates_version': rates['version'],
+                'kes_to_hbar': rates['KES_TO_HBAR'],
+                'hbar_to_kes': rates['HBAR_TO_KES']
             })
         )
         
         db.session.add(transaction)
         db.session.flush()  # Get transaction ID
         
-        # NEW: Call smart contract to initiate off-ramp transaction
-        hbar_amount_tinybars = int(float(crypto_amount) * 10**8)  # Convert HBAR to tinybars
-        contract_result = hedera_service.initiate_offramp_transaction(
-            current_user.wallet_address,
-            hbar_amount_tinybars,
-            phone_number
+        # Queue the smart contract call; the outbox worker submits it after commit
+        hbar_amount_tinybars = int(crypto_amount_value * 10**8)  # Convert HBAR to tinybars
+        contract_call = enqueue_contract_call(
+            'initiate_offramp_transaction',
+            transaction,
+            user_address=current_user.wallet_address,
+            hbar_amount=hbar_amount_tinybars,
+            phone_number=phone_number
         )
-        
-        if not contract_result['success']:
-            transaction.status = 'failed'
-            transaction.notes = f"Smart contract error: {contract_result['error']}"
-            db.session.commit()
-            
-            return jsonify({
-                'error': 'Smart contract error',
-                'message': contract_result['error']
-            }), 500
-        
-        # Update transaction with contract info
         transaction.transaction_metadata = json.dumps({
             **json.loads(transaction.transaction_metadata),
-            'contract_transaction_id': contract_result['transaction_id'],
-            'contract_status': 'initiated'
+            'contract_status': 'pending'
         })
         
         # Call Intersend API to initiate transfer
@@ -291,6 +277,7 @@ def initiate_intersend_offramp():
         if not intersend_response:
             transaction.status = 'failed'
             transaction.notes = 'Failed to initiate Intersend transfer'
+            contract_call.status = 'cancelled'
             db.session.commit()
             
             return jsonify({
@@ -299,6 +286,8 @@ def initiate_intersend_offramp():
             }), 500
         
         # Update transaction with Intersend response
+        transaction.intersend_transaction_id = provider_id(intersend_response.get('transaction_id'))
+        transaction.intersend_reference = provider_id(intersend_response.get('reference'))
         transaction.transaction_metadata = json.dumps({
             **json.loads(transaction.transaction_metadata),
             'intersend_transaction_id': intersend_response.get('transaction_id'),
@@ -307,12 +296,15 @@ def initiate_intersend_offramp():
         })
         
         db.session.commit()
+        contract_outbox_worker.notify()
         
         return jsonify({
             'message': 'Transfer initiated successfully',
             'transaction_id': transaction.id,
             'intersend_transaction_id': intersend_response.get('transaction_id'),
             'status': 'pending',
+            'contract_status': 'pending',
+            'rates_version': rates['version'],
             'amount': amount,
             'crypto_amount': crypto_amount,
             'phone_number': phone_number
@@ -324,6 +316,7 @@ def initiate_intersend_offramp():
 
 
 @intersend_bp.route('/callback', methods=['POST'])
+@rate_limit('INTERSEND_CALLBACK_RATE_LIMIT_PER_MINUTE')
 def intersend_callback():
     """
     Intersend callback endpoint for payment/transfer results.
@@ -333,81 +326,61 @@ def intersend_callback():
         data = request.get_json()
         
         # Extract callback data
-        transaction_id = data.get('transaction_id')
-        reference = data.get('reference')
+        transaction_id = provider_id(data.get('transaction_id'))
+        reference = provider_id(data.get('reference'))
         status = data.get('status')
         amount = data.get('amount')
         phone_number = data.get('phone_number')
         
-        # Find transaction by reference or transaction_id
+        # Find transaction by reference or transaction_id, locking it until
+        # commit: the contract outbox worker also rewrites its metadata
         transaction = None
         if reference:
             # Extract our transaction ID from reference (e.g., "ONRAMP_123")
             if reference.startswith('ONRAMP_') or reference.startswith('OFFRAMP_'):
                 our_transaction_id = reference.split('_')[1]
-                transaction = Transaction.query.get(our_transaction_id)
+                transaction = Transaction.query.filter_by(id=our_transaction_id).with_for_update().first()
         
-        if not transaction and transaction_id:
-            # Try to find by Intersend transaction ID in metadata
-            transactions = Transaction.query.all()
-            for t in transactions:
-                metadata = json.loads(t.transaction_metadata or '{}')
-                if metadata.get('intersend_transaction_id') == transaction_id:
-                    transaction = t
-                    break
+        if not transaction and (transaction_id or reference):
+            # Fall back to the indexed Intersend reference columns
+            lookups = []
+            if transaction_id:
+                lookups.append(Transaction.intersend_transaction_id == transaction_id)
+            if reference:
+                lookups.append(Transaction.intersend_reference == reference)
+            transaction = Transaction.query.filter(or_(*lookups)).with_for_update().first()
         
         if not transaction:
             return jsonify({'error': 'Transaction not found'}), 404
         
         # Update transaction based on status
+        contract_status = None
         if status == 'completed':
             transaction.status = 'completed'
             transaction.completed_at = datetime.utcnow()
             transaction.hedera_transaction_id = transaction_id
             transaction.notes = f"Intersend payment successful. Transaction ID: {transaction_id}"
-            
-            # NEW: Update smart contract transaction status
             contract_status = 2  # COMPLETED
-            contract_result = hedera_service.update_transaction_status(
-                transaction.id,
-                contract_status,
-                transaction_id,
-                f"Intersend payment completed. Transaction ID: {transaction_id}"
-            )
-            
-            if contract_result['success']:
-                # Update transaction metadata with contract update
-                metadata = json.loads(transaction.transaction_metadata or '{}')
-                metadata.update({
-                    'contract_status_updated': True,
-                    'contract_update_transaction_id': contract_result['transaction_id']
-                })
-                transaction.transaction_metadata = json.dumps(metadata)
             
         elif status == 'failed':
             transaction.status = 'failed'
             transaction.notes = f"Intersend payment failed. Transaction ID: {transaction_id}"
-            
-            # NEW: Update smart contract transaction status
             contract_status = 3  # FAILED
-            contract_result = hedera_service.update_transaction_status(
-                transaction.id,
-                contract_status,
-                transaction_id,
-                f"Intersend payment failed. Transaction ID: {transaction_id}"
-            )
             
         elif status == 'cancelled':
             transaction.status = 'cancelled'
             transaction.notes = f"Intersend payment cancelled. Transaction ID: {transaction_id}"
-            
-            # NEW: Update smart contract transaction status
             contract_status = 4  # CANCELLED
-            contract_result = hedera_service.update_transaction_status(
-                transaction.id,
-                contract_status,
-                transaction_id,
-                f"Intersend payment cancelled. Transaction ID: {transaction_id}"
+        
+        # Queue the smart contract status update
+        if contract_status is not None:
+            enqueue_contract_call(
+                'update_transaction_status',
+                transaction,
+                transaction_id=transaction.id,
+                status=contract_status,
+                intersend_id=transaction_id or '',
+                notes=f"Intersend payment {status}. Transaction ID: {transaction_id}"
             )
         
         # Update metadata
@@ -421,6 +394,7 @@ def intersend_callback():
         transaction.transaction_metadata = json.dumps(metadata)
         
         db.session.commit()
+        contract_outbox_worker.notify()
         
         return jsonify({
             'message': 'Callback processed successfully',
@@ -429,6 +403,7 @@ def intersend_callback():
         }), 200
         
     except Exception as e:
+        db.session.rollback()
         print(f"Intersend callback error: {e}")
         return jsonify({
             'error': 'Internal error processing callback',
@@ -440,42 +415,15 @@ def intersend_callback():
 def get_intersend_rates():
     """
     Get current exchange rates from Intersend.
+    Served from the latest stored snapshot; rates are polled in the background.
     """
     try:
-        # Call Intersend API to get rates
-        rates_response = make_intersend_request('/rates')
-        
-        if not rates_response:
-            # Fallback rates if API fails
-            return jsonify({
-                'KES_TO_HBAR': 0.0235,  # Example rate
-                'HBAR_TO_KES': 42.55,   # Example rate
-                'last_updated': datetime.utcnow().isoformat(),
-                'currency': 'KES',
-                'provider': 'intersend_fallback'
-            }), 200
-        
-        # Process Intersend rates response
-        rates = {
-            'KES_TO_HBAR': rates_response.get('kes_to_hbar', 0.0235),
-            'HBAR_TO_KES': rates_response.get('hbar_to_kes', 42.55),
-            'last_updated': rates_response.get('last_updated', datetime.utcnow().isoformat()),
-            'currency': 'KES',
-            'provider': 'intersend'
-        }
-        
-        return jsonify(rates), 200
+        return jsonify(exchange_rate_store.get()), 200
         
     except Exception as e:
         print(f"Error getting Intersend rates: {e}")
         # Return fallback rates
-        return jsonify({
-            'KES_TO_HBAR': 0.0235,
-            'HBAR_TO_KES': 42.55,
-            'last_updated': datetime.utcnow().isoformat(),
-            'currency': 'KES',
-            'provider': 'intersend_fallback'
-        }), 200
+        return jsonify(fallback_rates()), 200
 
 
 @intersend_bp.route('/status/<transaction_id>', methods=['GET'])
@@ -496,9 +444,7 @@ def get_intersend_transaction_status(transaction_id):
         if not transaction:
             return jsonify({'error': 'Transaction not found'}), 404
         
-        # Get metadata
-        metadata = json.loads(transaction.transaction_metadata or '{}')
-        intersend_transaction_id = metadata.get('intersend_transaction_id')
+        intersend_transaction_id = transaction.intersend_transaction_id
         
         if not intersend_transaction_id:
             return jsonify({
@@ -525,8 +471,8 @@ def get_intersend_transaction_status(transaction_id):
         return jsonify({
             'transaction_id': transaction.id,
             'status': transaction.status,
-            'amount': transaction.fiat_amount,
-            'crypto_amount': transaction.amount,
+            'amount': format_amount(transaction.fiat_amount),
+            'crypto_amount': format_amount(transaction.amount),
             'currency': transaction.currency,
             'created_at': transaction.created_at.isoformat(),
             'completed_at': transaction.completed_at.isoformat() if transaction.completed_at else None
@@ -4,11 +4,17 @@ KYC (Know Your Customer) verification routes.
 
 from flask import Blueprint, request, jsonify
 from datetime import datetime
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import selectinload
 from models import User, KYCDocument, db
-from middleware import token_required, validate_request_data, get_current_user, active_user_required
+from middleware import token_required, admin_required, validate_request_data, get_current_user, user_required
+from pagination import keyset_paginate
 
 kyc_bp = Blueprint('kyc', __name__, url_prefix='/api/kyc')
 
+MAX_PENDING_PAGE_SIZE = 200
+MAX_KYC_BATCH_SIZE = 500
+
 
 @kyc_bp.route('/status', methods=['GET'])
 @token_required
@@ -29,8 +35,7 @@ def get_kyc_status():
 
 
 @kyc_bp.route('/submit', methods=['POST'])
-@token_required
-@active_user_required
+@user_required()
 @validate_request_data(['document_type', 'document_number', 'document_country'])
 def submit_kyc():
     """
@@ -184,9 +189,127 @@ def verify_kyc(user_id):
         return jsonify({'error': 'Failed to verify KYC', 'message': str(e)}), 500
 
 
+@kyc_bp.route('/verify/batch', methods=['POST'])
+@admin_required
+@validate_request_data(['decisions'])
+def verify_kyc_batch():
+    """
+    Approve or reject many pending KYC submissions at once (Admin endpoint).
+    
+    Required fields:
+    - decisions: List of {user_id, status, rejection_reason}; status is
+      'approved' or 'rejected', rejection_reason is required for 'rejected'
+    
+    All valid decisions are applied in one transaction with set-based
+    updates; each user gets its own outcome in the response.
+    
+    Restricted to the wallets in ADMIN_WALLET_ADDRESSES.
+    """
+    current_user = get_current_user()
+    
+    decisions = request.get_json()['decisions']
+    if not isinstance(decisions, list) or not decisions:
+        return jsonify({'error': 'decisions must be a non-empty list'}), 400
+    if len(decisions) > MAX_KYC_BATCH_SIZE:
+        return jsonify({'error': f'At most {MAX_KYC_BATCH_SIZE} decisions per request'}), 400
+    
+    # Validate each decision; invalid ones are reported, not applied
+    results = []
+    valid = {}
+    for decision in decisions:
+        if not isinstance(decision, dict):
+            results.append({'user_id': None, 'success': False, 'error': 'Decision must be an object'})
+            continue
+        
+        user_id = decision.get('user_id')
+        status = decision.get('status')
+        result = {'user_id': user_id, 'success': False}
+        results.append(result)
+        
+        if not isinstance(user_id, int) or isinstance(user_id, bool):
+            result['error'] = 'user_id must be an integer'
+        elif user_id in valid:
+            result['error'] = 'Duplicate user_id in batch'
+        elif status not in ['approved', 'rejected']:
+            result['error'] = 'Invalid status. Must be "approved" or "rejected"'
+        elif status == 'rejected' and not decision.get('rejection_reason'):
+            result['error'] = 'Rejection reason is required'
+        else:
+            valid[user_id] = (result, status, decision.get('rejection_reason'))
+    
+    try:
+        # Current status of every user in one query, locked until commit
+        statuses = dict(db.session.execute(
+            select(User.id, User.kyc_status)
+            .where(User.id.in_(list(valid)))
+            .with_for_update()
+        ).all()) if valid else {}
+        
+        approved, rejected = [], {}
+        for user_id, (result, status, reason) in valid.items():
+            if user_id not in statuses:
+                result['error'] = 'User not found'
+            elif statuses[user_id] != 'pending':
+                result['error'] = 'No pending KYC submission for this user'
+            elif status == 'approved':
+                approved.append(user_id)
+            else:
+                rejected[user_id] = reason
+        
+        now = datetime.utcnow()
+        
+        if approved:
+            db.session.execute(
+                update(User)
+                .where(User.id.in_(approved))
+                .values(kyc_status='approved', kyc_verified_at=now, kyc_rejection_reason=None)
+            )
+            db.session.execute(
+                update(KYCDocument)
+                .where(KYCDocument.user_id.in_(approved))
+                .values(verification_status='approved', verified_at=now, verified_by=current_user.email)
+            )
+        
+        if rejected:
+            db.session.execute(
+                update(User)
+                .where(User.id.in_(list(rejected)))
+                .values(
+                    kyc_status='rejected',
+                    kyc_verified_at=None,
+                    kyc_rejection_reason=case(rejected, value=User.id)
+                )
+            )
+            db.session.execute(
+                update(KYCDocument)
+                .where(KYCDocument.user_id.in_(list(rejected)))
+                .values(
+                    verification_status='rejected',
+                    rejection_reason=case(rejected, value=KYCDocument.user_id)
+                )
+            )
+        
+        db.session.commit()
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to verify KYC', 'message': str(e)}), 500
+    
+    for user_id in approved:
+        valid[user_id][0].update(success=True, kyc_status='approved')
+    for user_id in rejected:
+        valid[user_id][0].update(success=True, kyc_status='rejected')
+    
+    return jsonify({
+        'approved': len(approved),
+        'rejected': len(rejected),
+        'failed': len(results) - len(approved) - len(rejected),
+        'results': results
+    }), 200
+
+
 @kyc_bp.route('/resubmit', methods=['POST'])
-@token_required
-@active_user_required
+@user_required()
 @validate_request_data(['document_type', 'document_number', 'document_country'])
 def resubmit_kyc():
     """
@@ -247,28 +370,67 @@ def resubmit_kyc():
 @token_required
 def get_pending_kyc():
     """
-    Get all pending KYC submissions (Admin endpoint).
+    Get pending KYC submissions, oldest first (Admin endpoint).
+    
+    Query parameters:
+    - country: Filter by the user's country
+    - document_type: Only users who submitted a document of this type
+    - limit: Number of submissions to return (default: 50, max: 200)
+    - cursor: Pass the previous page's next_cursor to fetch the next page
+    - include_total: Whether to count all matching submissions (default: true)
     
     Note: In production, this endpoint should have admin-only access control.
     """
     # TODO: Add admin role check here
     
+    query = User.query.filter_by(kyc_status='pending')
+    
+    country = request.args.get('country')
+    if country:
+        query = query.filter_by(country=country)
+    
+    document_type = request.args.get('document_type')
+    if document_type:
+        query = query.filter(User.kyc_documents.any(KYCDocument.document_type == document_type))
+    
     try:
-        pending_users = User.query.filter_by(kyc_status='pending').all()
-        
-        result = []
-        for user in pending_users:
-            documents = KYCDocument.query.filter_by(user_id=user.id).all()
-            result.append({
-                'user': user.to_dict(include_sensitive=True),
-                'documents': [doc.to_dict() for doc in documents]
-            })
-        
-        return jsonify({
-            'pending_kyc_count': len(result),
-            'submissions': result
-        }), 200
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, MAX_PENDING_PAGE_SIZE))
+    
+    include_total = request.args.get('include_total', 'true').lower() == 'true'
+    
+    try:
+        total = query.count() if include_total else None
         
+        # Documents for the whole page are loaded in one extra query
+        pending_users, next_cursor = keyset_paginate(
+            query.options(selectinload(User.kyc_documents)),
+            (User.kyc_submitted_at, User.id),
+            cursor=request.args.get('cursor'),
+            limit=limit,
+            descending=False
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch pending KYC', 'message': str(e)}), 500
+    
+    response = {
+        'count': len(pending_users),
+        'limit': limit,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+        'submissions': [
+            {
+                'user': user.to_dict(include_sensitive=True),
+                'documents': [doc.to_dict() for doc in user.kyc_documents]
+            }
+            for user in pending_users
+        ]
+    }
+    if include_total:
+        response['pending_kyc_count'] = total
+    return jsonify(response), 200
 
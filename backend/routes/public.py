@@ -3,9 +3,8 @@ Public routes for landing page stats and information.
 These endpoints do not require authentication.
 """
 
-from flask import Blueprint, jsonify
-from models import User, Transaction, db
-from sqlalchemy import func
+from flask import Blueprint, Response, jsonify, request
+from public_stats import public_stats_cache
 
 public_bp = Blueprint('public', __name__, url_prefix='/api/public')
 
@@ -14,89 +13,22 @@ public_bp = Blueprint('public', __name__, url_prefix='/api/public')
 def get_public_stats():
     """
     Get public statistics for the landing page.
-    Returns live counts from the database.
+    
+    Served from a periodically refreshed snapshot; clients and CDNs can
+    revalidate with If-None-Match.
     """
     try:
-        # Total users count
-        total_users = User.query.filter_by(is_active=True).count()
+        snapshot = public_stats_cache.get()
+        interval = public_stats_cache.refresh_interval()
         
-        # Total transactions count
-        total_transactions = Transaction.query.count()
+        if snapshot['etag'] in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = jsonify(snapshot['payload'])
         
-        # Completed transactions
-        completed_transactions = Transaction.query.filter_by(status='completed').count()
-        
-        # Total volume (sum of completed transactions)
-        volume_query = db.session.query(
-            func.sum(Transaction.fiat_amount).label('total_volume')
-        ).filter(
-            Transaction.status == 'completed',
-            Transaction.currency == 'KES'
-        ).first()
-        
-        total_volume_kes = float(volume_query.total_volume or 0) if volume_query.total_volume else 0
-        
-        # Unique wallet addresses
-        unique_wallets = User.query.with_entities(User.wallet_address).distinct().count()
-        
-        # On-ramp vs Off-ramp breakdown
-        onramp_count = Transaction.query.filter_by(transaction_type='onramp').count()
-        offramp_count = Transaction.query.filter_by(transaction_type='offramp').count()
-        
-        # Recent transactions (last 10, basic info only)
-        recent_txs = Transaction.query.filter_by(status='completed').order_by(
-            Transaction.completed_at.desc()
-        ).limit(10).all()
-        
-        recent_transactions = []
-        for tx in recent_txs:
-            # Get user wallet (first 8 and last 4 chars for privacy)
-            user = User.query.get(tx.user_id)
-            wallet_preview = f"{user.wallet_address[:8]}...{user.wallet_address[-4:]}" if user else "Unknown"
-            
-            recent_transactions.append({
-                'id': tx.id,
-                'type': tx.transaction_type,
-                'amount': tx.amount,
-                'fiat_amount': tx.fiat_amount,
-                'currency': tx.currency,
-                'wallet': wallet_preview,
-                'completed_at': tx.completed_at.isoformat() if tx.completed_at else None
-            })
-        
-        # Transaction activity by day (last 7 days)
-        from datetime import datetime, timedelta
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        
-        daily_activity = db.session.query(
-            func.date(Transaction.created_at).label('date'),
-            func.count(Transaction.id).label('count')
-        ).filter(
-            Transaction.created_at >= seven_days_ago
-        ).group_by(
-            func.date(Transaction.created_at)
-        ).all()
-        
-        activity_chart = [
-            {
-                'date': str(item.date),
-                'count': item.count
-            }
-            for item in daily_activity
-        ]
-        
-        return jsonify({
-            'total_users': total_users,
-            'total_transactions': total_transactions,
-            'completed_transactions': completed_transactions,
-            'total_volume_kes': round(total_volume_kes, 2),
-            'unique_wallets': unique_wallets,
-            'onramp_count': onramp_count,
-            'offramp_count': offramp_count,
-            'recent_transactions': recent_transactions,
-            'daily_activity': activity_chart,
-            'last_updated': datetime.utcnow().isoformat()
-        }), 200
+        response.set_etag(snapshot['etag'])
+        response.headers['Cache-Control'] = f'public, max-age={interval}, stale-while-revalidate={interval}'
+        return response
         
     except Exception as e:
         print(f"Error getting public stats: {e}")
@@ -3,23 +3,36 @@ Simple RampHub smart contract integration routes.
 """
 
 from flask import Blueprint, request, jsonify
-from middleware import token_required, get_current_user, kyc_required, active_user_required
-from hedera_service import HederaService
-import os
+from middleware import token_required, get_current_user, user_required
+from hedera_service import get_hedera_service
+from quote_engine import QuoteEngine
 
 ramp_bp = Blueprint('ramp', __name__, url_prefix='/api/ramp')
 
-# Initialize Hedera service
-hedera_service = HederaService(
-    network=os.getenv('HEDERA_NETWORK', 'testnet'),
-    operator_id=os.getenv('HEDERA_OPERATOR_ID'),
-    operator_key=os.getenv('HEDERA_OPERATOR_KEY'),
-    contract_id=os.getenv('HEDERA_CONTRACT_ID')
-)
+# Shared Hedera service (client opens on first use)
+hedera_service = get_hedera_service()
+
+# Quotes are computed locally from the contract's cached rates
+quote_engine = QuoteEngine(hedera_service)
+
+# Maximum amounts per batch quote request
+MAX_BATCH_QUOTES = 1000
+
+
+def _parse_uint(value):
+    """Parse a non-negative integer amount (int or decimal string)."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError('Amount must be an integer')
+    try:
+        amount = int(value)
+    except ValueError:
+        raise ValueError('Amount must be an integer')
+    if amount < 0:
+        raise ValueError('Amount must not be negative')
+    return amount
 
 @ramp_bp.route('/users/register', methods=['POST'])
-@token_required
-@active_user_required
+@user_required()
 def register_user():
     """Register user on RampHub contract"""
     try:
@@ -47,8 +60,7 @@ def register_user():
         return jsonify({'error': str(e)}), 500
 
 @ramp_bp.route('/users/verify-kyc', methods=['POST'])
-@token_required
-@active_user_required
+@user_required()
 def verify_kyc():
     """Verify user KYC on RampHub contract"""
     try:
@@ -70,9 +82,7 @@ def verify_kyc():
         return jsonify({'error': str(e)}), 500
 
 @ramp_bp.route('/transactions/create', methods=['POST'])
-@token_required
-@active_user_required
-@kyc_required
+@user_required(kyc=True)
 def create_transaction():
     """Create transaction on RampHub contract"""
     try:
@@ -172,14 +182,16 @@ def calculate_hbar():
         if not kes_amount:
             return jsonify({'error': 'KES amount required'}), 400
         
-        result = hedera_service.calculate_hbar_simple(int(kes_amount))
+        rates = quote_engine.snapshot()
+        try:
+            hbar_amount = rates.quote_hbar(_parse_uint(kes_amount))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if result['success']:
-            return jsonify({
-                'hbar_amount': result['data']
-            }), 200
-        else:
-            return jsonify({'error': result['error']}), 500
+        return jsonify({
+            'hbar_amount': str(hbar_amount),
+            'rates_version': rates.version
+        }), 200
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -192,14 +204,50 @@ def calculate_kes():
         if not hbar_amount:
             return jsonify({'error': 'HBAR amount required'}), 400
         
-        result = hedera_service.calculate_kes_simple(int(hbar_amount))
+        rates = quote_engine.snapshot()
+        try:
+            kes_amount = rates.quote_kes(_parse_uint(hbar_amount))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if result['success']:
-            return jsonify({
-                'kes_amount': result['data']
-            }), 200
-        else:
-            return jsonify({'error': result['error']}), 500
+        return jsonify({
+            'kes_amount': str(kes_amount),
+            'rates_version': rates.version
+        }), 200
+            
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@ramp_bp.route('/quotes', methods=['POST'])
+def batch_quotes():
+    """Quote many amounts in one direction against a single rate snapshot"""
+    try:
+        data = request.get_json() or {}
+        direction = data.get('direction')
+        amounts = data.get('amounts')
+        
+        if direction not in ('kes_to_hbar', 'hbar_to_kes'):
+            return jsonify({'error': "direction must be 'kes_to_hbar' or 'hbar_to_kes'"}), 400
+        if not isinstance(amounts, list) or not amounts:
+            return jsonify({'error': 'amounts must be a non-empty list'}), 400
+        if len(amounts) > MAX_BATCH_QUOTES:
+            return jsonify({'error': f'At most {MAX_BATCH_QUOTES} amounts per request'}), 400
+        
+        rates = quote_engine.snapshot()
+        quote = rates.quote_hbar if direction == 'kes_to_hbar' else rates.quote_kes
+        
+        quotes = []
+        for amount in amounts:
+            try:
+                quotes.append({'amount': str(amount), 'quote': str(quote(_parse_uint(amount)))})
+            except ValueError as e:
+                quotes.append({'amount': str(amount), 'error': str(e)})
+        
+        return jsonify({
+            'direction': direction,
+            'rates': rates.to_dict(),
+            'quotes': quotes
+        }), 200
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
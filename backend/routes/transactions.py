@@ -4,15 +4,18 @@ Transaction routes for on-ramp and off-ramp operations.
 
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-from models import Transaction, db
-from middleware import token_required, validate_request_data, get_current_user, kyc_required, active_user_required
+from sqlalchemy import func
+from models import Transaction, db, parse_amount
+from middleware import validate_request_data, get_current_user, user_required
+from pagination import keyset_paginate
 
 transactions_bp = Blueprint('transactions', __name__, url_prefix='/api/transactions')
 
+MAX_TRANSACTIONS_PAGE_SIZE = 200
+
 
 @transactions_bp.route('/', methods=['GET'])
-@token_required
-@active_user_required
+@user_required()
 def get_transactions():
     """
     Get all transactions for the current user.
@@ -20,8 +23,12 @@ def get_transactions():
     Query parameters:
     - transaction_type: Filter by type ('onramp' or 'offramp')
     - status: Filter by status
-    - limit: Number of transactions to return (default: 50)
+    - limit: Number of transactions to return (default: 50, max: 200)
     - offset: Pagination offset (default: 0)
+    - cursor: Use keyset pagination; pass the previous page's next_cursor
+      (empty for the first page). Takes precedence over offset.
+    - include_total: Whether to count all matching transactions
+      (default: true for offset pagination, false for cursor pagination)
     """
     user = get_current_user()
     
@@ -41,14 +48,43 @@ def get_transactions():
         query = query.filter_by(status=status)
     
     # Pagination
-    limit = int(request.args.get('limit', 50))
-    offset = int(request.args.get('offset', 0))
+    try:
+        limit = int(request.args.get('limit', 50))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    limit = max(1, min(limit, MAX_TRANSACTIONS_PAGE_SIZE))
+    offset = max(0, offset)
+    cursor_mode = 'cursor' in request.args
+    include_total = request.args.get('include_total', 'false' if cursor_mode else 'true').lower() == 'true'
+    
+    # Get total count (optional; costs a second scan)
+    total = query.count() if include_total else None
+    
+    if cursor_mode:
+        try:
+            transactions, next_cursor = keyset_paginate(
+                query,
+                (Transaction.created_at, Transaction.id),
+                cursor=request.args.get('cursor'),
+                limit=limit
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        response = {
+            'count': len(transactions),
+            'limit': limit,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'transactions': [tx.to_dict() for tx in transactions]
+        }
+        if include_total:
+            response['total'] = total
+        return jsonify(response), 200
     
     # Order by created_at descending (newest first)
-    query = query.order_by(Transaction.created_at.desc())
-    
-    # Get total count
-    total = query.count()
+    query = query.order_by(Transaction.created_at.desc(), Transaction.id.desc())
     
     # Apply pagination
     transactions = query.limit(limit).offset(offset).all()
@@ -63,8 +99,7 @@ def get_transactions():
 
 
 @transactions_bp.route('/<int:transaction_id>', methods=['GET'])
-@token_required
-@active_user_required
+@user_required()
 def get_transaction(transaction_id):
     """Get a specific transaction by ID."""
     user = get_current_user()
@@ -83,9 +118,7 @@ def get_transaction(transaction_id):
 
 
 @transactions_bp.route('/create', methods=['POST'])
-@token_required
-@active_user_required
-@kyc_required
+@user_required(kyc=True)
 @validate_request_data(['transaction_type', 'amount', 'fiat_amount'])
 def create_transaction():
     """
@@ -113,13 +146,19 @@ def create_transaction():
     if data['transaction_type'] not in ['onramp', 'offramp']:
         return jsonify({'error': 'Invalid transaction type. Must be "onramp" or "offramp"'}), 400
     
+    try:
+        amount = parse_amount(data['amount'])
+        fiat_amount = parse_amount(data['fiat_amount'], precision=20)
+    except ValueError as e:
+        return jsonify({'error': 'Invalid amount', 'message': str(e)}), 400
+    
     try:
         # Create transaction
         transaction = Transaction(
             user_id=user.id,
             transaction_type=data['transaction_type'],
-            amount=data['amount'],
-            fiat_amount=data['fiat_amount'],
+            amount=amount,
+            fiat_amount=fiat_amount,
             currency=data.get('currency', 'USD'),
             payment_method=data.get('payment_method'),
             notes=data.get('notes'),
@@ -140,8 +179,7 @@ def create_transaction():
 
 
 @transactions_bp.route('/<int:transaction_id>/status', methods=['PUT'])
-@token_required
-@active_user_required
+@user_required()
 @validate_request_data(['status'])
 def update_transaction_status(transaction_id):
     """
@@ -200,8 +238,7 @@ def update_transaction_status(transaction_id):
 
 
 @transactions_bp.route('/stats', methods=['GET'])
-@token_required
-@active_user_required
+@user_required()
 def get_transaction_stats():
     """Get transaction statistics for the current user."""
     user = get_current_user()
@@ -210,19 +247,28 @@ def get_transaction_stats():
         return jsonify({'error': 'User not found'}), 404
     
     try:
-        # Total transactions
-        total_transactions = Transaction.query.filter_by(user_id=user.id).count()
+        # Counts per (type, status) in a single grouped query
+        by_type = {'onramp': 0, 'offramp': 0}
+        by_status = {'pending': 0, 'processing': 0, 'completed': 0, 'failed': 0, 'cancelled': 0}
+        total_transactions = 0
         
-        # Transactions by type
-        onramp_count = Transaction.query.filter_by(user_id=user.id, transaction_type='onramp').count()
-        offramp_count = Transaction.query.filter_by(user_id=user.id, transaction_type='offramp').count()
+        grouped_counts = db.session.query(
+            Transaction.transaction_type,
+            Transaction.status,
+            func.count(Transaction.id)
+        ).filter(
+            Transaction.user_id == user.id
+        ).group_by(
+            Transaction.transaction_type,
+            Transaction.status
+        ).all()
         
-        # Transactions by status
-        pending_count = Transaction.query.filter_by(user_id=user.id, status='pending').count()
-        processing_count = Transaction.query.filter_by(user_id=user.id, status='processing').count()
-        completed_count = Transaction.query.filter_by(user_id=user.id, status='completed').count()
-        failed_count = Transaction.query.filter_by(user_id=user.id, status='failed').count()
-        cancelled_count = Transaction.query.filter_by(user_id=user.id, status='cancelled').count()
+        for transaction_type, status, count in grouped_counts:
+            total_transactions += count
+            if transaction_type in by_type:
+                by_type[transaction_type] += count
+            if status in by_status:
+                by_status[status] += count
         
         # Recent transactions (last 5)
         recent_transactions = Transaction.query.filter_by(user_id=user.id).order_by(
@@ -231,17 +277,8 @@ def get_transaction_stats():
         
         return jsonify({
             'total_transactions': total_transactions,
-            'by_type': {
-                'onramp': onramp_count,
-                'offramp': offramp_count
-            },
-            'by_status': {
-                'pending': pending_count,
-                'processing': processing_count,
-                'completed': completed_count,
-                'failed': failed_count,
-                'cancelled': cancelled_count
-            },
+            'by_type': by_type,
+            'by_status': by_status,
             'recent_transactions': [tx.to_dict() for tx in recent_transactions]
         }), 200
         
@@ -250,8 +287,7 @@ def get_transaction_stats():
 
 
 @transactions_bp.route('/<int:transaction_id>/cancel', methods=['POST'])
-@token_required
-@active_user_required
+@user_required()
 def cancel_transaction(transaction_id):
     """Cancel a pending transaction."""
     user = get_current_user()
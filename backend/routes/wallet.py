@@ -5,12 +5,15 @@ Handles wallet data from frontend without requiring Hedera SDK on backend.
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, User, Transaction
+from models import db, User, Transaction, format_amount
+from pagination import keyset_paginate
 from datetime import datetime
 import json
 
 wallet_bp = Blueprint('wallet', __name__, url_prefix='/api/wallet')
 
+MAX_TRANSACTIONS_PAGE_SIZE = 100
+
 @wallet_bp.route('/balance', methods=['POST'])
 @jwt_required()
 def update_balance():
@@ -108,29 +111,70 @@ def update_account():
 @wallet_bp.route('/transactions', methods=['GET'])
 @jwt_required()
 def get_transactions():
-    """Get user's transaction history."""
+    """
+    Get user's transaction history.
+    
+    Uses page/per_page pagination by default. Pass `cursor` (empty for the
+    first page) for keyset pagination, and `include_total=false` to skip
+    counting.
+    """
     try:
         user_id = get_jwt_identity()
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        transactions = Transaction.query.filter_by(user_id=user_id)\
-            .order_by(Transaction.created_at.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
-        
-        return jsonify({
-            'transactions': [{
+        try:
+            per_page = int(request.args.get('per_page', 10))
+        except ValueError:
+            return jsonify({'error': 'per_page must be an integer'}), 400
+        per_page = max(1, min(per_page, MAX_TRANSACTIONS_PAGE_SIZE))
+        cursor_mode = 'cursor' in request.args
+        include_total = request.args.get('include_total', 'false' if cursor_mode else 'true').lower() == 'true'
+        
+        query = Transaction.query.filter_by(user_id=user_id)
+        
+        def serialize(t):
+            return {
                 'id': t.id,
                 'transaction_id': t.transaction_id,
-                'amount': t.amount,
+                'amount': format_amount(t.amount),
                 'type': t.transaction_type,
                 'status': t.status,
                 'created_at': t.created_at.isoformat(),
                 'metadata': json.loads(t.metadata) if t.metadata else {}
-            } for t in transactions.items],
+            }
+        
+        if cursor_mode:
+            try:
+                items, next_cursor = keyset_paginate(
+                    query,
+                    (Transaction.created_at, Transaction.id),
+                    cursor=request.args.get('cursor'),
+                    limit=per_page
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            pagination = {
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
+            if include_total:
+                pagination['total'] = query.count()
+            
+            return jsonify({
+                'transactions': [serialize(t) for t in items],
+                'pagination': pagination
+            }), 200
+        
+        page = request.args.get('page', 1, type=int)
+        transactions = query\
+            .order_by(Transaction.created_at.desc(), Transaction.id.desc())\
+            .paginate(page=page, per_page=per_page, error_out=False, count=include_total)
+        
+        return jsonify({
+            'transactions': [serialize(t) for t in transactions.items],
             'pagination': {
                 'page': transactions.page,
-                'pages': transactions.pages,
+                'pages': transactions.pages if include_total else None,
                 'per_page': transactions.per_page,
                 'total': transactions.total
             }
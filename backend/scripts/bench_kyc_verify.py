@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Compare KYC verification throughput: one request per user vs the batch endpoint.
+
+Creates N pending users (with documents) in a scratch database, approves or
+rejects them through POST /api/kyc/verify/<user_id>, resets them and does
+the same through POST /api/kyc/verify/batch, then reports users per second
+and SQL statements for each path. Runs in-process with the Flask test
+client, so it measures the application and database work only:
+
+    python scripts/bench_kyc_verify.py -n 2000 --batch-size 500
+    DATABASE_URL=postgresql://... python scripts/bench_kyc_verify.py -n 2000
+
+The database is created with create_all and the benchmark rows are removed
+at the end; do not point it at a database with real data.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_kyc.db'))
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+os.environ['SQL_QUERY_STATS_ENABLED'] = 'true'
+os.environ['SLOW_QUERY_THRESHOLD_MS'] = '0'
+os.environ['N_PLUS_ONE_THRESHOLD'] = '0'
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import delete, update
+
+from app import create_app
+from models import KYCDocument, User, db
+
+WALLET_PREFIX = '0.0.bench-kyc-'
+
+
+def _decision(index, user_id):
+    if index % 4 == 3:
+        return {'user_id': user_id, 'status': 'rejected', 'rejection_reason': 'Document unreadable'}
+    return {'user_id': user_id, 'status': 'approved'}
+
+
+def _seed(count):
+    reviewer = User(wallet_address=WALLET_PREFIX + 'reviewer', email='reviewer@bench.local', password_hash='x')
+    db.session.add(reviewer)
+    
+    users = [
+        User(
+            wallet_address=f'{WALLET_PREFIX}{i}',
+            email=f'kyc-{i}@bench.local',
+            password_hash='x',
+            kyc_status='pending',
+            kyc_submitted_at=datetime.utcnow()
+        )
+        for i in range(count)
+    ]
+    db.session.add_all(users)
+    db.session.flush()
+    
+    db.session.add_all(
+        KYCDocument(user_id=user.id, document_type=document_type)
+        for user in users
+        for document_type in ('national_id', 'selfie')
+    )
+    db.session.commit()
+    return reviewer.id, [user.id for user in users]
+
+
+def _reset(user_ids):
+    db.session.execute(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(kyc_status='pending', kyc_verified_at=None, kyc_rejection_reason=None)
+    )
+    db.session.execute(
+        update(KYCDocument)
+        .where(KYCDocument.user_id.in_(user_ids))
+        .values(verification_status='pending', verified_at=None, verified_by=None, rejection_reason=None)
+    )
+    db.session.commit()
+
+
+def _cleanup():
+    user_ids = db.session.scalars(
+        db.select(User.id).where(User.wallet_address.like(WALLET_PREFIX + '%'))
+    ).all()
+    if user_ids:
+        db.session.execute(delete(KYCDocument).where(KYCDocument.user_id.in_(user_ids)))
+        db.session.execute(delete(User).where(User.id.in_(user_ids)))
+        db.session.commit()
+
+
+def _report(label, count, elapsed, queries):
+    print(f'{label:<8} {count} users in {elapsed:.2f}s  '
+          f'{count / elapsed:,.0f} users/s  {queries} SQL statements ({queries / count:.1f} per user)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--users', type=int, default=1000, help='pending users to verify')
+    parser.add_argument('--batch-size', type=int, default=500, help='decisions per batch request')
+    args = parser.parse_args()
+    
+    app = create_app('production')
+    client = app.test_client()
+    
+    with app.app_context():
+        db.create_all()
+        _cleanup()
+        reviewer_id, user_ids = _seed(args.users)
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity=reviewer_id)}
+        
+        try:
+            queries = 0
+            started = time.perf_counter()
+            for index, user_id in enumerate(user_ids):
+                decision = _decision(index, user_id)
+                response = client.post(f'/api/kyc/verify/{user_id}', json=decision, headers=headers)
+                assert response.status_code == 200, response.get_json()
+                queries += int(response.headers['X-DB-Queries'])
+            _report('single', len(user_ids), time.perf_counter() - started, queries)
+            
+            _reset(user_ids)
+            
+            queries = 0
+            started = time.perf_counter()
+            for offset in range(0, len(user_ids), args.batch_size):
+                chunk = user_ids[offset:offset + args.batch_size]
+                decisions = [_decision(offset + i, user_id) for i, user_id in enumerate(chunk)]
+                response = client.post('/api/kyc/verify/batch', json={'decisions': decisions}, headers=headers)
+                assert response.status_code == 200 and response.get_json()['failed'] == 0, response.get_json()
+                queries += int(response.headers['X-DB-Queries'])
+            _report('batch', len(user_ids), time.perf_counter() - started, queries)
+        finally:
+            _cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Compare concurrent user-data upserts: read-then-write vs INSERT ... ON CONFLICT.
+
+T threads upsert the same small set of keys for one user. The read-then-write
+path (the previous /api/data/upsert implementation, reproduced here) fails
+with a unique violation whenever two threads miss the same key at once. The
+native path (routes.crud._upsert_entry) does it in one statement. Reports
+upserts per second and failures for each:
+
+    python scripts/bench_upsert.py -t 16 -n 4000 -k 20
+    DATABASE_URL=postgresql://... python scripts/bench_upsert.py -t 16 -n 4000
+
+The database is created with create_all and the benchmark rows are removed
+at the end; do not point it at a database with real data.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_upsert.db'))
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+from sqlalchemy import delete
+
+from app import create_app
+from models import User, UserData, db
+from routes.crud import _upsert_entry
+
+WALLET = '0.0.bench-upsert'
+
+
+def legacy_upsert(user_id, data):
+    """Read-then-write upsert, as /api/data/upsert did before ON CONFLICT."""
+    data_entry = UserData.query.filter_by(user_id=user_id, key=data['key']).first()
+    created = data_entry is None
+    if created:
+        data_entry = UserData(user_id=user_id, key=data['key'], is_public=False)
+        db.session.add(data_entry)
+    data_entry.set_value(data['value'])
+    return data_entry, created
+
+
+def _run(app, upsert, user_id, threads, operations, keys):
+    counts = {'ok': 0, 'created': 0, 'failed': 0}
+    lock = threading.Lock()
+    per_thread = operations // threads
+    
+    def worker(index):
+        ok = created = failed = 0
+        with app.app_context():
+            for i in range(per_thread):
+                data = {'key': f'bench-{(index + i) % keys}', 'value': i}
+                try:
+                    _, was_created = upsert(user_id, data)
+                    db.session.commit()
+                    ok += 1
+                    created += bool(was_created)
+                except Exception:
+                    db.session.rollback()
+                    failed += 1
+            db.session.remove()
+        with lock:
+            counts['ok'] += ok
+            counts['created'] += created
+            counts['failed'] += failed
+    
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return counts, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-t', '--threads', type=int, default=16, help='concurrent writers')
+    parser.add_argument('-n', '--operations', type=int, default=4000, help='total upserts per run')
+    parser.add_argument('-k', '--keys', type=int, default=20, help='distinct keys shared by all writers')
+    args = parser.parse_args()
+    
+    app = create_app('production')
+    
+    with app.app_context():
+        db.create_all()
+        user = User.query.filter_by(wallet_address=WALLET).first()
+        if user is None:
+            user = User(wallet_address=WALLET, email='upsert@bench.local', password_hash='x')
+            db.session.add(user)
+            db.session.commit()
+        user_id = user.id
+    
+    try:
+        for label, upsert in (('read-then-write', legacy_upsert), ('on-conflict', _upsert_entry)):
+            with app.app_context():
+                db.session.execute(delete(UserData).where(UserData.user_id == user_id))
+                db.session.commit()
+            
+            counts, elapsed = _run(app, upsert, user_id, args.threads, args.operations, args.keys)
+            print(f'{label:<16} {counts["ok"] / elapsed:>8,.0f} upserts/s  '
+                  f'{counts["ok"]} ok ({counts["created"]} created)  {counts["failed"]} failed  {elapsed:.2f}s')
+    finally:
+        with app.app_context():
+            db.session.execute(delete(UserData).where(UserData.user_id == user_id))
+            db.session.execute(delete(User).where(User.id == user_id))
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    main()
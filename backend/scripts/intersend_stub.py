@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Local stub of the Intersend API for exercising IntersendClient.
+
+Implements the endpoints the backend calls, with optional latency and
+failure injection to exercise timeouts, retries and connection pooling.
+
+Usage:
+    python scripts/intersend_stub.py --port 8099 --delay 0.2 --fail-rate 0.1
+
+Then run the backend with:
+    INTERSEND_API_URL=http://localhost:8099 INTERSEND_API_KEY=stub python app.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubState:
+    """Shared stub configuration and request counters."""
+    
+    def __init__(self, delay=0.0, fail_rate=0.0, fail_status=503):
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.transactions = {}
+        self.requests = 0
+        self.connections = set()
+        self.lock = threading.Lock()
+
+
+class IntersendStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so pooled clients reuse connections
+    state = None
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _send(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _read_json(self):
+        return json.loads(self._body or b'{}')
+    
+    def _preflight(self):
+        """Count the request, apply latency and maybe inject a failure."""
+        # Always drain the body so the kept-alive connection stays in sync
+        length = int(self.headers.get('Content-Length') or 0)
+        self._body = self.rfile.read(length) if length else b''
+        
+        with self.state.lock:
+            self.state.requests += 1
+            self.state.connections.add(self.client_address)
+        
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            self._send(401, {'error': 'Missing API key'})
+            return False
+        
+        if self.state.delay:
+            time.sleep(self.state.delay)
+        
+        if random.random() < self.state.fail_rate:
+            self._send(self.state.fail_status, {'error': 'Injected failure'})
+            return False
+        return True
+    
+    def do_GET(self):
+        if not self._preflight():
+            return
+        
+        if self.path == '/rates':
+            self._send(200, {
+                'kes_to_hbar': 0.0235,
+                'hbar_to_kes': 42.55,
+                'last_updated': datetime.utcnow().isoformat()
+            })
+        elif self.path == '/_stats':
+            self._send(200, {
+                'requests': self.state.requests,
+                'connections': len(self.state.connections)
+            })
+        elif self.path.startswith('/transactions/'):
+            transaction_id = self.path.rsplit('/', 1)[-1]
+            transaction = self.state.transactions.get(transaction_id)
+            if transaction:
+                self._send(200, transaction)
+            else:
+                self._send(404, {'error': 'Transaction not found'})
+        else:
+            self._send(404, {'error': 'Not found'})
+    
+    def do_POST(self):
+        if not self._preflight():
+            return
+        
+        if self.path in ('/payments/initiate', '/transfers/initiate'):
+            data = self._read_json()
+            transaction_id = f'IS_{uuid.uuid4().hex[:12]}'
+            transaction = {
+                'transaction_id': transaction_id,
+                'reference': data.get('reference'),
+                'status': 'pending',
+                'amount': data.get('amount'),
+                'phone_number': data.get('phone_number')
+            }
+            self.state.transactions[transaction_id] = transaction
+            self._send(201, transaction)
+        else:
+            self._send(404, {'error': 'Not found'})
+    
+    def do_PUT(self):
+        if not self._preflight():
+            return
+        self._send(404, {'error': 'Not found'})
+
+
+def make_server(host='127.0.0.1', port=8099, delay=0.0, fail_rate=0.0, fail_status=503):
+    """Create a stub server; call serve_forever() on the result."""
+    handler = type('Handler', (IntersendStubHandler,), {
+        'state': StubState(delay, fail_rate, fail_status)
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Intersend API stub')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--delay', type=float, default=0.0, help='Seconds of latency added to every request')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with --fail-status')
+    parser.add_argument('--fail-status', type=int, default=503)
+    args = parser.parse_args()
+    
+    server = make_server(args.host, args.port, args.delay, args.fail_rate, args.fail_status)
+    print(f"Intersend stub listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Minimal HTTP load generator for comparing server profiles.
+
+Runs N concurrent keep-alive clients against one URL for a fixed time and
+reports throughput and latency percentiles. Example: compare a single sync
+worker with gunicorn.conf.py on an endpoint that calls Intersend, with the
+stub adding 200 ms of provider latency:
+
+    python scripts/intersend_stub.py --port 8099 --delay 0.2 &
+    export INTERSEND_API_URL=http://localhost:8099 RATE_LIMIT_ENABLED=false
+
+    gunicorn --bind :5000 --workers 1 wsgi:app &
+    python scripts/loadtest.py http://localhost:5000/api/intersend/status/1 \
+        -H "Authorization: Bearer $TOKEN" -c 32 -d 20
+
+    gunicorn -c gunicorn.conf.py wsgi:app &
+    python scripts/loadtest.py http://localhost:5000/api/intersend/status/1 \
+        -H "Authorization: Bearer $TOKEN" -c 32 -d 20
+"""
+
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def _worker(url, headers, deadline, results, lock):
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    conn_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    conn = None
+    latencies, statuses, errors = [], {}, 0
+    
+    while time.monotonic() < deadline:
+        if conn is None:
+            conn = conn_class(parts.netloc, timeout=30)
+        start = time.monotonic()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            latencies.append(time.monotonic() - start)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+            if response.getheader('Connection', '').lower() == 'close':
+                conn.close()
+                conn = None
+        except Exception:
+            errors += 1
+            if conn is not None:
+                conn.close()
+            conn = None
+    
+    if conn is not None:
+        conn.close()
+    with lock:
+        results['latencies'].extend(latencies)
+        results['errors'] += errors
+        for status, count in statuses.items():
+            results['statuses'][status] = results['statuses'].get(status, 0) + count
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(url, concurrency, duration, headers):
+    results = {'latencies': [], 'statuses': {}, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=_worker, args=(url, headers, deadline, results, lock), daemon=True)
+        for _ in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    
+    latencies = sorted(results['latencies'])
+    return {
+        'requests': len(latencies),
+        'errors': results['errors'],
+        'statuses': results['statuses'],
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p95_ms': _percentile(latencies, 95) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP load generator')
+    parser.add_argument('url')
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help='seconds')
+    parser.add_argument('-H', '--header', action='append', default=[], help="e.g. 'Authorization: Bearer ...'")
+    args = parser.parse_args()
+    
+    headers = dict(h.split(':', 1) for h in args.header)
+    headers = {k.strip(): v.strip() for k, v in headers.items()}
+    
+    stats = run(args.url, args.concurrency, args.duration, headers)
+    print(f"requests: {stats['requests']}  errors: {stats['errors']}  statuses: {stats['statuses']}")
+    print(f"throughput: {stats['rps']:.1f} req/s")
+    print(f"latency p50: {stats['p50_ms']:.1f} ms  p95: {stats['p95_ms']:.1f} ms  p99: {stats['p99_ms']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,4 +4,4 @@
 echo "Starting Hedera Ramp Hub backend..."
 
 # Start the application
-exec gunicorn --bind 0.0.0.0:$PORT --workers 1 --timeout 120 wsgi:app
+exec gunicorn -c gunicorn.conf.py wsgi:app
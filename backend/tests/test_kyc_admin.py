@@ -0,0 +1,64 @@
+"""Access control of the admin-only batch KYC endpoint."""
+
+import pytest
+
+from app import create_app
+from config import TestingConfig
+from models import User, db
+
+ADMIN_WALLET = '0.0.1001'
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path}/test.db')
+    monkeypatch.setattr(TestingConfig, 'CONTRACT_OUTBOX_WORKER_ENABLED', False)
+    app = create_app('testing')
+    app.config['ADMIN_WALLET_ADDRESSES'] = [ADMIN_WALLET]
+    with app.app_context():
+        db.create_all()
+    yield app.test_client()
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def sign_up(client, wallet, kyc_status='approved'):
+    response = client.post('/api/auth/signup', json={
+        'wallet_address': wallet,
+        'wallet_type': 'hashpack',
+        'email': f'{wallet}@example.com',
+        'password': 'password123'
+    })
+    assert response.status_code == 201, response.get_json()
+    with client.application.app_context():
+        user = User.query.filter_by(wallet_address=wallet).first()
+        user.kyc_status = kyc_status
+        db.session.commit()
+        user_id = user.id
+    return user_id, {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+
+def test_batch_verify_rejects_non_admin(client):
+    pending_id, _ = sign_up(client, '0.0.2001', kyc_status='pending')
+    _, headers = sign_up(client, '0.0.2002')
+
+    response = client.post('/api/kyc/verify/batch', headers=headers, json={
+        'decisions': [{'user_id': pending_id, 'status': 'approved'}]
+    })
+
+    assert response.status_code == 403
+    with client.application.app_context():
+        assert db.session.get(User, pending_id).kyc_status == 'pending'
+
+
+def test_batch_verify_allows_admin(client):
+    pending_id, _ = sign_up(client, '0.0.2001', kyc_status='pending')
+    _, headers = sign_up(client, ADMIN_WALLET)
+
+    response = client.post('/api/kyc/verify/batch', headers=headers, json={
+        'decisions': [{'user_id': pending_id, 'status': 'approved'}]
+    })
+
+    assert response.status_code == 200
+    assert response.get_json()['approved'] == 1
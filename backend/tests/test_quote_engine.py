@@ -0,0 +1,134 @@
+"""
+Property tests: the quote engine matches RampHub.sol's integer arithmetic.
+
+    calculateHbarAmount(kes)  = (kes * kesToHbarRate) / 10**18
+    calculateKesAmount(hbar)  = (hbar * hbarToKesRate) / 10**8
+
+Solidity 0.8 uint256 division floors non-negative operands, and a product
+above 2**256 - 1 reverts.
+"""
+
+import pytest
+from hypothesis import given, strategies as st
+
+from quote_engine import (
+    UINT256_MAX,
+    QuoteEngine,
+    RateSnapshot,
+    calculate_hbar_amount,
+    calculate_kes_amount
+)
+
+# Defaults set in RampHub.sol's constructor
+DEFAULT_KES_TO_HBAR = 2350000000000000
+DEFAULT_HBAR_TO_KES = 425500000000000000000
+
+uint256 = st.integers(min_value=0, max_value=UINT256_MAX)
+rates = st.integers(min_value=0, max_value=2**128)
+
+# Amounts the API accepts: 25-150,000 KES in wei, up to 10**9 HBAR in tinybars
+kes_wei = st.integers(min_value=0, max_value=150000 * 10**18)
+tinybars = st.integers(min_value=0, max_value=10**9 * 10**8)
+realistic_kes_to_hbar = st.integers(min_value=1, max_value=DEFAULT_KES_TO_HBAR * 1000)
+realistic_hbar_to_kes = st.integers(min_value=1, max_value=DEFAULT_HBAR_TO_KES * 1000)
+
+
+def solidity_calculate_hbar(kes_amount, kes_to_hbar_rate):
+    product = kes_amount * kes_to_hbar_rate
+    if product > UINT256_MAX:
+        return None  # reverts
+    return product // 10**18
+
+
+def solidity_calculate_kes(hbar_amount, hbar_to_kes_rate):
+    product = hbar_amount * hbar_to_kes_rate
+    if product > UINT256_MAX:
+        return None  # reverts
+    return product // 10**8
+
+
+@given(kes_wei, realistic_kes_to_hbar)
+def test_hbar_amount_matches_contract(kes_amount, rate):
+    assert calculate_hbar_amount(kes_amount, rate) == (kes_amount * rate) // 10**18
+
+
+@given(tinybars, realistic_hbar_to_kes)
+def test_kes_amount_matches_contract(hbar_amount, rate):
+    assert calculate_kes_amount(hbar_amount, rate) == (hbar_amount * rate) // 10**8
+
+
+@given(uint256, rates)
+def test_hbar_amount_over_uint256(kes_amount, rate):
+    expected = solidity_calculate_hbar(kes_amount, rate)
+    if expected is None:
+        with pytest.raises(ValueError):
+            calculate_hbar_amount(kes_amount, rate)
+    else:
+        assert calculate_hbar_amount(kes_amount, rate) == expected
+
+
+@given(uint256, rates)
+def test_kes_amount_over_uint256(hbar_amount, rate):
+    expected = solidity_calculate_kes(hbar_amount, rate)
+    if expected is None:
+        with pytest.raises(ValueError):
+            calculate_kes_amount(hbar_amount, rate)
+    else:
+        assert calculate_kes_amount(hbar_amount, rate) == expected
+
+
+@given(kes_wei, kes_wei, realistic_kes_to_hbar)
+def test_hbar_amount_is_monotonic(a, b, rate):
+    low, high = sorted((a, b))
+    assert calculate_hbar_amount(low, rate) <= calculate_hbar_amount(high, rate)
+
+
+@given(st.one_of(st.integers(max_value=-1), st.integers(min_value=UINT256_MAX + 1)))
+def test_amount_outside_uint256_is_rejected(amount):
+    with pytest.raises(ValueError):
+        calculate_hbar_amount(amount, DEFAULT_KES_TO_HBAR)
+    with pytest.raises(ValueError):
+        calculate_kes_amount(amount, DEFAULT_HBAR_TO_KES)
+
+
+@pytest.mark.parametrize('amount', [True, 1.5, '100', None])
+def test_non_integer_amount_is_rejected(amount):
+    with pytest.raises(ValueError):
+        calculate_hbar_amount(amount, DEFAULT_KES_TO_HBAR)
+
+
+def test_default_rates():
+    # 100 KES and 1 HBAR at the constructor's rates
+    assert calculate_hbar_amount(100 * 10**18, DEFAULT_KES_TO_HBAR) == 235000000000000000
+    assert calculate_kes_amount(10**8, DEFAULT_HBAR_TO_KES) == 425500000000000000000
+
+
+class _Rates:
+    """getExchangeRates() result as returned by the SDK."""
+    
+    def __init__(self, kes_to_hbar, hbar_to_kes):
+        self.values = (kes_to_hbar, hbar_to_kes)
+    
+    def getUint256(self, index):
+        return self.values[index]
+
+
+class _Service:
+    def __init__(self, kes_to_hbar, hbar_to_kes):
+        self.result = {'success': True, 'data': _Rates(kes_to_hbar, hbar_to_kes)}
+    
+    def get_rates_simple(self):
+        return self.result
+
+
+@given(realistic_kes_to_hbar, realistic_hbar_to_kes, kes_wei, tinybars)
+def test_engine_snapshot_matches_contract(kes_to_hbar, hbar_to_kes, kes_amount, hbar_amount):
+    snapshot = QuoteEngine(_Service(kes_to_hbar, hbar_to_kes)).snapshot()
+    
+    assert snapshot.quote_hbar(kes_amount) == solidity_calculate_hbar(kes_amount, kes_to_hbar)
+    assert snapshot.quote_kes(hbar_amount) == solidity_calculate_kes(hbar_amount, hbar_to_kes)
+
+
+def test_snapshot_version_depends_only_on_rates():
+    assert RateSnapshot(1, 2).version == RateSnapshot(1, 2).version
+    assert RateSnapshot(1, 2).version != RateSnapshot(2, 1).version